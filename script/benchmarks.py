@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import textwrap
+import time
+import tracemalloc
+
+import simur
+import vcsRecords
+
+MY_NAME = os.path.basename(__file__)
+
+DESCRIPTION = """
+Measure the time and memory of the SIMuR data structures on synthetic data,
+so that changes to them can be compared at the scale of a large build
+"""
+USAGE_EXAMPLE = f"""
+Example:
+> {MY_NAME} records --files 1000000 --repos 20
+> {MY_NAME} git_lookup --files 200000 --lookups 50
+"""
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        MY_NAME,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description=textwrap.dedent(DESCRIPTION),
+        epilog=textwrap.dedent(USAGE_EXAMPLE)
+    )
+    add = parser.add_argument
+    add('benchmark', choices=sorted(BENCHMARKS.keys()),
+        help='what to measure')
+    add('-f', '--files', type=int, default=100000,
+        help='number of source files')
+    add('-r', '--repos', type=int, default=10,
+        help='number of repositories the files are spread over')
+    add('-n', '--lookups', type=int, default=20,
+        help='number of lookups to time (git_lookup)')
+
+    return parser.parse_args()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def measure(what, make):
+    '''Returns what make() returns, after printing its time and memory'''
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = make()
+    elapsed = time.perf_counter() - start
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{what:<28} {current / 2**20:9.1f} MB {elapsed:8.2f} s')
+    return result
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_file_names(options):
+    files = []
+    for i in range(options.files):
+        repo = i % options.repos
+        relpath = f'src/module{i % 997}/file{i}.cpp'
+        files.append((repo, relpath, f'C:\\work\\repo{repo}\\{relpath}'))
+    return files
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_dict_caches(files):
+    '''As prepPDB made them before vcsRecords: one dict per file, copied
+    into vcs_cache by copy_cache_response()'''
+    git_cache = {}
+    vcs_cache = {}
+    for repo, relpath, path in files:
+        cache_entry = {}
+        cache_entry['reporoot'] = f'git@github.com:Owner/repo{repo}.git'
+        cache_entry['relpath']  = relpath
+        cache_entry['revision'] = f'{hash(relpath) & 0xffffffff:040x}'
+        cache_entry['sha1']     = f'{repo:040x}\n'
+        cache_entry['local']    = f'C:\\work\\repo{repo}'
+        cache_entry['remote']   = f'git@github.com:Owner/repo{repo}.git'
+        cache_entry['vcs']      = 'git'
+        git_cache[path] = cache_entry
+        vcs_cache[os.path.abspath(path)] = dict(cache_entry)
+    return git_cache, vcs_cache
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_record_caches(files, no_of_repos):
+    git_cache = {}
+    vcs_cache = {}
+    repos = []
+    for repo in range(no_of_repos):
+        remote = f'git@github.com:Owner/repo{repo}.git'
+        repos.append(vcsRecords.RepoRecord('git', remote, f'{repo:040x}\n',
+                                           f'C:\\work\\repo{repo}', remote))
+    for repo, relpath, path in files:
+        revision = f'{hash(relpath) & 0xffffffff:040x}'
+        cache_entry = vcsRecords.FileRecord(repos[repo], relpath, revision)
+        path = vcsRecords.intern_path(path)
+        git_cache[path] = cache_entry
+        vcs_cache[vcsRecords.intern_path(os.path.abspath(path))] = cache_entry
+    return git_cache, vcs_cache
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def benchmark_records(options):
+    files = make_file_names(options)
+    print(f'{options.files} files in {options.repos} repositories')
+    dict_caches = measure('dict per file', lambda: make_dict_caches(files))
+    record_caches = measure('vcsRecords',
+                            lambda: make_record_caches(files, options.repos))
+
+    dict_json = json.dumps(dict_caches[1], indent=2)
+    record_json = json.dumps(record_caches[1], indent=2,
+                             default=vcsRecords.to_json)
+    same = 'the same' if dict_json == record_json else 'NOT the same'
+    print(f'The vcs_cache JSON is {same}')
+    return 0 if dict_json == record_json else 3
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def walk_for_git_dir(start_dir, find_dir):
+    '''As simur.get_the_git_dir() did before git_clones.json'''
+    for root, dirs, _files in os.walk(start_dir):
+        if find_dir in dirs:
+            return os.path.abspath(os.path.join(root, find_dir, '..'))
+    return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_clone_tree(repo_dir, no_of_files):
+    '''A clone as vcget makes them: <repo_dir>/<name>/{.git,working tree}'''
+    clone_dir = os.path.join(repo_dir, 'repo')
+    for i in range(no_of_files):
+        the_dir = os.path.join(clone_dir, 'src', f'module{i % 97}')
+        os.makedirs(the_dir, exist_ok=True)
+        with open(os.path.join(the_dir, f'file{i}.cpp'), 'w'):
+            pass
+        object_dir = os.path.join(clone_dir, '.git', 'objects',
+                                  f'{i % 256:02x}')
+        os.makedirs(object_dir, exist_ok=True)
+        with open(os.path.join(object_dir, f'{i:038x}'), 'w'):
+            pass
+    return clone_dir
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def benchmark_git_lookup(options):
+    reporoot = 'git@github.com:Owner/repo.git'
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['SIMUR_REPO_CACHE'] = cache_dir
+        repo_dir = os.path.join(cache_dir, 'repo_dir')
+        clone_dir = make_clone_tree(repo_dir, options.files)
+        print(f'{options.lookups} lookups of a clone of {options.files} files')
+
+        def lookups(find):
+            return [find() for _i in range(options.lookups)]
+
+        found = [
+            measure('os.walk',
+                    lambda: lookups(lambda: walk_for_git_dir(repo_dir,
+                                                             '.git'))),
+            measure('bounded scan',
+                    lambda: lookups(lambda: simur.get_the_git_dir(repo_dir,
+                                                                  '.git'))),
+            measure('git_clones.json',
+                    lambda: lookups(lambda: simur.find_git_clone(reporoot,
+                                                                 repo_dir))),
+        ]
+
+        # A clone that failed half way, without a .git
+        os.rename(os.path.join(clone_dir, '.git'),
+                  os.path.join(clone_dir, 'git'))
+        print('Without a .git')
+        missing = [
+            measure('os.walk',
+                    lambda: lookups(lambda: walk_for_git_dir(repo_dir,
+                                                             '.git'))),
+            measure('bounded scan',
+                    lambda: lookups(lambda: simur.get_the_git_dir(repo_dir,
+                                                                  '.git'))),
+        ]
+
+    same = all(result == found[0] for result in found) and \
+        all(result == missing[0] for result in missing)
+    print(f'The lookups are {"the same" if same else "NOT the same"}')
+    return 0 if same else 3
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+BENCHMARKS = {
+    'git_lookup': benchmark_git_lookup,
+    'records': benchmark_records,
+}
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def main():
+    options = parse_arguments()
+    return BENCHMARKS[options.benchmark](options)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import hashlib
+import lzma
+import os
+import re
+import sqlite3
+import sys
+import time
+import uuid
+import zlib
+
+import simur
+
+#-------------------------------------------------------------------------------
+# The source files that vcget has handed out, kept on disk so that the next
+# request for the same one (the same header in every debugging session) is
+# read from there without asking git or svn.  Only what cannot change is kept:
+# git objects by their full sha1, svn files by url@revision.  The files are
+# stored as is, zlib or lzma compressed, and an SQLite index keeps their sizes
+# and when they were last used, so that the least recently used ones are
+# removed when the cache grows above its size.
+#   SIMUR_BLOB_CACHE            the directory (<SIMUR_REPO_CACHE>/blob_cache,
+#                               if there is a SIMUR_REPO_CACHE)
+#   SIMUR_BLOB_CACHE_MB         the size, 0 turns it off (1024)
+#   SIMUR_BLOB_COMPRESSION      none, zlib or lzma (none)
+#-------------------------------------------------------------------------------
+CACHE_DIR_ENV = 'SIMUR_BLOB_CACHE'
+CACHE_SIZE_ENV = 'SIMUR_BLOB_CACHE_MB'
+COMPRESSION_ENV = 'SIMUR_BLOB_COMPRESSION'
+CACHE_DIR_NAME = 'blob_cache'
+INDEX_FILE_NAME = 'index.sqlite'
+DEFAULT_SIZE_MB = 1024
+EVICT_TO = 0.9                  # Of the size, so we do not evict at every put
+TOUCH_INTERVAL = 60             # Seconds, last_used is not updated more often
+
+CODECS = {
+    'none': (lambda data: data, lambda data: data),
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blobs (
+    key       TEXT PRIMARY KEY,
+    file      TEXT NOT NULL,
+    codec     TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_on_last_used ON blobs (last_used);
+'''
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_git_key(revision):
+    '''None unless revision is a full object id, a short one may become
+    ambiguous'''
+    if re.fullmatch(r'[0-9a-fA-F]{40}|[0-9a-fA-F]{64}', revision):
+        return f'git:{revision.lower()}'
+    return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_svn_key(reporoot, relpath, revision):
+    '''None unless revision is a number, HEAD etc. move'''
+    if revision.isdigit():
+        return f'svn:{reporoot}/{relpath}@{revision}'
+    return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class BlobCache:
+    def __init__(self, directory, max_size, codec='none'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.codec = codec
+        # Several vcget:s (debuggers, developers) may use it at once
+        self._connection = sqlite3.connect(
+            os.path.join(directory, INDEX_FILE_NAME), timeout=30)
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def get_file(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(name[:2], name)
+
+    def get(self, key):
+        '''The cached content for key, or None - also if the cache cannot be
+        used right now, it is only a shortcut'''
+        try:
+            return self._get(key)
+        except (OSError, sqlite3.Error) as e:
+            print(f'Blob cache {self.directory}: {e}', file=sys.stderr)
+            return None
+
+    def _get(self, key):
+        row = self._connection.execute(
+            'SELECT file, codec, last_used FROM blobs WHERE key = ?',
+            (key,)).fetchone()
+        if row is None:
+            return None
+        file, codec, last_used = row
+        try:
+            with open(os.path.join(self.directory, file), 'rb') as fp:
+                data = CODECS[codec][1](fp.read())
+        except (OSError, KeyError, ValueError, zlib.error, lzma.LZMAError):
+            self._remove([(key, file)])     # Gone or broken, fetch it again
+            return None
+
+        now = time.time()
+        if now - last_used > TOUCH_INTERVAL:
+            with self._connection:
+                self._connection.execute(
+                    'UPDATE blobs SET last_used = ? WHERE key = ?', (now, key))
+        return data
+
+    def put(self, key, data):
+        try:
+            self._put(key, data)
+        except (OSError, sqlite3.Error) as e:
+            print(f'Blob cache {self.directory}: {e}', file=sys.stderr)
+
+    def _put(self, key, data):
+        file = self.get_file(key)
+        stored = CODECS[self.codec][0](data)
+        path = os.path.join(self.directory, file)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_file = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_file, 'wb') as fp:
+            fp.write(stored)
+        os.replace(temp_file, path)
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO blobs VALUES (?,?,?,?,?)',
+                (key, file, self.codec, len(stored), time.time()))
+        self.evict()
+
+    def get_size(self):
+        return self._connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+
+    def evict(self):
+        '''Remove the least recently used until below the size again'''
+        size = self.get_size()
+        if size <= self.max_size:
+            return
+        evicted = []
+        for key, file, file_size in self._connection.execute(
+                'SELECT key, file, size FROM blobs ORDER BY last_used'):
+            if size <= self.max_size * EVICT_TO:
+                break
+            evicted.append((key, file))
+            size -= file_size
+        self._remove(evicted)
+
+    def _remove(self, entries):
+        with self._connection:
+            self._connection.executemany('DELETE FROM blobs WHERE key = ?',
+                                         [(key,) for key, _file in entries])
+        for _key, file in entries:
+            try:
+                os.remove(os.path.join(self.directory, file))
+            except OSError:
+                pass
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def open_cache():
+    '''The cache as set up by the environment, None if turned off'''
+    try:
+        size_mb = float(os.getenv(CACHE_SIZE_ENV, DEFAULT_SIZE_MB))
+    except ValueError:
+        size_mb = DEFAULT_SIZE_MB
+    if size_mb <= 0:
+        return None
+    codec = os.getenv(COMPRESSION_ENV, 'none')
+    if codec not in CODECS:
+        codec = 'none'
+    directory = os.getenv(CACHE_DIR_ENV)
+    if not directory:
+        # Only beside the git clones, do not make a SIMUR_REPO_CACHE for it
+        repo_cache = simur.get_repo_cache_name()
+        if not os.path.isdir(repo_cache):
+            return None
+        directory = os.path.join(repo_cache, CACHE_DIR_NAME)
+    try:
+        return BlobCache(directory, int(size_mb * 2**20), codec)
+    except (OSError, sqlite3.Error):
+        return None             # vcget works without it
@@ -9,6 +9,7 @@ import textwrap
 
 import prepPDB
 import simur
+import treeScan
 
 _my_name = os.path.basename(__file__)
 _default_srcsrv = 'C:/Program Files (x86)/Windows Kits/10/Debuggers/x64/srcsrv'
@@ -83,15 +84,13 @@ def collect_all_pdb_files(directory):
     ext = '.pdb'
     bad1 = '.ENU.pdb'
     bad2 = '.JPN.pdb'
-    for root, _dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(ext):
-                if file.endswith(bad1):
-                    continue
-                if file.endswith(bad2):
-                    continue
-                full_path = os.path.join(root, file)
-                the_chosen_ones[file] = full_path
+    for full_path in treeScan.find_files([directory], [ext])[ext]:
+        file = os.path.basename(full_path)
+        if file.endswith(bad1):
+            continue
+        if file.endswith(bad2):
+            continue
+        the_chosen_ones[file] = full_path
 
     return the_chosen_ones
 
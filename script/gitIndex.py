@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import mmap
+import os
+import re
+import struct
+import threading
+
+#-------------------------------------------------------------------------------
+# Read the path -> blob id of the tracked files straight out of the .git/index
+# file instead of parsing the output of 'git ls-files -s', see
+# https://git-scm.com/docs/index-format
+#-------------------------------------------------------------------------------
+SIGNATURE = b'DIRC'
+VERSIONS = (2, 3, 4)
+HEADER_SIZE = 12
+HASH_SIZE = 20              # Only sha1 repositories, sha256 falls back
+STAT_SIZE = 40              # ctime, mtime, dev, ino, mode, uid, gid, size
+FLAG_EXTENDED = 0x4000
+NAME_MASK = 0x0fff
+
+_index_cache = {}           # dict on index file -> (mtime_ns, size, entries)
+_index_cache_lock = threading.Lock()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def find_git_dir(work_dir):
+    '''The .git directory of a working tree, also when .git is a file pointing
+    elsewhere (worktrees, submodules)'''
+    dot_git = os.path.join(work_dir, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    if not os.path.isfile(dot_git):
+        return None
+    with open(dot_git) as fp:
+        gitdir = re.match(r'^gitdir:\s*(.+?)\s*$', fp.readline())
+    if not gitdir:
+        return None
+    return os.path.normpath(os.path.join(work_dir, gitdir.group(1)))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_sha1_repo(git_dir):
+    config = os.path.join(git_dir, 'config')
+    if not os.path.exists(config):
+        return True
+    with open(config, errors='replace') as fp:
+        object_format = re.search(r'^\s*objectformat\s*=\s*(\S+)', fp.read(),
+                                  re.IGNORECASE | re.MULTILINE)
+    return object_format is None or object_format.group(1).lower() == 'sha1'
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def decode_varint(data, pos):
+    # The 'offset' encoding of varint.c in git
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, pos
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def find_nul(data, pos):
+    nul = data.find(b'\0', pos)   # mmap has find() but no index()
+    if nul < 0:
+        raise ValueError('unterminated path in index')
+    return nul
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def parse_index(data):
+    '''
+    Returns a list of (path, blob id) in index order, as 'git ls-files -s'
+    would list them, or None if the index uses anything we do not understand
+    '''
+    if len(data) < HEADER_SIZE + HASH_SIZE or data[:4] != SIGNATURE:
+        return None
+    version, count = struct.unpack_from('>II', data, 4)
+    if version not in VERSIONS:
+        return None
+
+    entries = []
+    end = len(data) - HASH_SIZE     # The index ends with its checksum
+    pos = HEADER_SIZE
+    name = b''
+    for _entry in range(count):
+        entry_start = pos
+        blob = data[pos + STAT_SIZE:pos + STAT_SIZE + HASH_SIZE].hex()
+        flags, = struct.unpack_from('>H', data, pos + STAT_SIZE + HASH_SIZE)
+        pos += STAT_SIZE + HASH_SIZE + 2
+        if flags & FLAG_EXTENDED:
+            if version < 3:
+                return None
+            pos += 2
+
+        if version == 4:
+            # Prefix compressed against the previous name, no padding
+            strip, pos = decode_varint(data, pos)
+            name_end = find_nul(data, pos)
+            name = name[:len(name) - strip] + bytes(data[pos:name_end])
+            pos = name_end + 1
+        else:
+            name_len = flags & NAME_MASK
+            if name_len == NAME_MASK:
+                name_len = find_nul(data, pos) - pos
+            name = bytes(data[pos:pos + name_len])
+            # 1-8 NULs, so that the entry is a multiple of 8 bytes
+            pos = entry_start + ((pos - entry_start + name_len + 8) & ~7)
+
+        if pos > end:
+            return None
+        entries.append((name.decode('utf-8', errors='replace'), blob))
+
+    # Extensions: the ones starting with 'A'..'Z' are optional, the others
+    # (e.g. 'link' for split index, 'sdir' for sparse index) change the meaning
+    # of the entries and we must not ignore them
+    while pos + 8 <= end:
+        signature = bytes(data[pos:pos + 4])
+        size, = struct.unpack_from('>I', data, pos + 4)
+        if not b'A' <= signature[:1] <= b'Z':
+            return None
+        pos += 8 + size
+
+    return entries
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_index(index_file):
+    with open(index_file, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                return parse_index(data)
+            except (IndexError, ValueError, struct.error):
+                return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_index_entries(work_dir):
+    '''
+    The (path, blob id) of the working tree at work_dir, or None if it must be
+    taken from 'git ls-files -s'.  Parsed once as long as the mtime and size of
+    the index file stay the same
+    '''
+    git_dir = find_git_dir(work_dir)
+    if git_dir is None or not is_sha1_repo(git_dir):
+        return None
+    index_file = os.path.join(git_dir, 'index')
+    try:
+        stat = os.stat(index_file)
+    except OSError:
+        return None
+
+    with _index_cache_lock:
+        cached = _index_cache.get(index_file)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    entries = read_index(index_file)
+    with _index_cache_lock:
+        _index_cache[index_file] = (stat.st_mtime_ns, stat.st_size, entries)
+
+    return entries
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_common_dir(git_dir):
+    # Worktrees share refs and config with the main repository
+    common_file = os.path.join(git_dir, 'commondir')
+    if not os.path.exists(common_file):
+        return git_dir
+    with open(common_file) as fp:
+        return os.path.normpath(os.path.join(git_dir, fp.read().strip()))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_head(git_dir):
+    '''The commit id HEAD points at, or None'''
+    try:
+        with open(os.path.join(git_dir, 'HEAD')) as fp:
+            head = fp.read().strip()
+    except OSError:
+        return None
+    ref = re.match(r'^ref:\s*(.+)$', head)
+    if not ref:
+        return head or None         # Detached
+    ref = ref.group(1)
+
+    common_dir = get_common_dir(git_dir)
+    for a_dir in (git_dir, common_dir):
+        ref_file = os.path.join(a_dir, *ref.split('/'))
+        if os.path.isfile(ref_file):
+            with open(ref_file) as fp:
+                return fp.read().strip() or None
+
+    packed_refs = os.path.join(common_dir, 'packed-refs')
+    if os.path.exists(packed_refs):
+        with open(packed_refs) as fp:
+            for line in fp:
+                packed = line.split()
+                if len(packed) == 2 and packed[1] == ref:
+                    return packed[0]
+    return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_stamp(work_dir):
+    '''
+    A string that changes when the snapshot of work_dir may have changed:
+    the HEAD commit, the index mtime/size and the config (for the remote).
+    None if it cannot be told without asking git
+    '''
+    git_dir = find_git_dir(work_dir)
+    if git_dir is None:
+        return None
+    head = read_head(git_dir)
+    if head is None:
+        return None
+    try:
+        index = os.stat(os.path.join(git_dir, 'index'))
+        config = os.stat(os.path.join(get_common_dir(git_dir), 'config'))
+    except OSError:
+        return None
+    return f'{head}:{index.st_mtime_ns}:{index.st_size}:{config.st_mtime_ns}'
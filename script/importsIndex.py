@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import collections.abc
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+import simur
+import vcsPack
+import vcsRecords
+
+#-------------------------------------------------------------------------------
+# The --processed_dir imports (the .simur.json/.simur.pack files of earlier
+# runs) as an SQLite index instead of one big dict.  A cache file is only read
+# again when its mtime or size has changed, and get_vcs_information() looks up
+# the files it could not resolve on demand.  A Bloom filter over all imported
+# paths answers most misses without a query.  There is one index per set of
+# --processed_dir:s, so runs with other sets do not drop each other's files.
+#-------------------------------------------------------------------------------
+INDEX_FILE_PATTERN = 'imports_index_{}.sqlite'   # Of a --processed_dir set
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sources (
+    id       INTEGER PRIMARY KEY,
+    file     TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    rank     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repos (
+    id       INTEGER PRIMARY KEY,
+    vcs      TEXT NOT NULL,
+    reporoot TEXT,
+    sha1     TEXT,
+    local    TEXT,
+    remote   TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path     TEXT NOT NULL,
+    source   INTEGER NOT NULL,
+    repo     INTEGER,
+    relpath  TEXT,
+    revision TEXT,
+    sha1     TEXT,
+    other    TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_on_path ON entries (path);
+CREATE INDEX IF NOT EXISTS entries_on_source ON entries (source);
+CREATE TABLE IF NOT EXISTS bloom (
+    id       INTEGER PRIMARY KEY CHECK (id = 0),
+    hashes   INTEGER NOT NULL,
+    bits     BLOB NOT NULL
+);
+'''
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_default_index_file(processed_dirs):
+    '''One index per set of --processed_dir:s, update() drops the cache
+    files that are not in them and other runs may use other sets'''
+    dirs = sorted({os.path.normcase(os.path.abspath(the_dir))
+                   for the_dir in processed_dirs})
+    key = hashlib.sha1('\n'.join(dirs).encode('utf-8')).hexdigest()[:16]
+    return simur.get_repo_cache_file(INDEX_FILE_PATTERN.format(key))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class BloomFilter:
+    '''No false negatives, about 1% false positives at 10 bits per key'''
+    def __init__(self, no_of_keys=0, bits=None, hashes=BLOOM_HASHES):
+        if bits is None:
+            no_of_bytes = max(64, no_of_keys * BLOOM_BITS_PER_KEY // 8)
+            bits = bytearray(no_of_bytes)
+        self.bits = bits
+        self.no_of_bits = len(bits) * 8
+        self.hashes = hashes
+
+    def get_positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'),
+                                 digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.no_of_bits
+
+    def add(self, key):
+        for position in self.get_positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self.get_positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class ImportsIndex(collections.abc.Mapping):
+    '''
+    Reads like the vcs_imports dict: path -> cache entry, where a path in
+    several cache files takes its entry from the last of them (as the
+    dict.update() of accumulate_processed() did)
+    '''
+    def __init__(self, file):
+        self.file = file
+        self._lock = threading.Lock()   # Shared by the indexPDBs --jobs
+        # Other indexPDBs runs with the same --processed_dir:s may use it
+        self._connection = sqlite3.connect(file, timeout=60,
+                                           check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._bloom = None
+        self._repos = {}                # dict on repo id -> RepoRecord
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    #---------------------------------------------------------------------------
+    # Bring the index up to date with the cache files
+    #---------------------------------------------------------------------------
+    def update(self, cache_files, verbose=False):
+        '''cache_files in the order of precedence, the last one wins'''
+        connection = self._connection
+        changed = False
+        grown = []
+        with self._lock, connection:
+            # Write locked from the start, what we read must stay true
+            connection.execute('BEGIN IMMEDIATE')
+            known = {}
+            for source_id, file, mtime_ns, size in connection.execute(
+                    'SELECT id, file, mtime_ns, size FROM sources'):
+                known[file] = (source_id, mtime_ns, size)
+
+            for rank, cache_file in enumerate(cache_files):
+                try:
+                    stat = os.stat(cache_file)
+                except OSError:
+                    continue
+                old = known.pop(cache_file, None)
+                if old and old[1:] == (stat.st_mtime_ns, stat.st_size):
+                    connection.execute('UPDATE sources SET rank = ?'
+                                       ' WHERE id = ?', (rank, old[0]))
+                    continue
+                if old:
+                    self._delete_source(old[0])
+                    changed = True
+                if verbose:
+                    print(f'Take vcs exports from {cache_file}')
+                source_id = connection.execute(
+                    'INSERT INTO sources (file, mtime_ns, size, rank)'
+                    ' VALUES (?,?,?,?)',
+                    (cache_file, stat.st_mtime_ns, stat.st_size,
+                     rank)).lastrowid
+                grown.append(self._insert_entries(source_id, cache_file))
+
+            # Those that are gone (the index is of this --processed_dir set)
+            for source_id, _mtime_ns, _size in known.values():
+                self._delete_source(source_id)
+                changed = True
+
+            self._update_bloom(changed, grown)
+
+    def _delete_source(self, source_id):
+        self._connection.execute('DELETE FROM entries WHERE source = ?',
+                                 (source_id,))
+        self._connection.execute('DELETE FROM sources WHERE id = ?',
+                                 (source_id,))
+
+    def _get_repo_id(self, cache_entry):
+        repo_key = vcsPack.get_repo_key(cache_entry)
+        if repo_key is None:
+            return None
+        # NULLs are never equal in SQL (nor UNIQUE), so look it up with IS
+        row = self._connection.execute(
+            'SELECT id FROM repos WHERE vcs IS ? AND reporoot IS ? AND'
+            ' sha1 IS ? AND local IS ? AND remote IS ?', repo_key).fetchone()
+        if row is not None:
+            return row[0]
+        return self._connection.execute(
+            'INSERT INTO repos (vcs, reporoot, sha1, local, remote)'
+            ' VALUES (?,?,?,?,?)', repo_key).lastrowid
+
+    def _insert_entries(self, source_id, cache_file):
+        '''Returns the paths that were inserted'''
+        repo_ids = {}
+        rows = []
+        for path, cache_entry in vcsPack.iter_vcs_data(cache_file):
+            repo_key = vcsPack.get_repo_key(cache_entry)
+            if repo_key is None:
+                # no-vcs or not one of ours, keep it as it is
+                rows.append((path, source_id, None, None, None, None,
+                             json.dumps(dict(cache_entry))))
+                continue
+            repo_id = repo_ids.get(repo_key)
+            if repo_id is None:
+                repo_id = self._get_repo_id(cache_entry)
+                repo_ids[repo_key] = repo_id
+            sha1 = None if repo_key[0] == 'git' else cache_entry['sha1']
+            rows.append((path, source_id, repo_id, cache_entry['relpath'],
+                         cache_entry['revision'], sha1, None))
+        self._connection.executemany(
+            'INSERT INTO entries VALUES (?,?,?,?,?,?,?)', rows)
+        return [row[0] for row in rows]
+
+    def _update_bloom(self, changed, grown):
+        '''Add the grown paths to the stored filter, or make a new one if
+        entries were removed or it is getting too full'''
+        connection = self._connection
+        no_of_keys = connection.execute(
+            'SELECT COUNT(*) FROM entries').fetchone()[0]
+        bloom = None
+        bloom_row = connection.execute(
+            'SELECT hashes, bits FROM bloom').fetchone()
+        if bloom_row is not None and not changed:
+            bloom = BloomFilter(bits=bytearray(bloom_row[1]),
+                                hashes=bloom_row[0])
+            if no_of_keys * BLOOM_BITS_PER_KEY > bloom.no_of_bits * 2:
+                bloom = None
+
+        if bloom is None:
+            bloom = BloomFilter(no_of_keys)
+            paths = connection.execute('SELECT path FROM entries')
+            grown = [(path for path, in paths)]
+        for paths in grown:
+            for path in paths:
+                bloom.add(path)
+        if grown:
+            connection.execute('INSERT OR REPLACE INTO bloom VALUES (0, ?, ?)',
+                               (bloom.hashes, bytes(bloom.bits)))
+        self._bloom = bloom
+
+    #---------------------------------------------------------------------------
+    # The Mapping
+    #---------------------------------------------------------------------------
+    def _make_entry(self, repo_id, relpath, revision, sha1, other):
+        if repo_id is None:
+            cache_entry = json.loads(other)
+            if vcsRecords.NO_VCS in cache_entry:
+                return vcsRecords.NO_VCS_ENTRY
+            return cache_entry
+        repo = self._repos.get(repo_id)
+        if repo is None:
+            repo_key = self._connection.execute(
+                'SELECT vcs, reporoot, sha1, local, remote FROM repos'
+                ' WHERE id = ?', (repo_id,)).fetchone()
+            repo = vcsRecords.the_repos.get_repo(*repo_key)
+            self._repos[repo_id] = repo
+        return vcsRecords.FileRecord(repo, relpath, revision, sha1)
+
+    def __getitem__(self, path):
+        if self._bloom is not None and path not in self._bloom:
+            raise KeyError(path)
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT repo, relpath, revision, entries.sha1, other'
+                ' FROM entries JOIN sources ON sources.id = entries.source'
+                ' WHERE path = ? ORDER BY rank DESC LIMIT 1',
+                (path,)).fetchone()
+            if row is None:
+                raise KeyError(path)
+            return self._make_entry(*row)
+
+    def __contains__(self, path):
+        if self._bloom is not None and path not in self._bloom:
+            return False
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT 1 FROM entries WHERE path = ? LIMIT 1',
+                (path,)).fetchone()
+        return row is not None
+
+    def __iter__(self):
+        with self._lock:
+            paths = self._connection.execute(
+                'SELECT DISTINCT path FROM entries').fetchall()
+        return (path for path, in paths)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(DISTINCT path) FROM entries').fetchone()[0]
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def open_index(file, cache_files, verbose=False):
+    imports_index = ImportsIndex(file)
+    imports_index.update(cache_files, verbose)
+    return imports_index
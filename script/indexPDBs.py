@@ -3,6 +3,7 @@
 #-------------------------------------------------------------------------------
 
 import argparse
+import concurrent.futures
 import datetime
 import os
 import re
@@ -11,16 +12,25 @@ import sys
 import textwrap
 import time
 
+import importsIndex
 import libSrcTool
 import prepPDB
+import runCheckpoint
+import sharedSnapshots
 import simur
+import stageManifest
+import treeScan
+import vcsPack
+import vcsRoots
+import vcsStore
 
 MY_NAME = os.path.basename(__file__)
 DEFAULT_SRCSRV = 'C:/Program Files (x86)/Windows Kits/10/Debuggers/x64/srcsrv'
 
 DESCRIPTION = f"""
 Index the PDB files in the --target_dir, taking the information from the
-    {simur.VCS_CACHE_PATTERN} files found under the --processed_dir:s
+    {simur.VCS_CACHE_PATTERN} ({simur.VCS_PACK_PATTERN}) files found under the
+    --processed_dir:s
 
   --srcsrv_dir may for example be (if you have it on a server)
       //seupp-s-rptmgr/ExternalAccess/IndexingServices/WinKit10Debuggers/srcsrv
@@ -45,20 +55,58 @@ def parse_arguments():
     add = parser.add_argument
     add('-b', '--backup', action='store_true',
         help='make a backup of the .pdb file as <path>.orig')
+    add('--checkpoint_interval', metavar='secs', type=int,
+        help='save the progress this often, to continue with --resume if the'
+             ' run is killed (default: never, or every'
+             f' {runCheckpoint.DEFAULT_INTERVAL} secs with --resume)')
+    add('--cache_format', choices=('json', 'pack'), default='json',
+        help=f'write the {simur.VCS_CACHE_PATTERN} files or the compact'
+             f' {simur.VCS_PACK_PATTERN} files (see vcsPack.py)')
     add('-c', '--cvdump_path', metavar='cvdump.exe',
         default='cvdump.exe',
         help='path to cvdump.exe (unless it is in the --srcsrv_dir directory)')
     add('-d', '--debug_level', type=int, default=0, help='set debug level')
+    add('--imports_index', metavar='imports_index.sqlite', nargs='?',
+        const='',
+        help='look up the -p imports in an index that is kept between runs,'
+             ' in the given file or in'
+             ' SIMUR_REPO_CACHE (one per set of -p directories)')
+    add('-j', '--jobs', type=int, default=1,
+        help='number of PDBs to process in parallel')
 
     add('-l', '--lower_case_pdb', action='store_true',
         help='handle old PDBs (< VS2019) that stored paths in lower case')
+    add('-m', '--manifest', metavar=stageManifest.MANIFEST_FILE_NAME,
+        nargs='?', const='',
+        help='remember what was done with each PDB and skip the unchanged'
+             ' ones on the next run, in the given file or in'
+             f' {stageManifest.MANIFEST_FILE_NAME} in the --target_dir')
     add('-p', '--processed_dir', metavar='processed-dir1{;dir2;dir4}',
         help='fetch *.simur.json from preprocessed PDB directories')
+    add('--resume', action='store_true',
+        help='continue from the checkpoint of a run that did not finish')
+    add('-r', '--root_dir_cache', metavar='root_dirs.json',
+        help='keep the directory to svn/git root mapping between runs')
     add('-q', '--quiet', action='store_true',
         help='be more quiet')
+    add('--prune_dir', metavar='pattern', action='append', default=[],
+        help='do not look for PDBs in directories with names matching the'
+             ' pattern (can be repeated, always pruned:'
+             f' {" ".join(treeScan.PRUNE_DIRS)})')
+    add('--shared_cache', metavar='shared-dir',
+        help='git snapshots shared with other build agents, for the working'
+             ' copies whose index cannot be read without git (default:'
+             f' {sharedSnapshots.SHARED_CACHE_ENV} if set)')
+    add('--scan_jobs', type=int, default=8,
+        help='number of threads looking for the PDBs in the --target_dir')
+    add('--scoped_git', action='store_true',
+        help='only take the git snapshots of the directories the PDBs use')
     add('-s', '--srcsrv_dir', metavar='srcsrv',
         default=DEFAULT_SRCSRV,
         help='WinKits srcsrv directory')
+    add('--stream_writer', choices=('native', 'pdbstr'), default='pdbstr',
+        help='write the srcsrv stream with pdbstr.exe or in-process (native,'
+             ' see pdbMsf.py)')
     add('-t', '--target_dir', metavar='stage-dir',
         required=True,
         help='root path to index (recursively)')
@@ -66,6 +114,11 @@ def parse_arguments():
         help='index only this pdb file')
     add('-v', '--verbose', action='store_true',
         help='be more verbose')
+    add('--vcs_store', metavar='vcs_store.sqlite', nargs='?', const='',
+        help='keep the svn/git snapshots between runs, in the given file or'
+             f' in {vcsStore.STORE_FILE_NAME} in SIMUR_REPO_CACHE')
+    add('--vcs_jobs', type=int, default=4,
+        help='number of svn/git snapshots to take in parallel')
 
     return parser.parse_args()
 
@@ -73,62 +126,217 @@ def parse_arguments():
 #
 #-------------------------------------------------------------------------------
 def list_all_files(directory, ext):
-    the_chosen_files = []
+    return treeScan.find_files([directory], [ext])[ext]
 
-    for root, _dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(ext):
-                the_chosen_files.append(os.path.join(root, file))
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def run_on_pool(worker, items, options):
+    '''
+    Call worker(item) for all items, on options.jobs threads.  Threads suffice
+    since the heavy lifting is done by srctool/pdbstr/svn/git, and they let the
+    workers share the vcs caches
+    '''
+    if options.jobs <= 1 or len(items) <= 1:
+        return [worker(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(options.jobs) as pool:
+        futures = [pool.submit(worker, item) for item in items]
+        try:
+            return [future.result() for future in futures]
+        except KeyboardInterrupt:
+            # Let the running ones finish (a PDB is never half written), but
+            # do not start any more of them
+            print('Interrupted, waiting for the running jobs')
+            pool.shutdown(cancel_futures=True)
+            raise
 
-    return the_chosen_files
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def largest_first(pdbs):
+    # Start the long runners first, so we do not end with one of them alone
+    return sorted(pdbs, key=treeScan.file_stats.get_size, reverse=True)
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def filter_pdbs(pdbs, cvdump, srcsrv, options):
-    lib_pdbs = []
-    exe_pdbs = []
+def is_internal_pdb(pdb_file):
+    return re.match(r'.*\\vc\d+\.pdb$', pdb_file) is not None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def skip_unchanged(pdbs, manifest, options):
+    '''Returns the PDBs that are new or changed since the last run, the
+    (lib PDB, cache file) of the unchanged lib PDBs and the unchanged indexed
+    PDBs'''
+    changed = []
+    lib_caches = []
+    indexed = []
     for pdb_file in pdbs:
-        # First exclude the default vcNNN.pdb files, they are from the compiler
-        internal_pdb = re.match(r'.*\\vc\d+\.pdb$', pdb_file)
-        if internal_pdb:
-            print(f'Skipping {pdb_file}')
+        if pdb_file == options.under_test:
+            changed.append(pdb_file)
+            continue
+        outcome, cache_file = manifest.get_outcome(pdb_file)
+        if outcome is None:
+            changed.append(pdb_file)
+            continue
+        if outcome == stageManifest.LIB_CACHE_FILE:
+            lib_caches.append((pdb_file, cache_file))
             continue
-        # First check if srctool returns anything - then it is NOT a lib-PDB
-        exe_files = prepPDB.get_non_indexed_files(pdb_file, srcsrv, options)
-        if exe_files:
+        if outcome == stageManifest.INDEXED:
+            indexed.append(pdb_file)
+        if options.verbose:
+            print(f'{pdb_file} unchanged ({outcome}) - skipping')
+
+    skipped = len(pdbs) - len(changed)
+    print(f'{skipped} of {len(pdbs)} PDB:s unchanged since the last run')
+    return changed, lib_caches, indexed
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_cache_files(root, options):
+    '''The vcs_cache file of --cache_format, and that of the other format'''
+    json_file = os.path.join(root, simur.VCS_CACHE_FILE_NAME)
+    pack_file = os.path.join(root, simur.VCS_PACK_FILE_NAME)
+    if options.cache_format == 'pack':
+        return pack_file, json_file
+    return json_file, pack_file
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def keep_unchanged_files(cache_files, indexed_pdbs, vcs_cache, srcsrv):
+    '''
+    The files of the skipped, indexed PDBs are only in the last vcs_cache -
+    take the entries that their srcsrv streams list from there, and not
+    those of PDBs that are gone or have been indexed again.  The last run
+    may have written it in the other --cache_format
+    '''
+    kept = set()
+    for pdb_file in indexed_pdbs:
+        kept.update(prepPDB.get_indexed_files(pdb_file, srcsrv))
+    if not kept:
+        return
+    last_cache_file = None
+    for cache_file in cache_files:
+        if os.path.exists(cache_file):
+            last_cache_file = cache_file
+            break
+    if last_cache_file is None:
+        print(f'Warning: no vcs_cache of the last run, the files of'
+              f' {len(indexed_pdbs)} unchanged indexed PDB:s are not kept')
+        return
+    for path, cache_entry in vcsPack.iter_vcs_data(last_cache_file):
+        if path in kept:
+            vcs_cache.setdefault(path, cache_entry)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def classify_pdb(pdb_file, cvdump, srcsrv, options):
+    '''Returns the kind of PDB ('exe', 'lib', 'indexed' or None) and its
+    source files'''
+    # First exclude the default vcNNN.pdb files, they are from the compiler
+    if is_internal_pdb(pdb_file):
+        print(f'Skipping {pdb_file}')
+        return None, []
+    # First check if srctool returns anything - then it is NOT a lib-PDB
+    exe_files = prepPDB.get_non_indexed_files(pdb_file, srcsrv, options)
+    if exe_files:
+        if prepPDB.is_indexed(pdb_file, srcsrv, options):
+            return 'indexed', []
+        return 'exe', exe_files
+    if cvdump:
+        files = libSrcTool.get_cvdump_files(pdb_file, cvdump)
+        # The .pdb contained source files, append it
+        if files:
+            return 'lib', files
+
+    return None, []
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def filter_pdbs(pdbs, cvdump, srcsrv, checkpoint, options):
+    lib_pdbs = []
+    exe_pdbs = []
+    sources = {}
+
+    def classify(pdb_file):
+        # Recorded at once, so they are kept if the run is interrupted
+        kind, files = classify_pdb(pdb_file, cvdump, srcsrv, options)
+        if kind == 'indexed':
+            stageManifest.record(pdb_file, stageManifest.INDEXED)
+        elif kind is None and cvdump and not is_internal_pdb(pdb_file):
+            # Without cvdump we cannot tell if it is a lib PDB
+            stageManifest.record(pdb_file, stageManifest.NO_SOURCES)
+        if checkpoint and kind not in ('exe', 'lib'):
+            checkpoint.mark_done(pdb_file, 0)   # Nothing more to do
+        return kind, files
+
+    kinds = run_on_pool(classify, pdbs, options)
+    for pdb_file, (kind, files) in zip(pdbs, kinds):
+        if kind == 'exe':
             exe_pdbs.append(pdb_file)
-        elif cvdump:
-            commando = [cvdump, pdb_file]
-            raw_data, _exit_code = simur.run_process(commando, True)
-            files = libSrcTool.process_raw_cvdump_data(raw_data)
-            # The .pdb contained source files, append it
-            if files:
-                lib_pdbs.append(pdb_file)
+        elif kind == 'lib':
+            lib_pdbs.append(pdb_file)
+        if kind:
+            sources[pdb_file] = files   # Empty for those already indexed
 
-    return lib_pdbs, exe_pdbs
+    return lib_pdbs, exe_pdbs, sources
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def plan_snapshots(lib_pdbs, exe_pdbs, sources, svn_cache, git_cache, options):
+    '''
+    Take the snapshots of all the repositories the PDBs will need up front,
+    in one parallel burst instead of one at a time in the middle of things
+    '''
+    files = []
+    for lib_pdb in lib_pdbs:
+        # Those with cached data will not be looked up
+        if not prepPDB.check_indexed_lib(lib_pdb):
+            files.extend(sources[lib_pdb])
+    for exe_pdb in exe_pdbs:
+        files.extend(sources[exe_pdb])
+
+    prepPDB.snapshot_repositories(files, svn_cache, git_cache, options)
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
 def accumulate_processed(options):
     '''
-    Look up all files ending with VCS_CACHE_PATTERN ('.simur.json')
-    take out the contents and put in vcs_imports dictionary
+    Look up all files ending with VCS_CACHE_PATTERN ('.simur.json') or
+    VCS_PACK_PATTERN ('.simur.pack') take out the contents and put in
+    vcs_imports dictionary
     '''
     vcs_imports = {}
     caching_files = []
     roots = options.processed_dir.split(';')
 
+    patterns = (simur.VCS_CACHE_PATTERN, simur.VCS_PACK_PATTERN)
     for the_dir in roots:
-        simur_files = list_all_files(the_dir, simur.VCS_CACHE_PATTERN)
-        caching_files.extend(simur_files)
+        simur_files = treeScan.find_files([the_dir], patterns)
+        for pattern in patterns:
+            caching_files.extend(simur_files[pattern])
+
+    # --imports_index, only read what has changed since the last run
+    if options.imports_index is not None:
+        index_file = options.imports_index
+        if not index_file:
+            index_file = importsIndex.get_default_index_file(roots)
+        return importsIndex.open_index(index_file, caching_files,
+                                       options.verbose)
 
     for cache_file in caching_files:
         if options.verbose:
             print(f'Take vcs exports from {cache_file}')
-        in_data = simur.load_json_data(cache_file)
-        vcs_imports.update(in_data)
+        vcs_imports.update(vcsPack.iter_vcs_data(cache_file))
 
     return vcs_imports
 
@@ -208,70 +416,138 @@ def make_log(srcsrv, explicit_cvdump, elapsed):
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def main():
-    options = parse_arguments()
-    start = time.time()
-
+def index_pdbs(pdbs, found_cvdump, start, options):
     root = options.target_dir
-    cvdump = options.cvdump_path
     srcsrv = options.srcsrv_dir
     debug_level = options.debug_level
 
-    if prepPDB.check_winkits(srcsrv, options):
-        return 3
-    found_cvdump = libSrcTool.check_cvdump(cvdump, srcsrv)
+    # --manifest - only look at what is new or changed since the last run
+    lib_caches = []
+    indexed_pdbs = []
+    if options.manifest is not None:
+        manifest_file = options.manifest or \
+            os.path.join(root, stageManifest.MANIFEST_FILE_NAME)
+        manifest = stageManifest.open_manifest(manifest_file, root)
+        manifest.keep_only(pdbs)
+        pdbs, lib_caches, indexed_pdbs = skip_unchanged(pdbs, manifest,
+                                                        options)
 
-    pdbs = list_all_files(root, ".pdb")
-    if len(pdbs) == 0:
-        print(f'No PDB:s found in directory {root}')
-        return 3
-
-    # If there is no cvdump, then we won't filter out any lib_pdb:s either
-    lib_pdbs, exe_pdbs = filter_pdbs(pdbs, found_cvdump, srcsrv, options)
-    # --under_test - only process an explicit pdb file
-    if options.under_test:
-        if options.under_test in exe_pdbs:
-            lib_pdbs = []
-            exe_pdbs = [options.under_test]
-        else:
-            print(f'Could not find {options.under_test} in directory {root}')
-            return 3
+    vcs_cache = {}
+    svn_cache = vcsRoots.RootCache()
+    git_cache = vcsRoots.RootCache()
 
+    # --resume - take what a run that did not finish had done
+    checkpoint = None
     outcome = 0
-    vcs_cache = {}
-    svn_cache = {}
-    git_cache = {}
-    vcs_imports = {}
+    checkpoint_interval = options.checkpoint_interval
+    if checkpoint_interval is None:
+        checkpoint_interval = 0
+        if options.resume:
+            checkpoint_interval = runCheckpoint.DEFAULT_INTERVAL
+    if checkpoint_interval > 0 or options.resume:
+        checkpoint = runCheckpoint.Checkpoint(
+            os.path.join(root, runCheckpoint.CHECKPOINT_DIR_NAME), options,
+            checkpoint_interval)
+    if options.resume and checkpoint.load(vcs_cache, svn_cache, git_cache):
+        print(f'Resuming with {len(checkpoint.done)} PDB:s done and'
+              f' {len(svn_cache) + len(git_cache)} snapshots taken')
+        pdbs = [pdb for pdb in pdbs if pdb not in checkpoint.done]
+        outcome = sum(checkpoint.done.values())
 
-    # If anything from options.processed_dir (-p), then take their
-    # outputs (vcs_cache) and use as imports
-    if options.processed_dir:
-        vcs_imports = accumulate_processed(options)
-
-    if found_cvdump:
-        for lib_pdb in lib_pdbs:
-            print(f'---\nProcessing library {lib_pdb}')
-            outcome += prepPDB.prep_lib_pdb(lib_pdb,
-                                            srcsrv,
-                                            found_cvdump,
-                                            vcs_cache,
-                                            vcs_imports,
-                                            svn_cache,
-                                            git_cache,
-                                            options)
+    vcs_imports = {}
 
-    for exe_pdb in exe_pdbs:
+    def pdb_done(pdb_file, pdb_outcome):
+        if checkpoint:
+            checkpoint.mark_done(pdb_file, pdb_outcome)
+            checkpoint.save_if_due(vcs_cache, svn_cache, git_cache)
+        return pdb_outcome
+
+    # All the lib_pdbs must be done before the exe_pdbs, since the exe_pdbs
+    # use what the lib_pdbs have put into the vcs_cache
+    def do_lib_pdb(lib_pdb):
+        print(f'---\nProcessing library {lib_pdb}')
+        return pdb_done(lib_pdb, prepPDB.prep_lib_pdb(lib_pdb,
+                                                      srcsrv,
+                                                      found_cvdump,
+                                                      vcs_cache,
+                                                      vcs_imports,
+                                                      svn_cache,
+                                                      git_cache,
+                                                      options))
+
+    def do_exe_pdb(exe_pdb):
         print(f'---\nProcessing executable {exe_pdb}')
-        outcome += prepPDB.prep_exe_pdb(exe_pdb,
-                                        srcsrv,
-                                        vcs_cache,
-                                        vcs_imports,
-                                        svn_cache,
-                                        git_cache,
-                                        options)
+        return pdb_done(exe_pdb, prepPDB.prep_exe_pdb(exe_pdb,
+                                                      srcsrv,
+                                                      vcs_cache,
+                                                      vcs_imports,
+                                                      svn_cache,
+                                                      git_cache,
+                                                      options))
+
+    try:
+        # If there is no cvdump, then we won't filter out any lib_pdb:s either
+        lib_pdbs, exe_pdbs, sources = filter_pdbs(pdbs, found_cvdump, srcsrv,
+                                                  checkpoint, options)
+        # --under_test - only process an explicit pdb file
+        if options.under_test:
+            if options.under_test in exe_pdbs:
+                lib_pdbs = []
+                exe_pdbs = [options.under_test]
+            elif options.under_test in sources and \
+                options.under_test not in lib_pdbs:
+                lib_pdbs = []           # Already indexed
+                exe_pdbs = []
+            else:
+                print(f'Could not find {options.under_test} in directory'
+                      f' {root}')
+                return 3
+
+        # If anything from options.processed_dir (-p), then take their
+        # outputs (vcs_cache) and use as imports
+        if options.processed_dir:
+            vcs_imports = accumulate_processed(options)
+
+        # The unchanged lib PDBs, their files are still needed by the exe PDBs
+        for lib_pdb, cache_file in lib_caches:
+            if options.verbose:
+                print(f'{lib_pdb} unchanged - taking cached data from'
+                      f' {cache_file}')
+            prepPDB.merge_vcs_data(vcs_cache, cache_file)
+
+        if options.root_dir_cache:
+            vcsRoots.root_dirs.load(options.root_dir_cache)
+
+        # The store is the source of truth for the snapshots, unchanged
+        # working copies are taken from it instead of being listed again
+        if options.vcs_store is not None:
+            store_file = options.vcs_store or vcsStore.get_default_store_file()
+            vcsStore.open_store(store_file)
+
+        plan_snapshots(lib_pdbs, exe_pdbs, sources, svn_cache, git_cache,
+                       options)
+        if checkpoint:
+            # The snapshots are what takes the time, keep them at once
+            checkpoint.save(vcs_cache, svn_cache, git_cache)
+
+        if found_cvdump:
+            outcome += sum(run_on_pool(do_lib_pdb, largest_first(lib_pdbs),
+                                       options))
+
+        outcome += sum(run_on_pool(do_exe_pdb, largest_first(exe_pdbs),
+                                   options))
+    except KeyboardInterrupt:
+        if checkpoint:
+            checkpoint.save(vcs_cache, svn_cache, git_cache)
+            print(f'Interrupted - run {MY_NAME} again with --resume to'
+                  ' continue')
+        return 3
+    finally:
+        if isinstance(vcs_imports, importsIndex.ImportsIndex):
+            vcs_imports.close()
 
     end = time.time()
-    make_log(srcsrv, cvdump, end - start)
+    make_log(srcsrv, options.cvdump_path, end - start)
     # Store the directories where we found our 'roots'
     # This can be used for checking if we have un-committed changes
     roots = {}
@@ -280,8 +556,20 @@ def main():
     repo_file = os.path.join(root, 'repo_roots.json')
     simur.store_json_data(repo_file, roots)
 
-    cache_file = os.path.join(root, simur.VCS_CACHE_FILE_NAME)
-    simur.store_json_data(cache_file, vcs_cache)
+    cache_file, other_cache_file = get_cache_files(root, options)
+    if indexed_pdbs:
+        keep_unchanged_files((cache_file, other_cache_file), indexed_pdbs,
+                             vcs_cache, srcsrv)
+    vcsPack.store_vcs_data(cache_file, vcs_cache)
+    if os.path.exists(other_cache_file):
+        # Stale, and -p would take it too
+        os.remove(other_cache_file)
+    stageManifest.commit()          # The files of the indexed PDBs are kept
+    if checkpoint:
+        checkpoint.remove()             # All done
+
+    if options.root_dir_cache:
+        vcsRoots.root_dirs.store(options.root_dir_cache)
 
     if debug_level > 4:
         svn_file = os.path.join(root, 'svn_cache.json')
@@ -291,6 +579,40 @@ def main():
 
     return outcome
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def main():
+    options = parse_arguments()
+    start = time.time()
+
+    root = options.target_dir
+    cvdump = options.cvdump_path
+    srcsrv = options.srcsrv_dir
+
+    native = options.stream_writer == 'native'
+    if prepPDB.check_winkits(srcsrv, options, native):
+        return 3
+    found_cvdump = libSrcTool.check_cvdump(cvdump, srcsrv)
+
+    treeScan.the_scanner = treeScan.TreeScanner(
+        treeScan.PRUNE_DIRS + tuple(options.prune_dir), options.scan_jobs)
+    # One pass, the stats of the lib caches are used by check_indexed_lib
+    found = treeScan.find_files([root], ['.pdb', simur.VCS_CACHE_PATTERN,
+                                         simur.VCS_PACK_PATTERN])
+    pdbs = found['.pdb']
+    if len(pdbs) == 0:
+        print(f'No PDB:s found in directory {root}')
+        return 3
+
+    try:
+        return index_pdbs(pdbs, found_cvdump, start, options)
+    finally:
+        # Also if it fails or is interrupted, what was done is kept (but not
+        # the indexed PDBs, unless their files got into the vcs_cache)
+        vcsStore.close_store()
+        stageManifest.close_manifest()
+
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
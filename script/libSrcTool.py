@@ -6,6 +6,8 @@ import os
 import shutil
 import sys
 
+import pdbMsf
+import pdbProbe
 import simur
 import prepPDB
 
@@ -66,8 +68,14 @@ def process_raw_cvdump_data(raw_data):
     C:\Program Files (x86)\Microsoft Visual Studio\2019\Professional\VC\Tools\MSVC\14.29.30133\include\functional
     No sub string
     '''
+    return process_cvdump_lines(raw_data.splitlines())
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def process_cvdump_lines(lines):
+    '''process_raw_cvdump_data() on the lines, as cvdump writes them'''
     files = []
-    lines = raw_data.splitlines()
     next_line = False
     for line in lines:
         if next_line:
@@ -83,6 +91,23 @@ def process_raw_cvdump_data(raw_data):
 
     return files
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_string_id_files(pdb_file):
+    '''The same files as process_raw_cvdump_data() finds in the cvdump output,
+    straight from the IPI stream of the pdb.  None if it cannot be read'''
+    files = []
+    try:
+        for string_id in pdbMsf.iter_string_ids(pdb_file):
+            file_in_spe = string_id.strip()
+            if os.path.isfile(file_in_spe):
+                files.append(file_in_spe)
+    except pdbMsf.MSF_ERRORS:
+        return None
+
+    return files
+
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
@@ -92,10 +117,32 @@ def get_lib_source_files(pdb_file, cvdump, srcsrv, options):
     if srctool_files:
         print(f'{pdb_file} is not a lib-PDB file - skipped')
         return []
+    files = get_cvdump_files(pdb_file, cvdump)
+    return files
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_cvdump_files(pdb_file, cvdump):
+    # cvdump is asked once per pdb and run, see pdbProbe
+    return pdbProbe.ask(pdb_file, 'cvdump',
+                        lambda: read_cvdump_files(pdb_file, cvdump))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_cvdump_files(pdb_file, cvdump):
+    # Walk the LF_STRING_ID records ourselves, cvdump only if we cannot
+    files = read_string_id_files(pdb_file)
+    if files is not None:
+        return files
+
     commando = [cvdump, pdb_file]
-    raw_data, _exit_code = simur.run_process(commando, True)
+    lines = simur.run_process_lines(commando, True)
 
-    files = process_raw_cvdump_data(raw_data)
+    files = process_cvdump_lines(lines)
+    if lines.failed:
+        return []                       # Only a part of them, if any
     return files
 
 #-------------------------------------------------------------------------------
@@ -0,0 +1,709 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import locale
+import mmap
+import os
+import struct
+import uuid
+
+#-------------------------------------------------------------------------------
+# Read a PDB (an MSF 7.0 'multi stream file') in-process, instead of asking
+# pdbstr.exe and srctool.exe, see
+# https://llvm.org/docs/PDB/MsfFile.html
+# https://llvm.org/docs/PDB/PdbStream.html
+# https://llvm.org/docs/PDB/DbiStream.html
+#-------------------------------------------------------------------------------
+MSF_MAGIC = b'Microsoft C/C++ MSF 7.00\r\n\x1aDS\0\0\0'
+SUPERBLOCK = struct.Struct('<32sIIIIII')
+NIL_STREAM = 0xffffffff
+FPM_BLOCKS = (1, 2)             # Of every block_size blocks
+
+PDB_STREAM = 1
+DBI_STREAM = 3
+IPI_STREAM = 4
+PDB_HEADER_SIZE = 28            # Version, Signature, Age, Guid
+PDB_HEADER = struct.Struct('<III16s')
+SRCSRV_STREAM_NAME = 'srcsrv'
+NAMES_STREAM_NAME = '/names'
+NAMES_HEADER_SIZE = 12          # Signature, HashVersion, ByteSize
+IPI_HEADER = struct.Struct('<IIIII')    # Version, HeaderSize, TypeIndexBegin,
+                                        # TypeIndexEnd, TypeRecordBytes
+LF_STRING_ID = 0x1605
+
+DBI_HEADER = struct.Struct('<iIIHHHHHHiiiiiIiiHHI')
+MOD_INFO_SIZE = 64              # Up to the module and object names
+MOD_INFO = struct.Struct('<I28sHHIIIHHIII')
+NO_MODULE_STREAM = 0xffff
+DEBUG_S_FILECHKSMS = 0xf4
+DEBUG_S_IGNORE = 0x80000000
+
+# What a broken or unexpected PDB may raise while we read it
+MSF_ERRORS = (OSError, struct.error, IndexError, ValueError)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class MsfError(ValueError):
+    pass
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def align4(pos):
+    return (pos + 3) & ~3
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_cstring(data, pos):
+    end = data.find(b'\0', pos)
+    if end < 0:
+        raise MsfError('unterminated string')
+    return bytes(data[pos:end]).decode('utf-8', errors='replace'), end + 1
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def blocks_needed(size, block_size):
+    return (size + block_size - 1) // block_size
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class MsfFile:
+    '''A memory mapped, read only view of the streams in a PDB'''
+    def __init__(self, pdb_file):
+        self.pdb_file = pdb_file
+        self._fp = open(pdb_file, 'rb')
+        try:
+            self._data = mmap.mmap(self._fp.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        except ValueError:              # Empty file
+            self._fp.close()
+            raise MsfError(f'{pdb_file} is empty')
+        try:
+            self._read_directory()
+        except MsfError:
+            self.close()
+            raise
+        except (struct.error, IndexError, ValueError) as e:
+            self.close()
+            raise MsfError(f'{pdb_file} is not a valid MSF file: {e}')
+        self._named_streams = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exception):
+        self.close()
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._fp.close()
+
+    def _read_directory(self):
+        data = self._data
+        if len(data) < SUPERBLOCK.size or data[:32] != MSF_MAGIC:
+            raise MsfError(f'{self.pdb_file} is not an MSF 7.0 file')
+        (_magic, self.block_size, self.fpm_block, self.num_blocks,
+         self.directory_size, _unknown, self.block_map_block) = \
+            SUPERBLOCK.unpack_from(data, 0)
+        if self.block_size not in (512, 1024, 2048, 4096, 8192, 16384, 32768):
+            raise MsfError(f'{self.pdb_file} has a bad block size')
+
+        # The block map lists the blocks of the stream directory
+        no_of_dir_blocks = blocks_needed(self.directory_size, self.block_size)
+        map_offset = self.block_map_block * self.block_size
+        self.directory_blocks = list(struct.unpack_from(
+            f'<{no_of_dir_blocks}I', data, map_offset))
+        directory = self._read_blocks(self.directory_blocks,
+                                      self.directory_size)
+
+        no_of_streams, = struct.unpack_from('<I', directory, 0)
+        sizes = struct.unpack_from(f'<{no_of_streams}I', directory, 4)
+        pos = 4 + 4 * no_of_streams
+        self.stream_sizes = []
+        self.stream_blocks = []
+        for size in sizes:
+            if size == NIL_STREAM:
+                no_of_blocks = 0
+            else:
+                no_of_blocks = blocks_needed(size, self.block_size)
+            blocks = struct.unpack_from(f'<{no_of_blocks}I', directory, pos)
+            pos += 4 * no_of_blocks
+            self.stream_sizes.append(size)
+            self.stream_blocks.append(list(blocks))
+
+    def _read_blocks(self, blocks, size):
+        chunks = []
+        for block in blocks:
+            if block >= self.num_blocks:
+                raise MsfError(f'{self.pdb_file} refers to block {block}')
+            offset = block * self.block_size
+            chunks.append(self._data[offset:offset + self.block_size])
+        return b''.join(chunks)[:size]
+
+    def get_no_of_streams(self):
+        return len(self.stream_sizes)
+
+    def get_stream_size(self, index):
+        size = self.stream_sizes[index]
+        return 0 if size == NIL_STREAM else size
+
+    def has_stream(self, index):
+        return index < len(self.stream_sizes) and \
+            self.stream_sizes[index] != NIL_STREAM
+
+    def read_stream(self, index):
+        if not self.has_stream(index):
+            return b''
+        return self._read_blocks(self.stream_blocks[index],
+                                 self.stream_sizes[index])
+
+    def iter_stream_chunks(self, index):
+        '''The stream a block at a time, without reading all of it'''
+        if not self.has_stream(index):
+            return
+        remaining = self.stream_sizes[index]
+        for block in self.stream_blocks[index]:
+            offset = block * self.block_size
+            length = min(remaining, self.block_size)
+            yield memoryview(self._data)[offset:offset + length]
+            remaining -= length
+
+    #---------------------------------------------------------------------------
+    # The PDB stream (1) - the named streams such as 'srcsrv' and '/names'
+    #---------------------------------------------------------------------------
+    def get_named_streams(self):
+        '''dict on stream name -> stream index'''
+        if self._named_streams is None:
+            self._named_streams = parse_named_streams(
+                self.read_stream(PDB_STREAM))[0]
+        return self._named_streams
+
+    def get_signature(self):
+        '''The GUID and age that the PDB shares with its exe/dll, as
+        "<guid><age>" like the symbol servers do'''
+        pdb_stream = self.read_stream(PDB_STREAM)
+        if len(pdb_stream) < PDB_HEADER.size:
+            raise MsfError('The PDB stream is too short')
+        _version, _signature, age, guid = PDB_HEADER.unpack_from(pdb_stream, 0)
+        return f'{uuid.UUID(bytes_le=guid).hex.upper()}{age:X}'
+
+    def read_named_stream(self, name):
+        index = self.get_named_streams().get(name)
+        if index is None or not self.has_stream(index):
+            return None
+        return self.read_stream(index)
+
+    #---------------------------------------------------------------------------
+    # The DBI stream (3) - what srctool -r lists
+    #---------------------------------------------------------------------------
+    def get_source_files(self):
+        '''The source files of the modules, each name once'''
+        dbi = self.read_stream(DBI_STREAM)
+        if len(dbi) < DBI_HEADER.size:
+            return []
+        header = DBI_HEADER.unpack_from(dbi, 0)
+        mod_info_size, section_contr_size, section_map_size, \
+            source_info_size = header[9:13]
+
+        mod_info_start = DBI_HEADER.size
+        source_info_start = mod_info_start + mod_info_size + \
+            section_contr_size + section_map_size
+        source_info = dbi[source_info_start:
+                          source_info_start + source_info_size]
+        files = parse_source_info(source_info)
+        if not files:
+            # Nothing in the DBI, try the file checksums of the modules
+            module_streams = parse_module_streams(
+                dbi[mod_info_start:mod_info_start + mod_info_size])
+            files = self.get_checksum_files(module_streams)
+
+        return list(dict.fromkeys(files))
+
+    #---------------------------------------------------------------------------
+    # The IPI stream (4) - what cvdump lists as LF_STRING_ID
+    #---------------------------------------------------------------------------
+    def iter_string_ids(self):
+        '''The strings of the LF_STRING_ID records, read a block at a time'''
+        chunks = self.iter_stream_chunks(IPI_STREAM)
+        pending = bytearray()
+        for chunk in chunks:
+            pending += chunk
+            if len(pending) >= IPI_HEADER.size:
+                break
+        if len(pending) < IPI_HEADER.size:
+            return
+        _version, header_size, _begin, _end, record_bytes = \
+            IPI_HEADER.unpack_from(pending, 0)
+        del pending[:header_size]
+        remaining = record_bytes
+
+        while True:
+            # Each record is a length (not counting itself), kind and data
+            pos = 0
+            while pos + 4 <= len(pending) and pos < remaining:
+                length, kind = struct.unpack_from('<HH', pending, pos)
+                end = pos + 2 + length
+                if end > len(pending):
+                    break
+                if kind == LF_STRING_ID:
+                    nul = pending.find(b'\0', pos + 8, end)
+                    if nul < 0:
+                        raise MsfError('unterminated LF_STRING_ID')
+                    yield pending[pos + 8:nul].decode('utf-8', errors='replace')
+                pos = end
+            del pending[:pos]
+            remaining -= pos
+            if remaining <= 0:
+                return
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            pending += chunk
+
+    def get_checksum_files(self, module_streams):
+        names = self.read_named_stream(NAMES_STREAM_NAME)
+        if not names:
+            return []
+        names = names[NAMES_HEADER_SIZE:]
+        files = []
+        for stream, sym_size, c11_size, c13_size in module_streams:
+            c13_start = sym_size + c11_size
+            module = self.read_stream(stream)
+            c13 = module[c13_start:c13_start + c13_size]
+            for offset in parse_checksum_offsets(c13):
+                name, _end = read_cstring(names, offset)
+                files.append(name)
+        return files
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_bit_vector(data, pos):
+    no_of_words, = struct.unpack_from('<I', data, pos)
+    words = struct.unpack_from(f'<{no_of_words}I', data, pos + 4)
+    return list(words), pos + 4 + 4 * no_of_words
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_bit_set(words, bit):
+    word = bit // 32
+    return word < len(words) and bool(words[word] & (1 << (bit % 32)))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def parse_named_streams(pdb_stream):
+    '''
+    The named stream map after the PDB stream header: a string buffer and a
+    hash table of (offset of name in string buffer -> stream index).
+    Returns (dict on name -> index, (start, end) of the map in pdb_stream)
+    '''
+    pos = PDB_HEADER_SIZE
+    string_size, = struct.unpack_from('<I', pdb_stream, pos)
+    pos += 4
+    strings = pdb_stream[pos:pos + string_size]
+    pos += string_size
+    _size, capacity = struct.unpack_from('<II', pdb_stream, pos)
+    pos += 8
+    present, pos = read_bit_vector(pdb_stream, pos)
+    _deleted, pos = read_bit_vector(pdb_stream, pos)
+
+    streams = {}
+    for bucket in range(capacity):
+        if not is_bit_set(present, bucket):
+            continue
+        name_offset, index = struct.unpack_from('<II', pdb_stream, pos)
+        pos += 8
+        name, _end = read_cstring(strings, name_offset)
+        streams[name] = index
+
+    return streams, (PDB_HEADER_SIZE, pos)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def parse_source_info(source_info):
+    '''The file info substream of the DBI: the file names per module'''
+    if len(source_info) < 4:
+        return []
+    no_of_modules, = struct.unpack_from('<H', source_info, 0)
+    pos = 4 + 2 * no_of_modules     # Skip the (unused) module indices
+    file_counts = struct.unpack_from(f'<{no_of_modules}H', source_info, pos)
+    pos += 2 * no_of_modules
+    no_of_files = sum(file_counts)
+    offsets = struct.unpack_from(f'<{no_of_files}I', source_info, pos)
+    names = source_info[pos + 4 * no_of_files:]
+
+    files = []
+    for offset in offsets:
+        name, _end = read_cstring(names, offset)
+        files.append(name)
+    return files
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def parse_module_streams(mod_info):
+    '''(stream, symbol size, C11 size, C13 size) of each module'''
+    modules = []
+    pos = 0
+    while pos + MOD_INFO_SIZE <= len(mod_info):
+        fields = MOD_INFO.unpack_from(mod_info, pos)
+        stream, sym_size, c11_size, c13_size = fields[3:7]
+        _module_name, pos = read_cstring(mod_info, pos + MOD_INFO_SIZE)
+        _object_name, pos = read_cstring(mod_info, pos)
+        pos = align4(pos)
+        if stream != NO_MODULE_STREAM:
+            modules.append((stream, sym_size, c11_size, c13_size))
+    return modules
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def parse_checksum_offsets(c13):
+    '''The /names offsets in the DEBUG_S_FILECHKSMS subsections'''
+    offsets = []
+    pos = 0
+    while pos + 8 <= len(c13):
+        kind, length = struct.unpack_from('<II', c13, pos)
+        pos += 8
+        if kind & ~DEBUG_S_IGNORE == DEBUG_S_FILECHKSMS and \
+            not kind & DEBUG_S_IGNORE:
+            entry = pos
+            while entry + 6 <= pos + length:
+                name_offset, checksum_size = struct.unpack_from('<IB', c13,
+                                                                entry)
+                offsets.append(name_offset)
+                entry = align4(entry + 6 + checksum_size)
+        pos = align4(pos + length)
+    return offsets
+
+#-------------------------------------------------------------------------------
+# Write named streams, instead of pdbstr -w.  The new stream data, PDB stream
+# and stream directory go into free blocks of the PDB itself and the superblock
+# is rewritten to point at them - the blocks of the other streams are left as
+# they are, so a large PDB is never copied.
+#-------------------------------------------------------------------------------
+def hash_string_v1(name):
+    '''The hash of the named stream map, hashStringV1 in the PDB sources'''
+    data = name.encode('utf-8')
+    result = 0
+    no_of_longs = len(data) // 4
+    for long_value in struct.unpack_from(f'<{no_of_longs}I', data, 0):
+        result ^= long_value
+    pos = 4 * no_of_longs
+    if len(data) - pos >= 2:
+        result ^= struct.unpack_from('<H', data, pos)[0]
+        pos += 2
+    if len(data) - pos == 1:
+        result ^= data[pos]
+    result |= 0x20202020
+    result ^= result >> 11
+    result ^= result >> 16
+    return result & 0xffffffff
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_bit_vector(bits, no_of_bits):
+    words = [0] * ((no_of_bits + 31) // 32)
+    for bit in bits:
+        words[bit // 32] |= 1 << (bit % 32)
+    return struct.pack(f'<I{len(words)}I', len(words), *words)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_named_streams(streams):
+    '''The named stream map of streams, a dict on name -> stream index'''
+    strings = b''
+    name_offsets = {}
+    for name in streams:
+        name_offsets[name] = len(strings)
+        strings += name.encode('utf-8') + b'\0'
+
+    # Keep the load below 2/3, as the PDB sources do
+    capacity = 8
+    while len(streams) >= capacity * 2 // 3 + 1:
+        capacity *= 2
+    buckets = [None] * capacity
+    for name, index in streams.items():
+        bucket = (hash_string_v1(name) & 0xffff) % capacity
+        while buckets[bucket] is not None:
+            bucket = (bucket + 1) % capacity
+        buckets[bucket] = (name_offsets[name], index)
+
+    present = [bucket for bucket in range(capacity) if buckets[bucket]]
+    named_map = struct.pack('<I', len(strings)) + strings
+    named_map += struct.pack('<II', len(streams), capacity)
+    named_map += make_bit_vector(present, capacity)
+    named_map += make_bit_vector([], 0)     # Nothing deleted
+    for bucket in present:
+        named_map += struct.pack('<II', *buckets[bucket])
+    return named_map
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_fpm_block(block, block_size):
+    return block % block_size in FPM_BLOCKS
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class MsfLayout:
+    '''The streams of an MsfFile that we are about to change'''
+    def __init__(self, msf):
+        self.block_size = msf.block_size
+        self.fpm_block = msf.fpm_block
+        self.num_blocks = msf.num_blocks
+        self.stream_sizes = list(msf.stream_sizes)
+        self.stream_blocks = [list(blocks) for blocks in msf.stream_blocks]
+        self.old_blocks = set(msf.directory_blocks) | {msf.block_map_block}
+        self.new_data = {}              # dict on block -> bytes to write
+        self._free = None
+
+    def get_used_blocks(self):
+        used = {0}
+        for blocks in self.stream_blocks:
+            used.update(blocks)
+        for interval in range(0, self.num_blocks, self.block_size):
+            used.update(interval + fpm_block for fpm_block in FPM_BLOCKS)
+        return used
+
+    def allocate(self, no_of_blocks):
+        '''Blocks that nothing uses, at the end of the file if none'''
+        if self._free is None:
+            # Neither those of the streams that we replace nor the old stream
+            # directory, the file is consistent until the superblock is written
+            used = self.get_used_blocks() | self.old_blocks
+            self._free = [block for block in range(self.num_blocks - 1, 0, -1)
+                          if block not in used and
+                          not is_fpm_block(block, self.block_size)]
+        blocks = []
+        while len(blocks) < no_of_blocks:
+            if self._free:
+                blocks.append(self._free.pop())
+                continue
+            block = self.num_blocks
+            self.num_blocks += 1
+            if not is_fpm_block(block, self.block_size):
+                blocks.append(block)
+        return blocks
+
+    def put_blocks(self, data):
+        blocks = self.allocate(blocks_needed(len(data), self.block_size))
+        for i, block in enumerate(blocks):
+            chunk = data[i * self.block_size:(i + 1) * self.block_size]
+            self.new_data[block] = chunk.ljust(self.block_size, b'\0')
+        return blocks
+
+    def set_stream(self, index, data):
+        while len(self.stream_sizes) <= index:
+            self.stream_sizes.append(NIL_STREAM)
+            self.stream_blocks.append([])
+        self.stream_sizes[index] = len(data)
+        self.stream_blocks[index] = self.put_blocks(data)
+
+    def make_directory(self):
+        directory = struct.pack('<I', len(self.stream_sizes))
+        directory += struct.pack(f'<{len(self.stream_sizes)}I',
+                                 *self.stream_sizes)
+        for blocks in self.stream_blocks:
+            directory += struct.pack(f'<{len(blocks)}I', *blocks)
+        return directory
+
+    def make_fpm(self, used):
+        '''The free page map, a set bit is a free block'''
+        fpm = bytearray(b'\xff' * blocks_needed(self.num_blocks, 8))
+        for block in used:
+            if block >= self.num_blocks:
+                continue
+            fpm[block // 8] &= ~(1 << (block % 8)) & 0xff
+        return fpm
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def update_named_streams(msf, layout, streams):
+    '''Put streams, a dict on name -> bytes, into the layout'''
+    pdb_stream = msf.read_stream(PDB_STREAM)
+    named_streams, (map_start, map_end) = parse_named_streams(pdb_stream)
+    for name, data in streams.items():
+        index = named_streams.get(name)
+        if index is None:
+            index = len(layout.stream_sizes)
+            named_streams[name] = index
+        layout.set_stream(index, data)
+
+    pdb_stream = pdb_stream[:map_start] + \
+        make_named_streams(named_streams) + pdb_stream[map_end:]
+    layout.set_stream(PDB_STREAM, pdb_stream)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_other_fpm_block(fpm_block):
+    return FPM_BLOCKS[1] if fpm_block == FPM_BLOCKS[0] else FPM_BLOCKS[0]
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def write_layout(fp, layout, directory_blocks):
+    block_size = layout.block_size
+    # New intervals need their free page map blocks
+    fp.seek(0, os.SEEK_END)
+    old_no_of_blocks = fp.tell() // block_size
+    for block in range(old_no_of_blocks, layout.num_blocks):
+        if is_fpm_block(block, block_size):
+            layout.new_data.setdefault(block, b'\xff' * block_size)
+
+    for block in sorted(layout.new_data):
+        fp.seek(block * block_size)
+        fp.write(layout.new_data[block])
+
+    # The free page map is spread over one block in each interval
+    used = layout.get_used_blocks() | set(directory_blocks)
+    fpm = layout.make_fpm(used)
+    for i in range(0, len(fpm), block_size):
+        fpm_block = (i // block_size) * block_size + layout.fpm_block
+        fp.seek(fpm_block * block_size)
+        fp.write(fpm[i:i + block_size])
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def write_named_streams(pdb_file, streams):
+    '''
+    Add or replace the named streams (dict on name -> bytes) of pdb_file, in
+    place.  Only free blocks (or new ones at the end) and the free page map
+    that is not in use are written before the superblock, so a crash before
+    that leaves pdb_file as it was
+    '''
+    with MsfFile(pdb_file) as msf:
+        layout = MsfLayout(msf)
+        update_named_streams(msf, layout, streams)
+
+    directory = layout.make_directory()
+    directory_blocks = layout.put_blocks(directory)
+    if len(directory_blocks) * 4 > layout.block_size:
+        raise MsfError(f'{pdb_file} - the stream directory is too large')
+    block_map = struct.pack(f'<{len(directory_blocks)}I', *directory_blocks)
+    block_map_block = layout.put_blocks(block_map)[0]
+    directory_blocks.append(block_map_block)
+    # Switch free page map, as the PDB sources do on commit
+    layout.fpm_block = get_other_fpm_block(layout.fpm_block)
+
+    with open(pdb_file, 'r+b') as fp:
+        write_layout(fp, layout, directory_blocks)
+        fp.flush()
+        os.fsync(fp.fileno())
+        # Last, point at the new stream directory and free page map
+        fp.seek(0)
+        fp.write(SUPERBLOCK.pack(MSF_MAGIC, layout.block_size,
+                                 layout.fpm_block, layout.num_blocks,
+                                 len(directory), 0, block_map_block))
+        fp.flush()
+        os.fsync(fp.fileno())
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_srcsrv_encoding():
+    '''What the -i: file of pdbstr -w is written in, like any text file: the
+    ANSI code page on Windows'''
+    return locale.getpreferredencoding(False)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def encode_srcsrv_stream(stream):
+    '''The bytes of the -i: file (and so of the stream) that pdbstr -w gets
+    for stream, a list of lines - with CRLF on Windows'''
+    data = ''.join(line + os.linesep for line in stream)
+    return data.encode(get_srcsrv_encoding())
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def write_srcsrv_stream(pdb_file, stream):
+    '''stream is the list of lines that pdbstr -w would get in its -i: file'''
+    write_named_streams(pdb_file,
+                        {SRCSRV_STREAM_NAME: encode_srcsrv_stream(stream)})
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def write_srcsrv_streams(pdb_streams):
+    '''
+    Batch version of write_srcsrv_stream() for (pdb_file, stream) pairs, for
+    those that have the streams of many PDBs at hand.  Returns a list of
+    (pdb_file, error) for those that could not be written
+    '''
+    failures = []
+    for pdb_file, stream in pdb_streams:
+        try:
+            write_srcsrv_stream(pdb_file, stream)
+        except MSF_ERRORS as e:
+            failures.append((pdb_file, str(e)))
+    return failures
+
+#-------------------------------------------------------------------------------
+# The fast paths for prepPDB, None means 'ask the exe instead'
+#-------------------------------------------------------------------------------
+def has_srcsrv_stream(pdb_file):
+    try:
+        with MsfFile(pdb_file) as msf:
+            srcsrv = msf.read_named_stream(SRCSRV_STREAM_NAME)
+    except MSF_ERRORS:
+        return None
+    return bool(srcsrv)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_srcsrv_stream(pdb_file):
+    try:
+        with MsfFile(pdb_file) as msf:
+            srcsrv = msf.read_named_stream(SRCSRV_STREAM_NAME)
+    except MSF_ERRORS:
+        return None
+    if srcsrv is None:
+        return ''
+    return srcsrv.decode(get_srcsrv_encoding(), errors='replace')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_source_files(pdb_file):
+    try:
+        with MsfFile(pdb_file) as msf:
+            return msf.get_source_files()
+    except MSF_ERRORS:
+        return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_signature(pdb_file):
+    try:
+        with MsfFile(pdb_file) as msf:
+            return msf.get_signature()
+    except MSF_ERRORS:
+        return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def iter_string_ids(pdb_file):
+    '''The LF_STRING_ID strings of pdb_file, raises MSF_ERRORS if broken'''
+    with MsfFile(pdb_file) as msf:
+        yield from msf.iter_string_ids()
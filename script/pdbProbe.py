@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import threading
+
+#-------------------------------------------------------------------------------
+# What we have asked srctool, pdbstr and cvdump about each PDB during this run,
+# so that every stage (filter_pdbs, is_indexed, prep_exe_pdb, prep_lib_pdb ...)
+# gets the answer without running the tool again.  The answers are dropped when
+# the PDB changes, e.g. when we have written the srcsrv stream into it.
+#-------------------------------------------------------------------------------
+_probes = {}                # dict on real path -> PdbProbe
+_probes_lock = threading.Lock()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_pdb_stamp(pdb_file):
+    try:
+        stat = os.stat(pdb_file)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class PdbProbe:
+    def __init__(self, stamp):
+        self.stamp = stamp
+        self.answers = {}       # dict on question -> answer
+        self.lock = threading.Lock()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_probe(pdb_file):
+    key = os.path.realpath(pdb_file)
+    stamp = get_pdb_stamp(pdb_file)
+    with _probes_lock:
+        probe = _probes.get(key)
+        if probe is None or probe.stamp != stamp:
+            probe = PdbProbe(stamp)
+            _probes[key] = probe
+    return probe
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def ask(pdb_file, question, compute):
+    '''The answer to question ('srctool', 'indexed', 'cvdump' ...) about the
+    pdb_file - compute() is only called the first time it is asked'''
+    probe = get_probe(pdb_file)
+    with probe.lock:
+        if question not in probe.answers:
+            probe.answers[question] = compute()
+        return probe.answers[question]
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def forget(pdb_file):
+    with _probes_lock:
+        _probes.pop(os.path.realpath(pdb_file), None)
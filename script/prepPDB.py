@@ -2,14 +2,27 @@
 #
 #----------------------------------------------------------------------
 
+import concurrent.futures
 from datetime import datetime
 import os
 import re
 import shutil
 import sys
+import threading
 
+import gitIndex
 import libSrcTool
+import pdbMsf
+import pdbProbe
+import sharedSnapshots
 import simur
+import stageManifest
+import svnWcDb
+import treeScan
+import vcsPack
+import vcsRecords
+import vcsRoots
+import vcsStore
 
 #-------------------------------------------------------------------------------
 #
@@ -58,6 +71,32 @@ def skip_file(file):
 #
 #-------------------------------------------------------------------------------
 def is_indexed(root, srcsrv, options):
+    # pdbstr is asked once per pdb and run, see pdbProbe
+    return pdbProbe.ask(root, 'indexed',
+                        lambda: read_is_indexed(root, srcsrv, options))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_is_indexed(root, srcsrv, options):
+    # Look for the 'srcsrv' stream ourselves, pdbstr only if we cannot read it
+    has_srcsrv = pdbMsf.has_srcsrv_stream(root)
+    if has_srcsrv is None:
+        has_srcsrv = read_is_indexed_with_pdbstr(root, srcsrv, options)
+    elif options.debug_level > 3:
+        print(f'{root} has a srcsrv stream: {has_srcsrv}')
+
+    if not has_srcsrv:
+        return False
+
+    if not options.quiet:
+        print(f'Sorry, {root} is already indexed or has no debug information')
+    return True
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_is_indexed_with_pdbstr(root, srcsrv, options):
     pdbstr = os.path.join(srcsrv, 'pdbstr.exe')
     # read the pdb and dump its 'srcsrv' stream
     # - if there is a stream then it is indexed
@@ -69,28 +108,66 @@ def is_indexed(root, srcsrv, options):
         print(f'{reply = }')
 
     # I will look at an empty reply as not indexed
-    if len(reply) == 0:
-        return False
+    return len(reply) > 0
 
-    if not options.quiet:
-        print(f'Sorry, {root} is already indexed or has no debug information')
-    return True
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_indexed_files(root, srcsrv):
+    '''The source files in the srcsrv stream of root, the keys of their
+    vcs_cache entries'''
+    stream = pdbMsf.read_srcsrv_stream(root)
+    if stream is None:
+        pdbstr = os.path.join(srcsrv, 'pdbstr.exe')
+        commando = [pdbstr, '-r', f'-p:{root}', '-s:srcsrv']
+        stream, _exit_code = simur.run_process(commando, False)
+
+    files = []
+    in_source_files = False
+    for line in stream.splitlines():
+        if line.startswith('SRCSRV:'):
+            in_source_files = line.startswith('SRCSRV: source files')
+        elif in_source_files and '*' in line:
+            files.append(line.split('*', 1)[0])
+    return files
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
 def get_non_indexed_files(root, srcsrv, options):
+    # srctool is asked once per pdb and run, see pdbProbe
+    return pdbProbe.ask(root, 'srctool',
+                        lambda: read_non_indexed_files(root, srcsrv, options))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_non_indexed_files(root, srcsrv, options):
+    # Read the source files out of the DBI stream, srctool if we cannot
+    source_files = pdbMsf.get_source_files(root)
+    if source_files is None:
+        return read_non_indexed_files_with_srctool(root, srcsrv, options)
+    if options.debug_level > 3:
+        print(f'{root} lists {len(source_files)} source files')
+
+    return [os.path.abspath(file) for file in source_files]
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_non_indexed_files_with_srctool(root, srcsrv, options):
     srctool = os.path.join(srcsrv, 'srctool.exe')
     commando = [srctool, '-r', root]
     # srctool returns the number of files - not an exit code
-    filestring, exit_code = simur.run_process(commando, False)
-    if options.debug_level > 3:
-        print(f'{commando} returned {exit_code = }')
-        print(filestring)
-
-    all_files = filestring.splitlines()[:-1]  # Last line is no source file
+    lines = simur.run_process_lines(commando, False)
     files = []
-    for file in all_files:
+    for file, is_last in simur.mark_last(lines):
+        if options.debug_level > 3:
+            print(file)
+        if is_last:
+            break                       # Last line is no source file
+        if not file:
+            continue
         if file[0] == '*':
             # Do not know what this is, but lines starting with a star ('*')
             # seems to refer to non-existing .inj files in the object directory
@@ -98,83 +175,136 @@ def get_non_indexed_files(root, srcsrv, options):
         absolute_path = os.path.abspath(file)
         files.append(absolute_path)
 
+    if options.debug_level > 3:
+        print(f'{commando} returned exit_code = {lines.exit_code}')
     return files
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def is_in_svn(file, data, svn_cache, options):
+def find_in_svn(file, svn_cache, options):
+    '''The cache entry of file if it is in svn, else None.  The entry is shared
+    by all caches, it is not to be changed'''
     debug_level = 0
-    for cached_dir in svn_cache.keys():          # dict on svn roots
-        # Since svn may have externals this may fail if we have a narrower root
-        if file.startswith(cached_dir):
-            svn_content = svn_cache[cached_dir]  # dict on abs path file
-            if file in svn_content.keys():
-                copy_cache_response(data, svn_content[file])
-                if debug_level > 4:
-                    print(f'Found in cache: {file}')
-                return True
+    # Since svn may have externals we try the narrowest root first
+    cached = svn_cache.lookup(file)
+    if cached is not None:
+        if debug_level > 4:
+            print(f'Found in cache: {file}')
+        return cached
 
     svn_dir = get_svn_dir(file)
     if svn_dir is None:
-        return False
+        return None
+    svn_dir = str(svn_dir)
 
-    if str(svn_dir) in svn_cache.keys():
-        if debug_level > 4:
-            print(f'Already cached {svn_dir} - {file}')
-        return False
+    dir_cache = cache_svn_root(svn_dir, svn_cache, options)
+    if dir_cache is None:
+        return None
 
-    # Make a pushd to the svn dir
-    curr_dir = os.getcwd()
-    os.chdir(svn_dir)
+    # We may have looked in this directory but 'file' maybe isn't under VC
+    return dir_cache.get(file)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def cache_svn_root(svn_dir, svn_cache, options):
+    # Only one worker at a time may take a snapshot of a working copy, the
+    # others wait for it and then use its result
+    with get_root_lock(svn_dir):
+        if svn_dir in svn_cache.keys():
+            return svn_cache[svn_dir]
+        stamp = make_store_stamp(svnWcDb.get_stamp(svn_dir), options)
+        dir_cache = load_stored_cache(svn_dir, stamp)
+        if dir_cache is None:
+            dir_cache = make_svn_cache(svn_dir, options)
+            save_stored_cache(svn_dir, 'svn', stamp, dir_cache)
+        if dir_cache is not None:
+            svn_cache[svn_dir] = dir_cache
+        return dir_cache
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_store_stamp(stamp, options):
+    # The keys differ with --lower_case_pdb
+    if stamp and options.lower_case_pdb:
+        stamp += ':lower'
+    return stamp
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def load_stored_cache(root, stamp):
+    if vcsStore.the_store is None or stamp is None:
+        return None
+    return vcsStore.the_store.load(root, stamp)
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def save_stored_cache(root, vcs, stamp, dir_cache):
+    if vcsStore.the_store is None or stamp is None or dir_cache is None:
+        return
+    vcsStore.the_store.save(root, vcs, stamp, dir_cache)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_svn_cache(svn_dir, options):
+    # Prefer reading .svn/wc.db, 'svn info -R' is slow on large working copies
+    dir_cache = svnWcDb.make_svn_cache(svn_dir, options)
+    if dir_cache is not None:
+        return dir_cache
+    return make_svn_info_cache(svn_dir, options)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_svn_info_cache(svn_dir, options):
+    debug_level = 0
     if debug_level > 4:
-        print(f'svn-caching: {svn_dir} - {file}')
+        print(f'svn-caching: {svn_dir}')
     commando = 'svn info -R'
-    reply, _exit_code = simur.run_process(commando, True)
-    if len(reply) < 2:
-        if debug_level > 4:
-            print(f'svn info returned: {reply}')
-        os.chdir(curr_dir)
-        return False
-
-    svn_dir = str(svn_dir)
-    svn_cache[svn_dir] = {}
-    dir_cache = svn_cache[svn_dir]
+    # Parse the records (separated by empty lines) while svn produces them
+    process_lines = simur.run_process_lines(commando, True, cwd=svn_dir)
+    lines = simur.mark_last(process_lines)
 
-    lines = reply.splitlines()
+    dir_cache = {}
+    repo = None
 
     path_str = 'Path: '
     url_str = 'URL: '
     rev_str = 'Revision: '
     sha_str = 'Checksum: '
     nod_str = 'Node Kind: '
-    # In case of doubt: use brute force
-    no_of_lines = len(lines)
-    curr_line = 0
+    url = None
+    reply_size = 0
 
     hits = 0
     # Eat the first entry - it is the root dir
-    while curr_line < no_of_lines:
-        line = lines[curr_line]
+    for line, is_last in lines:
+        reply_size += len(line) + 1
         if line.startswith(url_str):
             url = line[len(url_str):]   # Get the repository root
-        curr_line += 1
         if len(line) == 0:
             break
 
+    if reply_size < 2:
+        if debug_level > 4:
+            print('svn info returned nothing')
+        return None
+
     path = rev = sha = node_kind = None
-    while curr_line < no_of_lines:
-        line = lines[curr_line]
+    for line, is_last in lines:
         if debug_level > 4:
             print(f'IN: {hits} {line}')
-        curr_line += 1
 
-        if hits >= 3 or curr_line >= no_of_lines or len(line) == 0:
+        if hits >= 3 or is_last or len(line) == 0:
             # Make the key
             if debug_level > 4:
                 print(f'hits; {hits}')
-                print(f'cnt ; {curr_line}:{no_of_lines}')
+                print(f'last; {is_last}')
                 print(f'len ; {len(line)}')
                 if not url:
                     print("No url")
@@ -206,15 +336,12 @@ def is_in_svn(file, data, svn_cache, options):
                 key = str(key)  # json cannot have WindowsPath as key
                 if options.lower_case_pdb:
                     key = key.lower()
-                cache_entry = {}
-                disk_rel = os.path.relpath(path)
+                disk_rel = os.path.relpath(os.path.join(svn_dir, path), svn_dir)
                 url_rel = disk_rel.replace('\\', '/')   # since disk_rel is str
-                cache_entry['reporoot'] = url
-                cache_entry['relpath']  = url_rel
-                cache_entry['revision'] = rev
-                cache_entry['sha1'] = sha
-                cache_entry['vcs'] = 'svn'
-                dir_cache[key] = cache_entry
+                if repo is None:
+                    repo = vcsRecords.RepoRecord('svn', url)
+                cache_entry = vcsRecords.FileRecord(repo, url_rel, rev, sha)
+                dir_cache[vcsRecords.intern_path(key)] = cache_entry
                 if debug_level > 4:
                     print(f'Inserts: {key}')
             else:
@@ -236,12 +363,12 @@ def is_in_svn(file, data, svn_cache, options):
         if line.startswith(nod_str):
             node_kind = line[len(nod_str):]
 
-    os.chdir(curr_dir)
-    # We may have looked in this directory but 'file' maybe isn't under VC
-    if file in dir_cache.keys():
-        copy_cache_response(data, dir_cache[file])
-        return True
-    return False
+    if process_lines.failed:
+        # What was parsed may be a part of it, or the exception text
+        if debug_level > 4:
+            print(f'{commando} failed in {svn_dir}')
+        return None
+    return dir_cache
 
 #-------------------------------------------------------------------------------
 #
@@ -304,10 +431,13 @@ def is_in_svn_raw(file, data, _dummy, _options):
 #-------------------------------------------------------------------------------
 def get_root_dir(path, ext):
     debug_level = 0
-    # Add a cache for those directories that are not git-ish
-    # and also for those that are
     path_dir = os.path.dirname(path)
     curr_dir = os.path.abspath(path_dir)
+    if ext in vcsRoots.RootDirCache.MARKERS:
+        # Cached for those directories that are not git-ish/svn-ish and also
+        # for those that are
+        return vcsRoots.root_dirs.find_root(curr_dir, ext)
+
     while True:
         if debug_level > 4:
             print(f'Looking at {curr_dir}')
@@ -343,44 +473,129 @@ def get_svn_dir(path):
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def copy_cache_response(data, response):  # why do I need to do this ?
-    for key in response.keys():
-        data[key] = response[key]
+_root_locks = {}
+_root_locks_guard = threading.Lock()
+_presoak_lock = threading.Lock()
+
+def get_root_lock(root):
+    '''One lock per working copy root, so that parallel workers (indexPDBs.py
+    --jobs) take the snapshot of a repository only once'''
+    with _root_locks_guard:
+        if root not in _root_locks:
+            _root_locks[root] = threading.Lock()
+        return _root_locks[root]
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def is_in_git(file, data, git_cache, options):
+def find_in_git(file, git_cache, options):
+    '''The cache entry of file if it is in git, else None'''
     debug_level = 0
-    report_fail = lambda dir, command: \
-        f'When executing in directory: {dir}\n>{command} failed'
 
-    for cached_dir in git_cache.keys():          # dict on git roots
-        if file.startswith(cached_dir):
-            git_content = git_cache[cached_dir]  # dict on abs path file
-            if file in git_content.keys():
-                copy_cache_response(data, git_content[file])
-                return True
-            if debug_level > 4:
-                print(f'in cached directory {cached_dir}:')
-                print(f'  {file} was not found')
-            # Do not return False here - it could be a WC further down the path
+    # Try the narrowest root first - it could be a repo inside another repo
+    cached = git_cache.lookup(file)
+    if cached is not None:
+        return cached
+    if debug_level > 4:
+        print(f'{file} was not found in any cached directory')
 
     git_dir = get_git_dir(file)
     if git_dir is None:
-        return False
+        return None
+    git_dir = str(git_dir)
 
-    # Make a pushd to the git dir
-    curr_dir = os.getcwd()
-    os.chdir(git_dir)
+    if options.scoped_git:
+        scope_dir = get_git_scope_dir(file, git_dir)
+        dir_cache = cache_git_scope(git_dir, git_cache, [scope_dir], options)
+    else:
+        dir_cache = cache_git_root(git_dir, git_cache, options)
+    if dir_cache is None:
+        return None
 
-    if debug_level > 4:
-        print(f'git-caching: {git_dir}')
+    # We may have looked in this directory but 'file' maybe isn't under VC
+    return dir_cache.get(file)
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def cache_git_root(git_dir, git_cache, options):
+    # Only one worker at a time may take a snapshot of a repository, the
+    # others wait for it and then use its result
+    with get_root_lock(git_dir):
+        if git_dir in git_cache.keys():
+            return git_cache[git_dir]
+        stamp = make_store_stamp(gitIndex.get_stamp(git_dir), options)
+        dir_cache = load_stored_cache(git_dir, stamp)
+        if dir_cache is None:
+            dir_cache = make_git_cache(git_dir, options)
+            save_stored_cache(git_dir, 'git', stamp, dir_cache)
+        if dir_cache is not None:
+            git_cache[git_dir] = dir_cache
+        return dir_cache
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def cache_git_scope(git_dir, git_cache, file_dirs, options):
+    '''
+    --scoped_git: only take the snapshot of the directories (relative to
+    git_dir, '/' separated) that the sources are in, and add more directories
+    to it when later files need them
+    '''
+    with get_root_lock(git_dir):
+        scope = git_cache.scopes.get(git_dir)
+        if scope is None:
+            git_remote, commit_id = get_git_repo_info(git_dir)
+            scope = (git_remote, commit_id, set())
+            git_cache.scopes[git_dir] = scope
+        git_remote, commit_id, listed_dirs = scope
+
+        new_dirs = set(file_dirs) - listed_dirs
+        if not new_dirs:
+            return git_cache.get(git_dir)
+
+        pathspecs = make_git_pathspecs(new_dirs, options)
+        entries = list_git_files(git_dir, pathspecs)
+        if entries is None:
+            return git_cache.get(git_dir)
+
+        dir_cache = git_cache.get(git_dir, {})
+        dir_cache.update(make_git_entries(git_dir, git_remote, commit_id,
+                                          entries, options))
+        git_cache[git_dir] = dir_cache
+        listed_dirs |= new_dirs
+        return dir_cache
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_git_scope_dir(file, git_dir):
+    file_dir = os.path.relpath(os.path.dirname(file), git_dir)
+    return file_dir.replace('\\', '/')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_git_pathspecs(scope_dirs, options):
+    # The files directly in each directory, not in its subdirectories
+    magic = 'glob,icase' if options.lower_case_pdb else 'glob'
+    pathspecs = []
+    for scope_dir in sorted(scope_dirs):
+        scope_dir = re.sub(r'([*?[\\])', r'\\\1', scope_dir)
+        if scope_dir == '.':
+            pathspecs.append(f':({magic})*')
+        else:
+            pathspecs.append(f':({magic}){scope_dir}/*')
+    return pathspecs
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_git_repo_info(git_dir):
     #Look for remote:s
     commando = 'git remote -v'
     git_remote = None
-    reply, _exit_code = simur.run_process(commando, True)
+    reply, _exit_code = simur.run_process(commando, True, cwd=git_dir)
     lines = reply.splitlines()
     for line in lines:
         remote = re.match(r'^origin\s*(.+)\s+\(fetch\)$', line)
@@ -393,63 +608,146 @@ def is_in_git(file, data, git_cache, options):
 
     # Get the commit-sha
     commando = 'git log -1 --format=%H'
-    reply, _exit_code = simur.run_process(commando, True)
+    reply, _exit_code = simur.run_process(commando, True, cwd=git_dir)
     commit_id = reply
 
-    # Get the contents of the repository
-    commando = 'git ls-files -s'
-    reply, _exit_code = simur.run_process(commando, True)
-    if len(reply) == 0:
-        os.chdir(curr_dir)
-        return False
-    if reply.startswith('fatal'):  # fatal: not a git repository ...
-        os.chdir(curr_dir)         # so it is not a fail
-        return False
+    return git_remote, commit_id
 
-    git_dir = str(git_dir)
-    git_cache[git_dir] = {}
-    dir_cache = git_cache[git_dir]
-    # Iterate on lines
-    for line in reply.splitlines():
-        # 100644 2520fa373ff004b2fd4f9fa3e285b0d7d36c9319 0   script/prepPDB.py
-        repo = re.match(r'^\d+\s*([a-fA-F0-9]+)\s*\d+\s*(.+)$', line)
-        if repo:
-            revision = repo.group(1)
-            rel_key  = repo.group(2)
-            # Make the key, i.e. that is the file path
-            key = os.path.join(git_dir, rel_key)
-            try:
-                key = os.path.abspath(key)
-            except Exception:
-                if debug_level > 4:
-                    print(f'cannot handle {line}')
-                continue
-            key = str(key)  # json cannot have WindowsPath as key
-            if options.lower_case_pdb:
-                key = key.lower()
-            dir_cache[key] = {}
-            cache_entry = dir_cache[key]
-            cache_entry['reporoot'] = git_remote
-            cache_entry['relpath']  = rel_key
-            cache_entry['revision'] = revision
-            cache_entry['sha1']     = commit_id
-            cache_entry['local']    = git_dir
-            cache_entry['remote']   = git_remote
-            cache_entry['vcs']      = 'git'
-        else:
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_git_cache(git_dir, options):
+    debug_level = 0
+
+    if debug_level > 4:
+        print(f'git-caching: {git_dir}')
+
+    git_remote, commit_id = get_git_repo_info(git_dir)
+
+    # Get the contents of the repository, reading the index is the cheapest
+    entries = gitIndex.get_index_entries(git_dir)
+    if entries is not None:
+        return make_git_entries(git_dir, git_remote, commit_id, entries,
+                                options)
+
+    # Else someone else may already have listed this commit for us, which
+    # saves the git ls-files (but not the git diff-index)
+    shared_dir = sharedSnapshots.get_shared_dir(options.shared_cache)
+    if shared_dir and git_remote and not is_git_index_at_head(git_dir):
+        shared_dir = None       # Staged changes, it is not just the commit
+    if shared_dir and git_remote:
+        entries = sharedSnapshots.fetch_snapshot(shared_dir, 'git', git_remote,
+                                                 commit_id.strip())
+        if entries is not None:
+            return make_git_entries(git_dir, git_remote, commit_id, entries,
+                                    options)
+
+    entries = list_git_files(git_dir)
+    if entries is None:
+        return None
+
+    if shared_dir and git_remote:
+        sharedSnapshots.publish_snapshot(shared_dir, 'git', git_remote,
+                                         commit_id.strip(), entries)
+
+    return make_git_entries(git_dir, git_remote, commit_id, entries, options)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_git_index_at_head(git_dir):
+    # Exit code 0 if there are no staged changes
+    commando = 'git diff-index --cached --quiet HEAD --'
+    _reply, exit_code = simur.run_process(commando, False, cwd=git_dir)
+    return exit_code == 0
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_git_entries(git_dir, git_remote, commit_id, entries, options):
+    debug_level = 0
+    dir_cache = {}
+    repo = vcsRecords.RepoRecord('git', git_remote, commit_id, git_dir,
+                                 git_remote)
+    for rel_key, revision in entries:
+        # Make the key, i.e. that is the file path
+        key = os.path.join(git_dir, rel_key)
+        try:
+            key = os.path.abspath(key)
+        except Exception:
+            if debug_level > 4:
+                print(f'cannot handle {rel_key}')
+            continue
+        key = str(key)  # json cannot have WindowsPath as key
+        if options.lower_case_pdb:
+            key = key.lower()
+        key = vcsRecords.intern_path(key)
+        dir_cache[key] = vcsRecords.FileRecord(repo, rel_key, revision)
+
+    return dir_cache
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def list_git_files(git_dir, pathspecs=None):
+    '''(path, blob id) of the files in the repository at git_dir, taken from
+    'git ls-files -s' - for when gitIndex cannot read the index itself, or for
+    only the files matching pathspecs'''
+    report_fail = lambda dir, command: \
+        f'When executing in directory: {dir}\n>{command} failed'
+
+    # No quoting of non-ascii paths, we want them as they are on disk
+    if pathspecs is None:
+        commands = ['git -c core.quotepath=off ls-files -s']
+    else:
+        # Keep within the command line length limit of Windows
+        commands = []
+        for chunk in chunk_arguments(pathspecs, 16000):
+            commands.append(['git', '-c', 'core.quotepath=off',
+                             'ls-files', '-s', '--'] + chunk)
+
+    entries = []
+    for commando in commands:
+        got_lines = False
+        # Iterate on lines, as git lists them
+        process_lines = simur.run_process_lines(commando, True, cwd=git_dir)
+        for line in process_lines:
+            if not got_lines and line.startswith('fatal'):
+                return None             # fatal: not a git repository ...
+            got_lines = True            # so it is not a fail
+            # 100644 2520fa373ff004b2fd4f9fa3e285b0d7d36c9319 0   script/prepPDB.py
+            repo = re.match(r'^\d+\s*([a-fA-F0-9]+)\s*\d+\s*(.+)$', line)
+            if repo:
+                entries.append((repo.group(2), repo.group(1)))
+            else:
+                print(report_fail(git_dir, commando))
+                print(f'When executing in directory: {git_dir}')
+                print(f'>{commando} failed')
+                return None
+        if process_lines.failed:
             print(report_fail(git_dir, commando))
-            print(f'When executing in directory: {git_dir}')
-            print(f'>{commando} failed')
-            os.chdir(curr_dir)
-            return False
+            return None
+        if not got_lines and pathspecs is None:
+            return None
+        # else nothing matched the pathspecs
 
-    os.chdir(curr_dir)
-    # We may have looked in this directory but 'file' maybe isn't under VC
-    if file in dir_cache.keys():
-        copy_cache_response(data, dir_cache[file])
-        return True
+    return entries
 
-    return False
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def chunk_arguments(arguments, max_length):
+    chunk = []
+    length = 0
+    for argument in arguments:
+        if chunk and length + len(argument) + 3 > max_length:
+            yield chunk
+            chunk = []
+            length = 0
+        chunk.append(argument)
+        length += len(argument) + 3     # Quotes and a space
+    if chunk:
+        yield chunk
 
 #-------------------------------------------------------------------------------
 #
@@ -509,6 +807,54 @@ def is_in_git_raw(file, data, _dummy, _options):
     os.chdir(curr_dir)
     return True
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def snapshot_repositories(files, svn_cache, git_cache, options):
+    '''
+    Planning stage: find the distinct working copy roots of all the files and
+    take the snapshots (svn info -R, git ls-files -s) of them in parallel, so
+    that resolving the files later on is just lookups in svn_cache/git_cache
+    '''
+    svn_dirs = set()
+    git_dirs = {}       # dict on git root -> the directories used under it
+    for file in files:
+        if skip_file(file):
+            continue
+        file = os.path.abspath(file)
+        svn_dir, git_dir = vcsRoots.root_dirs.find_roots(os.path.dirname(file))
+        if svn_dir:
+            svn_dirs.add(svn_dir)
+        if git_dir:
+            scope_dirs = git_dirs.setdefault(git_dir, set())
+            if options.scoped_git:
+                scope_dirs.add(get_git_scope_dir(file, git_dir))
+
+    # Those taken already (e.g. by the run we --resume) are kept as they are
+    svn_dirs = {svn_dir for svn_dir in svn_dirs if svn_dir not in svn_cache}
+    if not options.scoped_git:
+        git_dirs = {git_dir: scope_dirs
+                    for git_dir, scope_dirs in git_dirs.items()
+                    if git_dir not in git_cache}
+
+    if not svn_dirs and not git_dirs:
+        return
+    print(f'Taking snapshots of {len(svn_dirs)} svn and {len(git_dirs)} git'
+          ' working copies')
+
+    with concurrent.futures.ThreadPoolExecutor(options.vcs_jobs) as pool:
+        futures = [pool.submit(cache_svn_root, svn_dir, svn_cache, options)
+                   for svn_dir in svn_dirs]
+        for git_dir, scope_dirs in git_dirs.items():
+            if options.scoped_git:
+                futures.append(pool.submit(cache_git_scope, git_dir, git_cache,
+                                           scope_dirs, options))
+            else:
+                futures.append(pool.submit(cache_git_root, git_dir, git_cache,
+                                           options))
+        for future in futures:
+            future.result()
+
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
@@ -522,19 +868,18 @@ def get_vcs_information(files, vcs_cache, vcs_imports, svn_cache, git_cache,
             continue
         # Restore correct case-ing to satisfy git (and me)
         file = os.path.abspath(file)
-        file = str(file)
+        file = vcsRecords.intern_path(str(file))
         if file in vcs_cache.keys():
             cached = vcs_cache[file]
             if no_vcs in cached.keys():
                 continue
             data[file] = vcs_cache[file]
         else:
-            response = {}
-            if is_in_svn(file, response, svn_cache, options):
-                data[file] = response
-                vcs_cache[file] = response
-                continue
-            if is_in_git(file, response, git_cache, options):
+            # The entries are shared, not copied, between the caches and data
+            response = find_in_svn(file, svn_cache, options)
+            if response is None:
+                response = find_in_git(file, git_cache, options)
+            if response is not None:
                 data[file] = response
                 vcs_cache[file] = response
                 continue
@@ -545,8 +890,7 @@ def get_vcs_information(files, vcs_cache, vcs_imports, svn_cache, git_cache,
                     continue                # Nothing to use
                 data[file] = cached         # This is used index the PDB
                 continue
-            response[no_vcs] = "true"
-            vcs_cache[file] = response
+            vcs_cache[file] = vcsRecords.NO_VCS_ENTRY
 
     return data
 
@@ -661,23 +1005,31 @@ def make_backup_file(src_file, extension):
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def make_cache_file(pdb_file):
+def make_cache_file(pdb_file, pattern=simur.VCS_CACHE_PATTERN):
     common_root, _ext = os.path.splitext(pdb_file)
-    cache_file = common_root + '.simur.json'
+    cache_file = common_root + pattern
     return cache_file
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_cache_pattern(options):
+    if options.cache_format == 'pack':
+        return simur.VCS_PACK_PATTERN
+    return simur.VCS_CACHE_PATTERN
+
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
 def make_stream_file(pdb_file, stream):
-    tempfile = os.path.basename(pdb_file)
-    tempfile = tempfile + '.stream'
+    # Keep it beside the pdb, parallel workers may have pdbs with the same name
+    tempfile = pdb_file + '.stream'
     if os.path.exists(tempfile):
         os.remove(tempfile)
 
-    with open(tempfile, 'w+t') as fh:
-        for line in stream:
-            fh.write(line + '\n')
+    # The same bytes as pdbMsf.write_srcsrv_stream() writes
+    with open(tempfile, 'wb') as fh:
+        fh.write(pdbMsf.encode_srcsrv_stream(stream))
 
     return tempfile
 
@@ -685,7 +1037,6 @@ def make_stream_file(pdb_file, stream):
 #
 #-------------------------------------------------------------------------------
 def dump_stream_to_pdb(pdb_file, srcsrv, stream, options):
-    tempfile = make_stream_file(pdb_file, stream)
     '''
     To restore the pdb:s their .orig's
     ---
@@ -700,6 +1051,24 @@ def dump_stream_to_pdb(pdb_file, srcsrv, stream, options):
     '''
     if options.backup:
         make_backup_file(pdb_file, '.orig')
+    if options.stream_writer == 'native':
+        # In-process, so one PDB at a time costs no more than a batch of them
+        try:
+            pdbMsf.write_srcsrv_stream(pdb_file, stream)
+        except pdbMsf.MSF_ERRORS as e:
+            print(f'Could not write the srcsrv stream of {pdb_file}: {e}')
+            print('Trying pdbstr instead')
+            dump_stream_with_pdbstr(pdb_file, srcsrv, stream)
+    else:
+        dump_stream_with_pdbstr(pdb_file, srcsrv, stream)
+    pdbProbe.forget(pdb_file)           # It is indexed now
+    treeScan.file_stats.forget(pdb_file)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def dump_stream_with_pdbstr(pdb_file, srcsrv, stream):
+    tempfile = make_stream_file(pdb_file, stream)
     pdbstr = os.path.join(srcsrv, 'pdbstr.exe')
     commando = [pdbstr, '-w', '-s:srcsrv', f'-p:{pdb_file}', f'-i:{tempfile}']
     simur.run_process(commando, True)
@@ -709,36 +1078,46 @@ def dump_stream_to_pdb(pdb_file, srcsrv, stream, options):
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def write_cache_file(pdb_file, vcs_data):
-    cache_file = make_cache_file(pdb_file)
-    simur.store_json_data(cache_file, vcs_data)
+def write_cache_file(pdb_file, vcs_data, options):
+    cache_file = make_cache_file(pdb_file, get_cache_pattern(options))
+    vcsPack.store_vcs_data(cache_file, vcs_data)
 
     pdb_access_time  = os.path.getatime(pdb_file)
     pdb_mod_time  = os.path.getmtime(pdb_file)
     os.utime(cache_file, times=(pdb_access_time, pdb_mod_time))
+    treeScan.file_stats.forget(cache_file)
+    return cache_file
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
 def update_presoak_file(vcs_data):
     presoak_file = simur.get_presoak_file()
-    data = simur.load_json_data(presoak_file)
+    with _presoak_lock:
+        data = simur.load_json_data(presoak_file)
 
-    for file in vcs_data:
-        what = vcs_data[file]
-        if what['vcs'] == 'git':
-            remote = what['remote']
-            if remote:
-                if not remote in data:
-                    data[remote] = 'presoak'
+        for file in vcs_data:
+            what = vcs_data[file]
+            if what['vcs'] == 'git':
+                remote = what['remote']
+                if remote:
+                    if not remote in data:
+                        data[remote] = 'presoak'
 
-    simur.store_json_data(presoak_file, data)
+        simur.store_json_data(presoak_file, data)
 
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def check_winkits(srcsrv, options):
+def check_winkits(srcsrv, options, native=False):
+    '''With native (pdbMsf) PDB reading and writing the WinKits are only the
+    fallback for the PDBs that pdbMsf cannot handle'''
+    if native:
+        if not os.path.exists(srcsrv) and not options.quiet:
+            print(f'Note: no WinKits directory {srcsrv}, so no fallback to'
+                  ' srctool/pdbstr')
+        return 0
     if not os.path.exists(srcsrv):
         print(f'Sorry, the WinKits directory {srcsrv} does not exist')
         return 3
@@ -775,13 +1154,17 @@ def check_paths(root):
 #-------------------------------------------------------------------------------
 def check_indexed_lib(pdb):
     # Heuristic: is there a 'cache file' that is newer than the base.pdb
-    composed_prep = make_cache_file(pdb)
-    if os.path.exists(composed_prep):
-        prep_mod_time = os.path.getmtime(composed_prep)
-        pdb_mod_time  = os.path.getmtime(pdb)
-        if prep_mod_time >= pdb_mod_time:
-            lib_data_file = composed_prep
-            return lib_data_file
+    # Most likely found by the scan for PDBs, no need to stat them again
+    pdb_mod_time = treeScan.file_stats.get_mtime(pdb)
+    if pdb_mod_time is None:
+        return ""                   # Gone since the scan, not indexed then
+    for pattern in (simur.VCS_PACK_PATTERN, simur.VCS_CACHE_PATTERN):
+        composed_prep = make_cache_file(pdb, pattern)
+        prep_mod_time = treeScan.file_stats.get_mtime(composed_prep)
+        if prep_mod_time is not None:
+            if prep_mod_time >= pdb_mod_time:
+                lib_data_file = composed_prep
+                return lib_data_file
 
     return ""
 
@@ -789,7 +1172,7 @@ def check_indexed_lib(pdb):
 # Insert VCS data from static library
 #-------------------------------------------------------------------------------
 def merge_vcs_data(vcs_cache, lib_data_file):
-    lib_data = simur.load_json_data(lib_data_file)
+    lib_data = vcsPack.iter_vcs_data(lib_data_file)
     # Should we check if we overwrite anything?  But how do we know which one is
     # correct when getting data from a static library
     vcs_cache.update(lib_data)
@@ -810,6 +1193,7 @@ def prep_exe_pdb(the_pdb_file, srcsrv,
     vcs_cache, vcs_imports, svn_cache, git_cache, options):
     already_indexed = is_indexed(the_pdb_file, srcsrv, options)
     if already_indexed:
+        stageManifest.record(the_pdb_file, stageManifest.INDEXED)
         return 0
 
     failing_requirements = check_paths(the_pdb_file)
@@ -824,6 +1208,7 @@ def prep_exe_pdb(the_pdb_file, srcsrv,
     files = get_non_indexed_files(the_pdb_file, srcsrv, options)
     if len(files) == 0:
         print(f'No files to index in {the_pdb_file}')
+        stageManifest.record(the_pdb_file, stageManifest.NO_SOURCES)
         return 0
 
     print(f'Found {len(files)} source {plural_files(len(files))}')
@@ -836,6 +1221,7 @@ def prep_exe_pdb(the_pdb_file, srcsrv,
     vcs_data = get_vcs_information(files, vcs_cache, vcs_imports,
         svn_cache, git_cache, options)
     if not vcs_data:
+        # Not recorded, a checkout or -p may give it files the next time
         print(f'No version controlled files in {the_pdb_file}')
     else:
         if options.debug_level > 3:
@@ -848,6 +1234,7 @@ def prep_exe_pdb(the_pdb_file, srcsrv,
             dump_stream_data(stream)
         make_time_stamp('dump_stream_to_pdb', options)
         dump_stream_to_pdb(the_pdb_file, srcsrv, stream, options)
+        stageManifest.record(the_pdb_file, stageManifest.INDEXED)
         make_time_stamp('update_presoak_file', options)
         update_presoak_file(vcs_data)
         make_time_stamp('report_vcsdata', options)
@@ -871,6 +1258,8 @@ def prep_lib_pdb(the_pdb_file, srcsrv, cvdump, vcs_cache, vcs_imports,
         # OK, so add data from that file to our current understanding
         print(f'{the_pdb_file} already indexed - taking cached data from {lib_data_file}')
         merge_vcs_data(vcs_cache, lib_data_file)
+        stageManifest.record(the_pdb_file, stageManifest.LIB_CACHE_FILE,
+                             lib_data_file)
         return 0
 
     # Otherwise extract the data
@@ -878,6 +1267,7 @@ def prep_lib_pdb(the_pdb_file, srcsrv, cvdump, vcs_cache, vcs_imports,
     files = libSrcTool.get_lib_source_files(the_pdb_file, cvdump, srcsrv, options)
     if len(files) == 0:
         print(f'No files to index in {the_pdb_file} for static lib')
+        stageManifest.record(the_pdb_file, stageManifest.NO_SOURCES)
         return 0
 
     print(f'Found {len(files)} source {plural_files(len(files))}')
@@ -890,11 +1280,14 @@ def prep_lib_pdb(the_pdb_file, srcsrv, cvdump, vcs_cache, vcs_imports,
     vcs_data = get_vcs_information(files, vcs_cache, vcs_imports,
         svn_cache, git_cache, options)
     if not vcs_data:
+        # Not recorded, a checkout or -p may give it files the next time
         print(f'No version controlled files in {the_pdb_file}')
     else:
         if debug > 3:
             dump_vcsdata(vcs_data)
-        write_cache_file(the_pdb_file, vcs_data)
+        cache_file = write_cache_file(the_pdb_file, vcs_data, options)
+        stageManifest.record(the_pdb_file, stageManifest.LIB_CACHE_FILE,
+                             cache_file)
         report_vcsdata(vcs_data)
 
     if debug > 3:
@@ -12,8 +12,10 @@ import simur
 #-------------------------------------------------------------------------------
 def usage():
     the_script = os.path.basename(sys.argv[0])
-    print(f'usage: {the_script}')
+    print(f'usage: {the_script} [--migrate]')
     print( '    update the cache in SIMUR_REPO_CACHE')
+    print( '    --migrate: replace the clones with working trees by bare'
+           f' mirrors ({simur.GIT_MIRROR_DIR_NAME})')
 
 #-------------------------------------------------------------------------------
 #
@@ -21,8 +23,14 @@ def usage():
 def main():
     '''
     Update the all the current repos off-line.  It can be tedious if vcget
-    should do all the clone:ing and pull:ing while a debugger is running
+    should do all the clone:ing and fetch:ing while a debugger is running
     '''
+    arguments = sys.argv[1:]
+    migrate = '--migrate' in arguments
+    if set(arguments) - {'--migrate'}:
+        usage()
+        return 3
+
     presoak_file = simur.get_presoak_file()
     if not os.path.exists(presoak_file):
         print(f'No presoak file found ({presoak_file})')
@@ -45,6 +53,9 @@ def main():
             print(f'  Cloning {directory}')
         else:
             print(f'  Already cloned: {directory}')
+        if migrate and presoak[directory] != 'presoak':
+            git_dir = simur.migrate_git_clone(directory)
+            print(f'  Migrated, git dir {git_dir}')
         git_dir = simur.find_and_update_git_cache(directory)
         print(f'  Updated, git dir {git_dir}')
 
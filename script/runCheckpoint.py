@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import shutil
+import threading
+import time
+
+import simur
+import vcsPack
+import vcsRecords
+
+#-------------------------------------------------------------------------------
+# The state of a running indexPDBs, saved now and then, so that a run that is
+# killed (or Ctrl-C:ed) can be continued with --resume instead of started over.
+# Only when asked for, with --checkpoint_interval or --resume.
+#   progress.json   the PDBs that are done and which snapshot is in which file
+#   vcs_cache.pack  the files resolved so far
+#   svn_N.pack ...  the svn_cache/git_cache snapshot of one working copy
+# All files are written to a temporary file first and progress.json is written
+# last, so a checkpoint is whole even if the run dies while saving it.  The
+# .pack files are vcsPack files, but not named .simur.pack, so they are never
+# taken for the cache files of lib PDBs.
+#-------------------------------------------------------------------------------
+CHECKPOINT_DIR_NAME = 'simur_checkpoint'
+CHECKPOINT_VERSION = 1
+DEFAULT_INTERVAL = 300          # Seconds, when resuming without an interval
+PROGRESS_FILE_NAME = 'progress.json'
+VCS_CACHE_FILE_NAME = 'vcs_cache.pack'
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_run_key(options):
+    '''What must be the same for a checkpoint to be resumed'''
+    return {
+        'target_dir': os.path.abspath(options.target_dir),
+        'lower_case_pdb': bool(options.lower_case_pdb),
+        'scoped_git': bool(options.scoped_git),
+    }
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def write_pack(file, vcs_data):
+    with vcsPack.PackWriter(file) as writer:
+        for path, cache_entry in vcs_data:
+            writer.write(path, cache_entry)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class Checkpoint:
+    def __init__(self, directory, options, interval):
+        self.directory = directory
+        self.run_key = get_run_key(options)
+        self.interval = interval            # Seconds between saves
+        self.done = {}                      # dict on PDB -> its outcome
+        self._root_files = {}   # dict on (vcs, root) -> [file, no of entries]
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def get_file(self, name):
+        return os.path.join(self.directory, name)
+
+    #---------------------------------------------------------------------------
+    #
+    #---------------------------------------------------------------------------
+    def mark_done(self, pdb_file, outcome):
+        with self._lock:
+            self.done[pdb_file] = outcome
+
+    def save_if_due(self, vcs_cache, svn_cache, git_cache):
+        '''Called by the workers, only one of them saves'''
+        if self.interval <= 0 or \
+            time.monotonic() - self._last_save < self.interval:
+            return
+        if not self._save_lock.acquire(blocking=False):
+            return
+        try:
+            self._save(vcs_cache, svn_cache, git_cache)
+        finally:
+            self._save_lock.release()
+
+    def save(self, vcs_cache, svn_cache, git_cache):
+        with self._save_lock:
+            self._save(vcs_cache, svn_cache, git_cache)
+
+    def _save(self, vcs_cache, svn_cache, git_cache):
+        start = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        # The workers keep adding to the caches, save copies of them
+        write_pack(self.get_file(VCS_CACHE_FILE_NAME), list(vcs_cache.items()))
+        roots = []
+        for vcs, the_cache in (('svn', svn_cache), ('git', git_cache)):
+            for root, dir_cache in list(the_cache.items()):
+                roots.append(self._save_root(vcs, root, dict(dir_cache)))
+        scopes = {}
+        for root, (remote, commit_id, dirs) in list(git_cache.scopes.items()):
+            scopes[root] = [remote, commit_id, sorted(dirs)]
+        with self._lock:
+            done = dict(self.done)
+
+        progress = {
+            'version': CHECKPOINT_VERSION,
+            'run': self.run_key,
+            'done': done,
+            'roots': roots,
+            'git_scopes': scopes,
+        }
+        simur.store_json_data(self.get_file(PROGRESS_FILE_NAME), progress)
+        self._last_save = time.monotonic()
+        print(f'Checkpoint: {len(done)} PDB:s done, {len(vcs_cache)} files'
+              f' resolved ({self._last_save - start:.1f} secs)')
+
+    def _save_root(self, vcs, root, dir_cache):
+        '''A snapshot is only written again if it has grown (--scoped_git)'''
+        root_file = self._root_files.get((vcs, root))
+        if root_file is None:
+            name = f'{vcs}_{len(self._root_files)}.pack'
+            root_file = [name, -1]
+            self._root_files[(vcs, root)] = root_file
+        if root_file[1] != len(dir_cache):
+            write_pack(self.get_file(root_file[0]), dir_cache.items())
+            root_file[1] = len(dir_cache)
+        return [vcs, root, root_file[0]]
+
+    #---------------------------------------------------------------------------
+    #
+    #---------------------------------------------------------------------------
+    def load(self, vcs_cache, svn_cache, git_cache):
+        '''Fill in the caches and done from the checkpoint, returns False if
+        there is none (or it is of another run)'''
+        progress = simur.load_json_data(self.get_file(PROGRESS_FILE_NAME))
+        if not progress:
+            print(f'No checkpoint in {self.directory}, starting from scratch')
+            return False
+        if progress.get('version') != CHECKPOINT_VERSION or \
+            progress.get('run') != self.run_key:
+            print(f'The checkpoint in {self.directory} is of another run'
+                  f' ({progress.get("run")}), starting from scratch')
+            return False
+
+        try:
+            caches = {'svn': svn_cache, 'git': git_cache}
+            for vcs, root, name in progress['roots']:
+                file = self.get_file(name)
+                caches[vcs][vcsRecords.intern_path(root)] = \
+                    dict(vcsPack.iter_pack(file))
+                self._root_files[(vcs, root)] = [name, len(caches[vcs][root])]
+            for root, (remote, commit_id, dirs) in \
+                progress['git_scopes'].items():
+                git_cache.scopes[root] = (remote, commit_id, set(dirs))
+            vcs_cache.update(
+                vcsPack.iter_pack(self.get_file(VCS_CACHE_FILE_NAME)))
+        except (OSError, ValueError, IndexError, KeyError) as e:
+            print(f'Could not read the checkpoint in {self.directory}: {e}')
+            vcs_cache.clear()
+            svn_cache.clear()
+            git_cache.clear()
+            git_cache.scopes.clear()
+            self._root_files = {}
+            return False
+
+        self.done = progress['done']
+        return True
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
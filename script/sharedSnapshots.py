@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import uuid
+
+#-------------------------------------------------------------------------------
+# A snapshot cache shared by several build agents, e.g. on a network share:
+# the relpath -> blob id of a repository at a commit is the same for everyone
+# that has that commit checked out, so only the first agent needs to list it.
+# Only for the working copies that need 'git ls-files' - reading the index in
+# process (gitIndex) is cheaper than a git diff-index and a file on a share.
+#
+# <shared_dir>/<vcs>/<sha1 of normalized url>/<commit>.json.gz
+#-------------------------------------------------------------------------------
+SHARED_CACHE_ENV = 'SIMUR_SHARED_CACHE'
+DEFAULT_PORTS = {'ssh': 22, 'git+ssh': 22, 'ssh+git': 22, 'git': 9418,
+                 'http': 80, 'https': 443}
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_shared_dir(shared_dir=None):
+    if shared_dir:
+        return shared_dir
+    return os.getenv(SHARED_CACHE_ENV)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def normalize_url(url):
+    '''
+    The same repository regardless of how it was cloned:
+      git@github.com:Owner/repo.git, ssh://git@github.com/Owner/repo and
+      https://user@github.com/Owner/repo/ all become github.com/Owner/repo
+    A port other than the default of the scheme is kept, github.com:2222/...
+    None for local remotes (C:\\repos\\x, /repos/x, file://...), they are
+    not the same repository on another agent
+    '''
+    url = url.strip()
+    scp_like = re.match(r'^(?:[^@/]+@)?([^:/]+):(?!//)(.*)$', url)
+    if scp_like:
+        host, path = scp_like.groups()
+        if len(host) == 1:
+            return None             # A drive letter
+    else:
+        parts = re.match(r'^([a-zA-Z][a-zA-Z0-9+.-]*)://'
+                         r'(?:[^@/]*@)?([^/:]*)(?::(\d+))?(/.*)?$', url)
+        if not parts:
+            return None             # A local path, or nothing we know
+        scheme, host, port, path = parts.groups()
+        scheme = scheme.lower()
+        if scheme == 'file' or not host:
+            return None
+        if port and int(port) != DEFAULT_PORTS.get(scheme):
+            host = f'{host}:{int(port)}'
+        path = path or ''
+    path = path.strip('/')
+    if path.endswith('.git'):
+        path = path[:-4]
+    return f'{host.lower()}/{path}'
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_snapshot_file(shared_dir, vcs, url, revision):
+    '''None if url is not one to share snapshots of'''
+    normalized_url = normalize_url(url)
+    if normalized_url is None:
+        return None
+    url_key = hashlib.sha1(normalized_url.encode()).hexdigest()
+    return os.path.join(shared_dir, vcs, url_key, f'{revision}.json.gz')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def fetch_snapshot(shared_dir, vcs, url, revision):
+    '''The list of [relpath, ...] rows published for url at revision, or None'''
+    snapshot_file = get_snapshot_file(shared_dir, vcs, url, revision)
+    if snapshot_file is None:
+        return None
+    try:
+        with gzip.open(snapshot_file, 'rt', encoding='utf-8') as fp:
+            snapshot = json.load(fp)
+    except (OSError, EOFError, ValueError):
+        return None
+    if snapshot.get('url') != normalize_url(url) or \
+        snapshot.get('revision') != revision:
+        return None
+    return snapshot['files']
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def publish_snapshot(shared_dir, vcs, url, revision, files):
+    '''Write it to a temporary file and rename it in place, so that nobody
+    reads a half written snapshot'''
+    snapshot_file = get_snapshot_file(shared_dir, vcs, url, revision)
+    if snapshot_file is None or os.path.exists(snapshot_file):
+        return
+    snapshot = {
+        'url': normalize_url(url),
+        'revision': revision,
+        'files': files,
+    }
+    temp_file = f'{snapshot_file}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+        with gzip.open(temp_file, 'wt', encoding='utf-8') as fp:
+            json.dump(snapshot, fp)
+        os.replace(temp_file, snapshot_file)
+    except OSError as e:
+        print(f'Could not publish {snapshot_file}: {e}')
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
@@ -2,11 +2,20 @@
 #
 #-------------------------------------------------------------------------------
 
+import atexit
 import hashlib
 import json
 import os
 import re
+import shutil
+import stat
 import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import vcsRecords
 got_win32api = True
 try:
     import win32api
@@ -15,6 +24,14 @@ except ModuleNotFoundError:
 
 VCS_CACHE_FILE_NAME = 'vcs_cache.simur.json'
 VCS_CACHE_PATTERN = '.simur.json'
+VCS_PACK_FILE_NAME = 'vcs_cache.simur.pack'
+VCS_PACK_PATTERN = '.simur.pack'
+GIT_CLONES_FILE_NAME = 'git_clones.json'
+GIT_DIR_SCAN_DEPTH = 2      # The clone is made in a subdir of the repo dir
+GIT_MIRROR_DIR_NAME = 'mirror.git'  # The bare mirror, in the repo dir
+GIT_FETCH_STAMP = 'simur_fetched'   # In the git dir of a clone, when fetched
+GIT_TTL_ENV = 'SIMUR_GIT_TTL'
+GIT_FILTER_ENV = 'SIMUR_GIT_FILTER' # e.g. blob:none for partial mirrors
 
 #-------------------------------------------------------------------------------
 #
@@ -35,8 +52,13 @@ def ccp():
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def run_process(command, do_check, extra_dir=os.getcwd(), as_text=True):
+def run_process(command, do_check, extra_dir=os.getcwd(), as_text=True,
+    cwd=None):
+    # Pass 'cwd' rather than doing os.chdir() - the current directory is shared
+    # by all threads in the process
     exit_code = 0
+    if cwd:
+        extra_dir = cwd
     try:
         encoding_used = None
         if as_text:
@@ -47,6 +69,7 @@ def run_process(command, do_check, extra_dir=os.getcwd(), as_text=True):
                                 stderr=subprocess.PIPE,
                                 text=as_text,
                                 encoding=encoding_used,  # See https://bugs.python.org/issue27179
+                                cwd=cwd,
                                 check=do_check)
         if status.returncode == 0:
             reply = status.stdout
@@ -56,22 +79,110 @@ def run_process(command, do_check, extra_dir=os.getcwd(), as_text=True):
         exit_code = status.returncode
 
     except Exception as e:
-        reply = '\n-start of exception-\n'
-        reply += f'The command\n>{command}\nthrew an exception'
-        if extra_dir:
-            reply += f' (standing in directory {extra_dir})'
-        reply += f':\n\n'
-        reply += f'type:  {type(e)}\n'
-        reply += f'text:  {e}\n'
-        reply += '\n-end of exception-\n'
-        reply += f'stdout: {e.stdout}\n'
-        reply += f'stderr: {e.stderr}\n'
+        reply = make_exception_reply(command, extra_dir, e)
         if as_text == False:
             reply = reply.encode('utf-8')
         exit_code = 3
 
     return reply, exit_code
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_exception_reply(command, extra_dir, e):
+    reply = '\n-start of exception-\n'
+    reply += f'The command\n>{command}\nthrew an exception'
+    if extra_dir:
+        reply += f' (standing in directory {extra_dir})'
+    reply += f':\n\n'
+    reply += f'type:  {type(e)}\n'
+    reply += f'text:  {e}\n'
+    reply += '\n-end of exception-\n'
+    # Only a CalledProcessError/TimeoutExpired has the outputs
+    reply += f'stdout: {getattr(e, "stdout", None)}\n'
+    reply += f'stderr: {getattr(e, "stderr", None)}\n'
+    return reply
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class ProcessLines:
+    '''
+    The output of command as decoded lines, as they arrive - so that the
+    caller can parse while the command runs and never holds all of it.
+    The lines are stdout, followed by stderr if it failed, as run_process()
+    replies.  With do_check, or if it could not be run, the exception text
+    of run_process() follows the stdout lines instead, but as these have
+    already been given its 'stdout:' is None.  exit_code is set when all
+    lines have been read, and if failed is true by then the caller should
+    drop what it made of the lines
+    '''
+    def __init__(self, command, do_check, extra_dir, cwd):
+        self.command = command
+        self.do_check = do_check
+        self.extra_dir = cwd if cwd else extra_dir
+        self.cwd = cwd
+        self.exit_code = None
+
+    @property
+    def failed(self):
+        return bool(self.exit_code)
+
+    def __iter__(self):
+        try:
+            with subprocess.Popen(self.command,
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE,
+                                  text=True,
+                                  encoding=ccp(),
+                                  cwd=self.cwd) as process:
+                # Drain stderr on the side, a full pipe would block the command
+                stderr = []
+                reader = threading.Thread(
+                    target=lambda: stderr.append(process.stderr.read()),
+                    daemon=True)
+                reader.start()
+                for line in process.stdout:
+                    yield line.rstrip('\n')
+                process.wait()
+                reader.join()
+            error_output = ''.join(stderr)
+            if process.returncode and self.do_check:
+                raise subprocess.CalledProcessError(process.returncode,
+                                                    self.command,
+                                                    stderr=error_output)
+            if process.returncode:
+                yield from error_output.splitlines()
+            self.exit_code = process.returncode
+
+        except Exception as e:
+            reply = make_exception_reply(self.command, self.extra_dir, e)
+            yield from reply.splitlines()
+            self.exit_code = 3
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def run_process_lines(command, do_check, extra_dir=os.getcwd(), cwd=None):
+    '''Like run_process(), but iterate over the lines as they come'''
+    return ProcessLines(command, do_check, extra_dir, cwd)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def mark_last(lines):
+    '''(line, is_last) for the lines, for parsers that treat the last line
+    specially when they do not have all lines at once'''
+    previous = None
+    got_previous = False
+    for line in lines:
+        if got_previous:
+            yield previous, False
+        previous = line
+        got_previous = True
+    if got_previous:
+        yield previous, True
+
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
@@ -84,13 +195,21 @@ def my_mkdir(the_dir):
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def get_repo_cache_dir():
+def get_repo_cache_name():
+    '''SIMUR_REPO_CACHE, without creating it'''
     # Take in the cache directory through an environment variable since vcget
     # may be called spontaneous from all kind of debugging tools
-    cache_dir = os.getenv('SIMUR_REPO_CACHE', 'C:\\simur_repo')
+    return os.getenv('SIMUR_REPO_CACHE', 'C:\\simur_repo')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_repo_cache_dir():
+    cache_dir = get_repo_cache_name()
     canon_dir = os.path.realpath(cache_dir)
     if not os.path.exists(canon_dir):
-        print(f'get_repo_cache_dir(): got {canon_dir}')
+        # Not to stdout, that is the file vcget hands to the debugger
+        print(f'get_repo_cache_dir(): got {canon_dir}', file=sys.stderr)
         canon_dir = cache_dir
 
     repo_cache = my_mkdir(canon_dir)
@@ -122,6 +241,13 @@ def get_presoak_report_file():
 
     return presoak_file
 
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_git_clones_file():
+    '''dict on reporoot -> the directory of its clone in the repo cache'''
+    return get_repo_cache_file(GIT_CLONES_FILE_NAME)
+
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
@@ -142,78 +268,440 @@ def load_json_data(file):
 #
 #-------------------------------------------------------------------------------
 def store_json_data(file, data):
-    with open(file, 'w') as fp:
-        json.dump(data, fp, indent=2)
+    # Never leave a half written file behind, if we are killed while writing
+    temp_file = f'{file}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(temp_file, 'w') as fp:
+            # The vcs caches hold vcsRecords.FileRecord:s, written as dicts
+            json.dump(data, fp, indent=2, default=vcsRecords.to_json)
+        os.replace(temp_file, file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def get_the_git_dir(start_dir, find_dir):
-    # find subdirectory 'find_dir' within 'start_dir'
-    for root, dirs, files in os.walk(start_dir):
-        if find_dir in dirs:
-            answer = os.path.abspath(os.path.join(root, find_dir, ".."))
-            return answer
+def get_the_git_dir(start_dir, find_dir, max_depth=GIT_DIR_SCAN_DEPTH):
+    # find subdirectory 'find_dir' within 'start_dir', at most max_depth levels
+    # down - not through all of a (large) working tree if it is not there
+    level = [start_dir]
+    for _depth in range(max_depth + 1):
+        next_level = []
+        for the_dir in level:
+            if os.path.isdir(os.path.join(the_dir, find_dir)):
+                return os.path.abspath(the_dir)
+            try:
+                with os.scandir(the_dir) as entries:
+                    for entry in entries:
+                        if entry.is_dir() and not entry.name.startswith('.'):
+                            next_level.append(entry.path)
+            except OSError:
+                continue
+        level = sorted(next_level)
     return
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def find_and_update_git_cache(reporoot):
+def is_bare_git_dir(git_dir):
+    return os.path.isfile(os.path.join(git_dir, 'HEAD')) and \
+        os.path.isdir(os.path.join(git_dir, 'objects'))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_git_clone(git_dir):
+    '''A bare mirror, or a clone with a working tree (as they were made
+    before the mirrors) - git cat-file/show work the same in both'''
+    return os.path.isdir(os.path.join(git_dir, '.git')) or \
+        is_bare_git_dir(git_dir)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_git_meta_dir(git_dir):
+    dot_git = os.path.join(git_dir, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    return git_dir
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def find_git_clone(reporoot, repo_dir):
+    '''The clone of reporoot in repo_dir, from the git_clones.json manifest
+    or else by a (bounded) scan, or None if there is none yet'''
+    clones = load_json_data(get_git_clones_file())
+    git_dir = clones.get(reporoot)
+    if git_dir and is_git_clone(git_dir):
+        return git_dir
+
+    # Not in the manifest (made before it) or moved, look for it once
+    git_dir = os.path.join(repo_dir, GIT_MIRROR_DIR_NAME)
+    if not is_bare_git_dir(git_dir):
+        git_dir = get_the_git_dir(repo_dir, '.git')
+    if git_dir:
+        remember_git_clone(reporoot, git_dir)
+    return git_dir
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def clone_git_mirror(reporoot, repo_dir, reference=None):
+    '''A bare mirror of reporoot in repo_dir, without the blobs if
+    SIMUR_GIT_FILTER is set (git show fetches them one by one when needed)'''
+    command = ['git', 'clone', '--mirror', '--quiet']
+    git_filter = os.getenv(GIT_FILTER_ENV)
+    if git_filter:
+        command.append(f'--filter={git_filter}')
+    if reference:
+        # Take what we already have from there, not from the remote
+        command += ['--reference', reference, '--dissociate']
+    command += [reporoot, GIT_MIRROR_DIR_NAME]
+    return run_process(command, True, cwd=repo_dir)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def remove_tree(the_dir):
+    def make_writable(function, path, _exc):
+        # The git objects are read only
+        os.chmod(path, stat.S_IWRITE)
+        function(path)
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(the_dir, onexc=make_writable)
+    else:
+        shutil.rmtree(the_dir, onerror=make_writable)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def remove_old_clone(old_dir, git_dir):
+    '''old_dir, or if git_dir is in it (a clone made right in the repo dir)
+    all in it but git_dir'''
+    keep = os.path.normcase(os.path.abspath(git_dir))
+    if not keep.startswith(os.path.normcase(os.path.abspath(old_dir)) +
+                           os.sep):
+        remove_tree(old_dir)
+        return
+    with os.scandir(old_dir) as entries:
+        for entry in list(entries):
+            if os.path.normcase(os.path.abspath(entry.path)) == keep:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                remove_tree(entry.path)
+            else:
+                try:
+                    os.remove(entry.path)
+                except PermissionError:
+                    os.chmod(entry.path, stat.S_IWRITE)     # Read only
+                    os.remove(entry.path)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def migrate_git_clone(reporoot):
+    '''Replace a clone with a working tree by a bare mirror, returns the
+    one to use'''
+    repo_dir = get_git_cache_dir(reporoot)
+    old_dir = find_git_clone(reporoot, repo_dir)
+    if not old_dir or is_bare_git_dir(old_dir):
+        return old_dir
+
+    reply, exit_code = clone_git_mirror(reporoot, repo_dir, old_dir)
+    if exit_code:
+        report_git_error(reporoot, reply)
+        return old_dir
+
+    git_dir = os.path.join(repo_dir, GIT_MIRROR_DIR_NAME)
+    remember_git_clone(reporoot, git_dir)
+    touch_fetch_stamp(git_dir)
+    try:
+        remove_old_clone(old_dir, git_dir)
+    except OSError as e:
+        print(f'  could not remove {old_dir}: {e}')
+    return git_dir
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def remember_git_clone(reporoot, git_dir):
+    clones_file = get_git_clones_file()
+    clones = load_json_data(clones_file)
+    if clones.get(reporoot) != git_dir:
+        clones[reporoot] = git_dir
+        store_json_data(clones_file, clones)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_git_cache_dir(reporoot):
     # Take in the cache directory through an environment variable since vcget
     # may be called from all kind of debugging tools
-    exit_code = 0
-    reply = ""
     global_repo = get_repo_cache_dir()
 
     reporoot_as_bytes = reporoot.encode()  # default utf-8
     repo_dir = hashlib.sha1(reporoot_as_bytes).hexdigest()
     subdir = os.path.join(global_repo, repo_dir)
-    global_repo = my_mkdir(subdir)
+    return my_mkdir(subdir)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_git_ttl():
+    '''Seconds before vcget refreshes a clone in the background, None if
+    never (then presoak.py is what keeps them current)'''
+    ttl = os.getenv(GIT_TTL_ENV)
+    if not ttl:
+        return None
+    try:
+        return float(ttl)
+    except ValueError:
+        return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_fetch_stamp_file(git_dir):
+    return os.path.join(get_git_meta_dir(git_dir), GIT_FETCH_STAMP)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def touch_fetch_stamp(git_dir):
+    try:
+        with open(get_fetch_stamp_file(git_dir), 'w'):
+            pass
+    except OSError:
+        pass
 
-    curr_dir = os.getcwd()
-    os.chdir(global_repo)
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_git_cache_stale(git_dir, ttl):
+    try:
+        fetched = os.path.getmtime(get_fetch_stamp_file(git_dir))
+    except OSError:
+        return True
+    return time.time() - fetched > ttl
 
-    git_dir = get_the_git_dir(global_repo, '.git')
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class GitBlobReader:
+    '''
+    The objects of one repository, read by a long lived git cat-file --batch
+    instead of a git show per object.  Each request is the object name on a
+    line, and the reply is "<sha1> <type> <size>" followed by exactly size
+    bytes and a newline, or "<name> missing".  A git that has died is started
+    again, and the request retried once.
+    '''
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+        self._process = None
+        self._last = None           # (name, object), see has_object()
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._process = subprocess.Popen(['git', 'cat-file', '--batch'],
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL,
+                                         cwd=self.git_dir)
+
+    def _stop(self):
+        process = self._process
+        self._process = None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+    def _request(self, name):
+        if self._process is None or self._process.poll() is not None:
+            self._stop()
+            self._start()
+        stdin = self._process.stdin
+        stdout = self._process.stdout
+        stdin.write(name.encode('utf-8') + b'\n')
+        stdin.flush()
+        header = stdout.readline()
+        if not header.endswith(b'\n'):
+            raise EOFError(f'git cat-file --batch in {self.git_dir} died')
+        fields = header.split()
+        if len(fields) != 3:
+            return None             # missing or ambiguous
+        size = int(fields[2])
+        # One read into the bytes we give back, no joining of chunks
+        data = stdout.read(size)
+        if len(data) != size or stdout.read(1) != b'\n':
+            raise EOFError(f'git cat-file --batch in {self.git_dir} died')
+        return data
+
+    def read_object(self, name):
+        '''The content of the object (a blob sha1, or any name git knows),
+        or None if there is no such object (or no git to ask)'''
+        with self._lock:
+            if self._last and self._last[0] == name:
+                return self._last[1]
+            for _attempt in range(2):
+                try:
+                    return self._request(name)
+                except (OSError, EOFError, ValueError):
+                    self._stop()
+            return None
+
+    def has_object(self, name):
+        '''The object is kept, for a read_object() of it right after'''
+        data = self.read_object(name)
+        with self._lock:
+            self._last = (name, data) if data is not None else None
+        return data is not None
+
+    def close(self):
+        with self._lock:
+            self._last = None
+            self._stop()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+_blob_readers = {}          # dict on git dir -> GitBlobReader
+_blob_readers_lock = threading.Lock()
+
+def get_blob_reader(git_dir):
+    '''The GitBlobReader of git_dir, shared by all callers'''
+    key = os.path.realpath(git_dir)
+    with _blob_readers_lock:
+        reader = _blob_readers.get(key)
+        if reader is None:
+            reader = GitBlobReader(git_dir)
+            _blob_readers[key] = reader
+        return reader
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@atexit.register
+def close_blob_readers():
+    with _blob_readers_lock:
+        readers = list(_blob_readers.values())
+        _blob_readers.clear()
+    for reader in readers:
+        reader.close()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def has_git_object(git_dir, revision):
+    return get_blob_reader(git_dir).has_object(revision)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def fetch_git_cache(git_dir):
+    '''The new objects of the remote, the working tree is left as it is -
+    vcget only reads objects'''
+    touch_fetch_stamp(git_dir)
+    return run_process(['git', 'fetch', '--quiet'], True, cwd=git_dir)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def refresh_in_background(git_dir):
+    '''Start a git fetch that outlives vcget (the debugger is waiting)'''
+    touch_fetch_stamp(git_dir)      # So that the next vcget does not start one
+    detach = {'start_new_session': True}
+    if os.name == 'nt':
+        detach = {'creationflags': subprocess.DETACHED_PROCESS |
+                                   subprocess.CREATE_NEW_PROCESS_GROUP}
+    try:
+        subprocess.Popen(['git', 'fetch', '--quiet'], cwd=git_dir,
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, **detach)
+    except OSError:
+        pass
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def report_git_error(reporoot, reply):
+    # Store errors in a file that can be monitored
+    report_file = get_presoak_report_file()
+    report = load_json_data(report_file)
+    report[reporoot] = reply.splitlines()
+    store_json_data(report_file, report)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def find_git_object(reporoot, revision):
+    '''The clone of reporoot, with revision in it if it can be had - only
+    going to the remote if it is not there already'''
+    global_repo = get_git_cache_dir(reporoot)
+    git_dir = find_git_clone(reporoot, global_repo)
+    if not git_dir:
+        return find_and_update_git_cache(reporoot)      # Clone it
+
+    if has_git_object(git_dir, revision):
+        ttl = get_git_ttl()
+        if ttl is not None and is_git_cache_stale(git_dir, ttl):
+            refresh_in_background(git_dir)
+        return git_dir
+
+    reply, exit_code = fetch_git_cache(git_dir)
+    if exit_code:
+        report_git_error(reporoot, reply)
+    return git_dir
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def find_and_update_git_cache(reporoot):
+    exit_code = 0
+    reply = ""
+    global_repo = get_git_cache_dir(reporoot)
+
+    git_dir = find_git_clone(reporoot, global_repo)
 
     if git_dir:
-        os.chdir(git_dir)
-        command = 'git pull'
-        reply, exit_code = run_process(command, True, git_dir)
+        reply, exit_code = fetch_git_cache(git_dir)
         if exit_code:
-            print("  pulling failed: ", reply)
+            print("  fetching failed: ", reply, file=sys.stderr)
     else:
-        command = f'git clone {reporoot}'
-        reply, exit_code = run_process(command, True, global_repo)
-        git_dir = get_the_git_dir(global_repo, '.git')
+        reply, exit_code = clone_git_mirror(reporoot, global_repo)
+        git_dir = find_git_clone(reporoot, global_repo)
         if exit_code:
-            print("  cloning failed: ", reply)
+            print("  cloning failed: ", reply, file=sys.stderr)
+        elif git_dir:
+            touch_fetch_stamp(git_dir)
 
     # Update the dictionary of reporoot and the sha1 so we can have a 'presoak'
     # that updates all the current repos off-line.  It can be tedious if vcget
-    # should do all the clone:ing and pull:ing while a debugger is running
+    # should do all the clone:ing and fetch:ing while a debugger is running
     presoak_file = get_presoak_file()
     presoak = load_json_data(presoak_file)
-    if not presoak:     # You may get an empty dictionary
-        if presoak[reporoot] == 'presoak':
-            presoak[reporoot] = global_repo
-            store_json_data(presoak_file, presoak)
-        else:
-            if presoak[reporoot] != global_repo:
-                print(f'internal_error presoaking for {reporoot}:')
-                print(f'  {presoak[reporoot]} vs {global_repo}')
-    else:  # Add if missing
+    presoaked = presoak.get(reporoot)
+    if presoaked != global_repo:        # Add if missing
+        if presoaked not in (None, 'presoak'):
+            print(f'internal_error presoaking for {reporoot}:',
+                  file=sys.stderr)
+            print(f'  {presoaked} vs {global_repo}', file=sys.stderr)
         presoak[reporoot] = global_repo
         store_json_data(presoak_file, presoak)
 
-    # Store errors in a file that can be monitored
     if exit_code:
-        report_file = get_presoak_report_file()
-        report = load_json_data(report_file)
-        report[reporoot] = reply.splitlines()
-        store_json_data(report_file, report)
-
-    os.chdir(curr_dir)
+        report_git_error(reporoot, reply)
 
     return git_dir
 
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import threading
+
+import pdbMsf
+import simur
+import treeScan
+
+#-------------------------------------------------------------------------------
+# What indexPDBs did with each PDB of a stage tree the last time, so that a
+# rerun (e.g. after a partial rebuild) only looks at the new and changed PDBs.
+# A PDB is unchanged if its size, mtime and fingerprint are the same as when
+# its outcome was recorded.  The fingerprint is the GUID and age of the PDB
+# stream, or a hash of the head and tail of a file that is not an MSF.
+# The lib PDBs are not skipped as such - their cache files are merged into the
+# vcs_cache without asking cvdump or svn/git again.
+# The files of a skipped, indexed PDB are taken from the last vcs_cache, so
+# the PDBs indexed by a run are only kept if it got to store its vcs_cache.
+#-------------------------------------------------------------------------------
+MANIFEST_FILE_NAME = 'simur_manifest.json'
+MANIFEST_VERSION = 1
+HASHED_BYTES = 1 << 16          # Of the head and of the tail
+
+INDEXED = 'indexed'             # Has a srcsrv stream
+NO_SOURCES = 'no-sources'       # No source files in it at all
+LIB_CACHE_FILE = 'lib-cache-file'       # A lib PDB, see 'cache_file'
+OUTCOMES = (INDEXED, NO_SOURCES, LIB_CACHE_FILE)
+
+the_manifest = None         # Set by open_manifest()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def hash_head_and_tail(pdb_file, size):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(pdb_file, 'rb') as fp:
+        digest.update(fp.read(HASHED_BYTES))
+        if size > HASHED_BYTES:
+            fp.seek(max(HASHED_BYTES, size - HASHED_BYTES))
+            digest.update(fp.read(HASHED_BYTES))
+    return digest.hexdigest()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_fingerprint(pdb_file, size):
+    signature = pdbMsf.get_signature(pdb_file)
+    if signature is not None:
+        return f'msf:{signature}'
+    try:
+        return f'hash:{hash_head_and_tail(pdb_file, size)}'
+    except OSError:
+        return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_stamp(path):
+    '''(size, mtime_ns) of path, None if it does not exist'''
+    stat = treeScan.file_stats.get_stat(path)
+    if stat is None:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class StageManifest:
+    def __init__(self, file, root):
+        self.file = file
+        self.root = root
+        self._entries = {}      # dict on path relative to root -> entry
+        self._indexed = set()   # The keys recorded as INDEXED by this run
+        self._committed = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def get_key(self, pdb_file):
+        return os.path.relpath(os.path.abspath(pdb_file), self.root)
+
+    def load(self):
+        try:
+            with open(self.file) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or \
+            data.get('version') != MANIFEST_VERSION:
+            print(f'Ignoring {self.file}, it is not a version'
+                  f' {MANIFEST_VERSION} manifest')
+            return
+        self._entries = data.get('pdbs', {})
+
+    def store(self):
+        '''Without a commit(), what this run indexed is left out'''
+        with self._lock:
+            entries = dict(self._entries)
+            if not self._committed:
+                for key in self._indexed:
+                    entries.pop(key, None)
+        data = {'version': MANIFEST_VERSION, 'pdbs': entries}
+        simur.store_json_data(self.file, data)
+
+    def commit(self):
+        '''Call when the vcs_cache with the files of this run is stored'''
+        with self._lock:
+            self._committed = True
+
+    #---------------------------------------------------------------------------
+    #
+    #---------------------------------------------------------------------------
+    def record(self, pdb_file, outcome, cache_file=None):
+        '''Call when done with pdb_file (after writing its srcsrv stream)'''
+        stamp = get_stamp(pdb_file)
+        if stamp is None:
+            return
+        entry = {
+            'size': stamp[0],
+            'mtime_ns': stamp[1],
+            'fingerprint': get_fingerprint(pdb_file, stamp[0]),
+            'outcome': outcome,
+        }
+        if cache_file:
+            cache_stamp = get_stamp(cache_file)
+            if cache_stamp is None:
+                return
+            entry['cache_file'] = self.get_key(cache_file)
+            entry['cache_size'], entry['cache_mtime_ns'] = cache_stamp
+        key = self.get_key(pdb_file)
+        with self._lock:
+            self._entries[key] = entry
+            if outcome == INDEXED:
+                self._indexed.add(key)
+            else:
+                self._indexed.discard(key)
+
+    def get_outcome(self, pdb_file):
+        '''The recorded (outcome, cache file) of pdb_file if it is unchanged
+        since then, else (None, None)'''
+        with self._lock:
+            entry = self._entries.get(self.get_key(pdb_file))
+        if not entry or entry.get('outcome') not in OUTCOMES:
+            return None, None
+        stamp = get_stamp(pdb_file)
+        if stamp != (entry.get('size'), entry.get('mtime_ns')):
+            return None, None
+        # Copied back with the old mtime, e.g. from a build cache
+        if get_fingerprint(pdb_file, stamp[0]) != entry.get('fingerprint'):
+            return None, None
+
+        cache_file = None
+        if entry['outcome'] == LIB_CACHE_FILE:
+            cache_file = os.path.join(self.root, entry.get('cache_file', ''))
+            cache_stamp = (entry.get('cache_size'),
+                           entry.get('cache_mtime_ns'))
+            if get_stamp(cache_file) != cache_stamp:
+                return None, None
+        return entry['outcome'], cache_file
+
+    def keep_only(self, pdbs):
+        '''Drop the PDBs that are gone from the stage tree'''
+        keys = {self.get_key(pdb_file) for pdb_file in pdbs}
+        with self._lock:
+            for key in list(self._entries):
+                if key not in keys:
+                    del self._entries[key]
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def open_manifest(file, root):
+    global the_manifest
+    the_manifest = StageManifest(file, os.path.abspath(root))
+    return the_manifest
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def close_manifest():
+    global the_manifest
+    if the_manifest:
+        the_manifest.store()
+    the_manifest = None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def record(pdb_file, outcome, cache_file=None):
+    '''No-op unless indexPDBs runs with a --manifest'''
+    if the_manifest:
+        the_manifest.record(pdb_file, outcome, cache_file)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def commit():
+    '''No-op unless indexPDBs runs with a --manifest'''
+    if the_manifest:
+        the_manifest.commit()
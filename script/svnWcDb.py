@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import pathlib
+import sqlite3
+import urllib.parse
+
+import vcsRecords
+
+#-------------------------------------------------------------------------------
+# Subversion 1.7+ keeps the working copy metadata in <wc-root>/.svn/wc.db, an
+# SQLite database.  Reading it gives the same as 'svn info -R' (URL, Revision,
+# Checksum and Node Kind per node) without a process and without the text.
+#-------------------------------------------------------------------------------
+KNOWN_FORMATS = (29, 30, 31, 32)    # PRAGMA user_version, svn 1.7 - 1.15
+NEEDED_COLUMNS = {
+    'REPOSITORY': {'id', 'root'},
+    'NODES': {'wc_id', 'local_relpath', 'op_depth', 'repos_id', 'repos_path',
+              'revision', 'presence', 'kind', 'checksum'},
+}
+# The same as svn_path_uri_encode() leaves as is
+URL_SAFE = "!$&'()*+,-./:;=@_~"
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_wc_db(svn_dir):
+    return os.path.join(svn_dir, '.svn', 'wc.db')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_stamp(svn_dir):
+    '''A string that changes when the working copy may have changed, e.g. on
+    update, commit or switch - wc.db is written then.  None if no wc.db'''
+    try:
+        stat = os.stat(get_wc_db(svn_dir))
+    except OSError:
+        return None
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def open_wc_db(svn_dir):
+    wc_db = get_wc_db(svn_dir)
+    if not os.path.exists(wc_db):
+        return None
+    # Read only, svn itself may be using it
+    uri = pathlib.Path(os.path.abspath(wc_db)).as_uri() + '?mode=ro'
+    return sqlite3.connect(uri, uri=True)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_known_schema(connection):
+    wc_format = connection.execute('PRAGMA user_version').fetchone()[0]
+    if wc_format not in KNOWN_FORMATS:
+        return False
+
+    for table, columns in NEEDED_COLUMNS.items():
+        rows = connection.execute(f'PRAGMA table_info({table})').fetchall()
+        got_columns = {row[1] for row in rows}
+        if not columns <= got_columns:
+            return False
+
+    return True
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_url(repos_root, repos_path):
+    if not repos_path:
+        return repos_root
+    return repos_root + '/' + urllib.parse.quote(repos_path, safe=URL_SAFE)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_wc_db(svn_dir):
+    '''
+    Returns (url, files) where url is the URL of svn_dir and files a list of
+    (local_relpath, revision, sha1) for the files in the working copy, i.e.
+    what 'svn info -R' says about them.
+    Returns None if there is no wc.db or if its schema is not known
+    '''
+    try:
+        connection = open_wc_db(svn_dir)
+    except sqlite3.Error:
+        return None
+    if connection is None:
+        return None
+
+    try:
+        if not is_known_schema(connection):
+            return None
+
+        # The BASE nodes (op_depth 0) are what 'svn info' reports the revision
+        # and pristine checksum of
+        root_row = connection.execute(
+            'SELECT REPOSITORY.root, NODES.repos_path FROM NODES'
+            ' JOIN REPOSITORY ON REPOSITORY.id = NODES.repos_id'
+            ' WHERE NODES.local_relpath = \'\' AND NODES.op_depth = 0'
+        ).fetchone()
+        if root_row is None:
+            return None
+        url = make_url(root_row[0], root_row[1])
+
+        files = []
+        rows = connection.execute(
+            'SELECT local_relpath, revision, checksum FROM NODES'
+            ' WHERE op_depth = 0 AND kind = \'file\''
+            ' AND presence = \'normal\''
+        )
+        for local_relpath, revision, checksum in rows:
+            # The checksum is the key into PRISTINE, e.g. '$sha1$3416941a...'
+            if revision is None or not checksum:
+                continue
+            if not checksum.startswith('$sha1$'):
+                continue
+            files.append((local_relpath, str(revision), checksum[6:]))
+    except sqlite3.Error:
+        return None
+    finally:
+        connection.close()
+
+    return url, files
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_svn_cache(svn_dir, options):
+    '''The same dict on absolute file paths as prepPDB.make_svn_cache() makes
+    out of 'svn info -R', or None if wc.db cannot be used'''
+    wc_data = read_wc_db(svn_dir)
+    if wc_data is None:
+        return None
+
+    url, files = wc_data
+    repo = vcsRecords.RepoRecord('svn', url)
+    dir_cache = {}
+    for local_relpath, revision, sha1 in files:
+        key = os.path.abspath(os.path.join(svn_dir, local_relpath))
+        if options.lower_case_pdb:
+            key = key.lower()
+        cache_entry = vcsRecords.FileRecord(repo, local_relpath, revision, sha1)
+        dir_cache[vcsRecords.intern_path(key)] = cache_entry
+
+    return dir_cache
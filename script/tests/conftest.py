@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import sys
+
+# The modules of script/ import each other by their plain names
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
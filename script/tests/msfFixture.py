@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import struct
+
+#-------------------------------------------------------------------------------
+# Small synthetic PDBs (MSF 7.0 files) for the tests of pdbMsf, built from the
+# format descriptions in https://llvm.org/docs/PDB/ and not from pdbMsf, so
+# that the reader is checked against something else than itself.
+#-------------------------------------------------------------------------------
+MSF_MAGIC = b'Microsoft C/C++ MSF 7.00\r\n\x1aDS\0\0\0'
+NIL_STREAM = 0xffffffff
+GUID = bytes(range(16))
+AGE = 3
+SIGNATURE = '030201000504070608090A0B0C0D0E0F3'     # GUID as bytes_le + age
+
+PDB_STREAM = 1
+DBI_STREAM = 3
+IPI_STREAM = 4
+NAMES_STREAM = 5
+MODULE_STREAM = 6
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def pad4(data):
+    return data + b'\0' * (-len(data) % 4)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_msf(streams, block_size=512):
+    '''The bytes of an MSF file with streams (None is a nil stream)'''
+    blocks = [b'', b'\xff' * block_size, b'\xff' * block_size]
+
+    def add_blocks(data):
+        numbers = []
+        for pos in range(0, len(data), block_size):
+            while len(blocks) % block_size in (1, 2):     # Free page maps
+                blocks.append(b'\xff' * block_size)
+            numbers.append(len(blocks))
+            blocks.append(data[pos:pos + block_size].ljust(block_size, b'\0'))
+        return numbers
+
+    sizes = []
+    stream_blocks = []
+    for data in streams:
+        if data is None:
+            sizes.append(NIL_STREAM)
+            stream_blocks.append([])
+        else:
+            sizes.append(len(data))
+            stream_blocks.append(add_blocks(data))
+    directory = struct.pack(f'<I{len(sizes)}I', len(sizes), *sizes)
+    for numbers in stream_blocks:
+        directory += struct.pack(f'<{len(numbers)}I', *numbers)
+    directory_blocks = add_blocks(directory)
+    block_map_block = add_blocks(
+        struct.pack(f'<{len(directory_blocks)}I', *directory_blocks))[0]
+
+    num_blocks = len(blocks)
+    fpm = bytearray(b'\xff' * block_size)
+    for block in range(min(num_blocks, 8 * block_size)):
+        fpm[block // 8] &= ~(1 << (block % 8)) & 0xff
+    blocks[1] = bytes(fpm)
+    blocks[0] = struct.pack('<32sIIIIII', MSF_MAGIC, block_size, 1,
+                            num_blocks, len(directory), 0,
+                            block_map_block).ljust(block_size, b'\0')
+    return b''.join(blocks)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_pdb_stream(named_streams):
+    '''The PDB stream with named_streams, a dict on name -> stream index'''
+    strings = b''
+    entries = []
+    for name, index in named_streams.items():
+        entries.append((len(strings), index))
+        strings += name.encode('utf-8') + b'\0'
+    # The reader does not hash, so any bucket will do
+    capacity = max(8, 2 * len(entries))
+    present = sum(1 << bucket for bucket in range(len(entries)))
+    words = [(present >> (32 * i)) & 0xffffffff
+             for i in range((capacity + 31) // 32)]
+
+    data = struct.pack('<III16s', 20000404, 0x5e9a5e9a, AGE, GUID)
+    data += struct.pack('<I', len(strings)) + strings
+    data += struct.pack('<II', len(entries), capacity)
+    data += struct.pack(f'<I{len(words)}I', len(words), *words)
+    data += struct.pack('<I', 0)                # No deleted buckets
+    for entry in entries:
+        data += struct.pack('<II', *entry)
+    return data + struct.pack('<I', 20140508)   # Feature code VC140
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_names_stream(names):
+    '''The /names stream and the offsets of names in it'''
+    buffer = b'\0'
+    offsets = []
+    for name in names:
+        offsets.append(len(buffer))
+        buffer += name.encode('utf-8') + b'\0'
+    data = struct.pack('<III', 0xeffeeffe, 1, len(buffer)) + buffer
+    return pad4(data) + struct.pack('<I', 0), offsets
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_module_stream(name_offsets):
+    '''Symbols (only the signature) and C13 with a DEBUG_S_FILECHKSMS'''
+    symbols = struct.pack('<I', 4)              # CV_SIGNATURE_C13
+    checksums = b''
+    for offset in name_offsets:
+        checksums += pad4(struct.pack('<IBB', offset, 16, 1) + b'\x5a' * 16)
+    lines = struct.pack('<II', 0xf2, 4) + b'\0' * 4     # DEBUG_S_LINES
+    c13 = lines + struct.pack('<II', 0xf4, len(checksums)) + checksums
+    return symbols + c13, len(symbols), len(c13)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_mod_info(modules):
+    '''modules is a list of (name, stream, symbol size, C13 size)'''
+    data = b''
+    for name, stream, sym_size, c13_size in modules:
+        data += struct.pack('<I28sHHIIIHHIII', 0, b'', 0, stream, sym_size, 0,
+                            c13_size, 0, 0, 0, 0, 0)
+        data += pad4(name.encode('utf-8') + b'\0' + name.encode('utf-8')
+                     + b'\0')
+    return data
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_file_info(files_per_module):
+    no_of_modules = len(files_per_module)
+    file_counts = [len(files) for files in files_per_module]
+    data = struct.pack('<HH', no_of_modules, sum(file_counts))
+    data += struct.pack(f'<{no_of_modules}H', *range(no_of_modules))
+    data += struct.pack(f'<{no_of_modules}H', *file_counts)
+    names = b''
+    name_offsets = {}
+    offsets = []
+    for files in files_per_module:
+        for file in files:
+            if file not in name_offsets:
+                name_offsets[file] = len(names)
+                names += file.encode('utf-8') + b'\0'
+            offsets.append(name_offsets[file])
+    data += struct.pack(f'<{len(offsets)}I', *offsets) + names
+    return pad4(data)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_dbi_stream(mod_info, file_info):
+    header = struct.pack('<iIIHHHHHHiiiiiIiiHHI', -1, 19990903, AGE,
+                         0xffff, 0, 0xffff, 0, 0xffff, 0,
+                         len(mod_info), 0, 0, len(file_info), 0, 0, 0, 0,
+                         0, 0x8664, 0)
+    return header + mod_info + file_info
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_type_record(kind, data):
+    '''Length (not counting itself), kind and data, padded to 4 bytes'''
+    body = struct.pack('<H', kind) + data
+    body += b'\xf1' * (-(len(body) + 2) % 4)
+    return struct.pack('<H', len(body)) + body
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_ipi_stream(strings):
+    '''LF_STRING_IDs of strings, with an LF_BUILDINFO after each'''
+    records = b''
+    for string in strings:
+        records += make_type_record(
+            0x1605, struct.pack('<I', 0) + string.encode('utf-8') + b'\0')
+        records += make_type_record(0x1603, struct.pack('<HI', 1, 0x1000))
+    header = struct.pack('<IIIII', 20040203, 56, 0x1000,
+                         0x1000 + 2 * len(strings), len(records))
+    return header.ljust(56, b'\0') + records
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_pdb(files_per_module=(), string_ids=(), checksum_files=(),
+             srcsrv=None, block_size=512):
+    '''
+    The bytes of a PDB with the source files files_per_module in the DBI, or
+    if there are none, checksum_files in the C13 of a module and /names
+    '''
+    names, name_offsets = make_names_stream(checksum_files)
+    module, sym_size, c13_size = make_module_stream(name_offsets)
+    mod_info = make_mod_info([('a.obj', MODULE_STREAM, sym_size, c13_size),
+                              ('* Linker *', 0xffff, 0, 0)])
+    file_info = make_file_info(files_per_module) if files_per_module else b''
+    named_streams = {'/names': NAMES_STREAM}
+    streams = [b'', None, b'', make_dbi_stream(mod_info, file_info),
+               make_ipi_stream(string_ids), names, module]
+    if srcsrv is not None:
+        named_streams['srcsrv'] = len(streams)
+        streams.append(srcsrv)
+    streams[PDB_STREAM] = make_pdb_stream(named_streams)
+    return make_msf(streams, block_size)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def write_pdb(path, **kwargs):
+    with open(path, 'wb') as fp:
+        fp.write(make_pdb(**kwargs))
+    return str(path)
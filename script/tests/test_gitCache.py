@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import simur
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None,
+                                reason='needs git')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def git(cwd, *args):
+    command = ['git', '-c', 'user.name=SIMuR', '-c', 'user.email=simur@x',
+               '-c', 'init.defaultBranch=main'] + list(args)
+    return subprocess.run(command, cwd=cwd, check=True, text=True,
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL).stdout.strip()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def commit_file(work, name, content):
+    with open(os.path.join(work, name), 'w') as fp:
+        fp.write(content)
+    git(work, 'add', name)
+    git(work, 'commit', '--quiet', '-m', f'Add {name}')
+    return git(work, 'rev-parse', 'HEAD')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class Remote:
+    '''A bare repository as the remote, and a work tree that pushes to it'''
+    def __init__(self, tmp_path):
+        self.work = str(tmp_path / 'work')
+        self.reporoot = str(tmp_path / 'remote.git')
+        os.makedirs(self.work)
+        git(self.work, 'init', '--quiet')
+        self.first = commit_file(self.work, 'main.c', 'int main;\n')
+        git(str(tmp_path), 'clone', '--quiet', '--bare', self.work,
+            self.reporoot)
+
+    def push_commit(self, name, content):
+        revision = commit_file(self.work, name, content)
+        git(self.work, 'push', '--quiet', self.reporoot, 'HEAD:main')
+        return revision
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    monkeypatch.setenv('SIMUR_REPO_CACHE', str(tmp_path / 'repo_cache'))
+    monkeypatch.delenv(simur.GIT_TTL_ENV, raising=False)
+    monkeypatch.delenv(simur.GIT_FILTER_ENV, raising=False)
+    yield Remote(tmp_path)
+    simur.close_blob_readers()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def calls(monkeypatch):
+    '''The git dirs fetch_git_cache() and refresh_in_background() got'''
+    the_calls = {'fetch': [], 'refresh': []}
+    fetch_git_cache = simur.fetch_git_cache
+
+    def fetch(git_dir):
+        the_calls['fetch'].append(git_dir)
+        return fetch_git_cache(git_dir)
+
+    def refresh(git_dir):
+        the_calls['refresh'].append(git_dir)
+    monkeypatch.setattr(simur, 'fetch_git_cache', fetch)
+    monkeypatch.setattr(simur, 'refresh_in_background', refresh)
+    return the_calls
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def test_first_call_clones(remote, calls):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    assert git_dir == os.path.join(simur.get_git_cache_dir(remote.reporoot),
+                                   simur.GIT_MIRROR_DIR_NAME)
+    assert simur.is_bare_git_dir(git_dir)
+    assert os.path.exists(simur.get_fetch_stamp_file(git_dir))
+    assert simur.has_git_object(git_dir, remote.first)
+    assert calls['fetch'] == []
+    clones = simur.load_json_data(simur.get_git_clones_file())
+    assert clones == {remote.reporoot: git_dir}
+
+def test_no_fetch_when_it_is_there(remote, calls):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    for _ in range(3):
+        assert simur.find_git_object(remote.reporoot, remote.first) == git_dir
+    assert calls == {'fetch': [], 'refresh': []}
+
+def test_fetch_on_miss(remote, calls):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    second = remote.push_commit('util.c', 'int util;\n')
+    # The same cat-file --batch as before, it must see the fetched objects
+    assert not simur.has_git_object(git_dir, second)
+
+    assert simur.find_git_object(remote.reporoot, second) == git_dir
+    assert calls['fetch'] == [git_dir]
+    assert simur.has_git_object(git_dir, second)
+    blob = simur.get_blob_reader(git_dir).read_object(f'{second}:util.c')
+    assert blob == b'int util;\n'
+
+    # Once fetched, it is not fetched again
+    simur.find_git_object(remote.reporoot, second)
+    assert calls['fetch'] == [git_dir]
+
+def test_failed_fetch_is_reported(remote, calls):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    shutil.rmtree(remote.reporoot)
+    missing = '0123456789abcdef0123456789abcdef01234567'
+
+    assert simur.find_git_object(remote.reporoot, missing) == git_dir
+    assert calls['fetch'] == [git_dir]
+    report = simur.load_json_data(simur.get_presoak_report_file())
+    assert remote.reporoot in report
+
+def test_refresh_when_stale(remote, calls, monkeypatch):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    monkeypatch.setenv(simur.GIT_TTL_ENV, '3600')
+    simur.find_git_object(remote.reporoot, remote.first)
+    assert calls['refresh'] == []
+
+    # Fetched two hours ago
+    stamp = simur.get_fetch_stamp_file(git_dir)
+    fetched = os.path.getmtime(stamp) - 7200
+    os.utime(stamp, (fetched, fetched))
+    assert simur.find_git_object(remote.reporoot, remote.first) == git_dir
+    assert calls == {'fetch': [], 'refresh': [git_dir]}
+
+def test_no_refresh_without_ttl(remote, calls):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    os.remove(simur.get_fetch_stamp_file(git_dir))
+    simur.find_git_object(remote.reporoot, remote.first)
+    assert calls == {'fetch': [], 'refresh': []}
+
+def test_refresh_in_background_touches_the_stamp(remote):
+    git_dir = simur.find_git_object(remote.reporoot, remote.first)
+    os.remove(simur.get_fetch_stamp_file(git_dir))
+    assert simur.is_git_cache_stale(git_dir, 3600)
+    simur.refresh_in_background(git_dir)
+    assert not simur.is_git_cache_stale(git_dir, 3600)
+
+#-------------------------------------------------------------------------------
+# migrate_git_clone
+#-------------------------------------------------------------------------------
+@pytest.mark.parametrize('subdir', ['', 'gitcat_test'])
+def test_migrate_git_clone(remote, subdir):
+    # A clone with a working tree, as made before the mirrors - either right
+    # in the repo dir or in a directory in it
+    repo_dir = simur.get_git_cache_dir(remote.reporoot)
+    old_dir = os.path.join(repo_dir, subdir) if subdir else repo_dir
+    git(repo_dir, 'clone', '--quiet', remote.reporoot, old_dir)
+    assert simur.find_git_clone(remote.reporoot, repo_dir) == old_dir
+
+    git_dir = simur.migrate_git_clone(remote.reporoot)
+    assert git_dir == os.path.join(repo_dir, simur.GIT_MIRROR_DIR_NAME)
+    assert simur.is_bare_git_dir(git_dir)
+    assert os.listdir(repo_dir) == [simur.GIT_MIRROR_DIR_NAME]
+    assert simur.find_git_clone(remote.reporoot, repo_dir) == git_dir
+    assert simur.has_git_object(git_dir, remote.first)
+
+def test_remove_tree_with_read_only_files(tmp_path):
+    the_dir = tmp_path / 'objects'
+    os.makedirs(the_dir / 'ab')
+    read_only = the_dir / 'ab' / 'cdef'
+    read_only.write_bytes(b'blob')
+    os.chmod(read_only, 0o444)
+    simur.remove_tree(str(the_dir))
+    assert not the_dir.exists()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import struct
+
+import pytest
+
+import msfFixture
+import pdbMsf
+import prepPDB
+
+FILES = [['C:\\src\\main.c', 'C:\\src\\main.h'],
+         ['C:\\src\\util.c', 'C:\\src\\main.h']]
+STREAM = ['SRCSRV: ini ------------------------------------------------',
+          'VERSION=1',
+          'SRCSRV: source files ---------------------------------------',
+          'C:\\src\\main.c*git*https://example.com/x.git*main.c*0123abcd',
+          'SRCSRV: end ------------------------------------------------']
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def pdb_file(tmp_path):
+    return msfFixture.write_pdb(tmp_path / 'a.pdb', files_per_module=FILES,
+                                string_ids=['C:\\src\\lib.c'])
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def read_all_streams(pdb_file):
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        return [msf.read_stream(index)
+                for index in range(msf.get_no_of_streams())]
+
+#-------------------------------------------------------------------------------
+# The reader
+#-------------------------------------------------------------------------------
+def test_superblock_and_stream_directory(tmp_path):
+    streams = [b'', None, b'x' * 1300, b'', b'\x01\x02']
+    pdb_file = tmp_path / 'plain.msf'
+    pdb_file.write_bytes(msfFixture.make_msf(streams))
+    with pdbMsf.MsfFile(str(pdb_file)) as msf:
+        assert msf.block_size == 512
+        assert msf.get_no_of_streams() == 5
+        assert not msf.has_stream(1)
+        assert msf.get_stream_size(1) == 0
+        assert msf.read_stream(1) == b''
+        assert msf.read_stream(2) == b'x' * 1300        # Three blocks
+        assert msf.read_stream(4) == b'\x01\x02'
+        assert b''.join(msf.iter_stream_chunks(2)) == b'x' * 1300
+
+def test_not_an_msf(tmp_path):
+    not_msf = tmp_path / 'not.pdb'
+    not_msf.write_bytes(b'Microsoft C/C++ program database 2.00\r\n' * 20)
+    empty = tmp_path / 'empty.pdb'
+    empty.write_bytes(b'')
+    for pdb_file in (not_msf, empty):
+        with pytest.raises(pdbMsf.MsfError):
+            pdbMsf.MsfFile(str(pdb_file))
+        assert pdbMsf.has_srcsrv_stream(str(pdb_file)) is None
+        assert pdbMsf.get_source_files(str(pdb_file)) is None
+        assert pdbMsf.get_signature(str(pdb_file)) is None
+
+def test_named_streams(tmp_path):
+    pdb_file = msfFixture.write_pdb(tmp_path / 'a.pdb', files_per_module=FILES,
+                                    srcsrv=b'VERSION=1\r\n')
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        assert msf.get_named_streams() == {'/names': msfFixture.NAMES_STREAM,
+                                           'srcsrv': 7}
+        assert msf.read_named_stream('srcsrv') == b'VERSION=1\r\n'
+        assert msf.read_named_stream('nothing') is None
+    assert pdbMsf.has_srcsrv_stream(pdb_file) is True
+
+def test_no_srcsrv_stream(pdb_file):
+    assert pdbMsf.has_srcsrv_stream(pdb_file) is False
+    assert pdbMsf.read_srcsrv_stream(pdb_file) == ''
+
+def test_signature(pdb_file):
+    assert pdbMsf.get_signature(pdb_file) == msfFixture.SIGNATURE
+
+def test_source_files_from_the_dbi(pdb_file):
+    # Each file once, in the order of the modules
+    assert pdbMsf.get_source_files(pdb_file) == [
+        'C:\\src\\main.c', 'C:\\src\\main.h', 'C:\\src\\util.c']
+
+def test_source_files_from_the_file_checksums(tmp_path):
+    # No file info in the DBI, the C13 FILECHKSMS and /names have them
+    pdb_file = msfFixture.write_pdb(
+        tmp_path / 'a.pdb',
+        checksum_files=['C:\\src\\a.cpp', 'C:\\src\\a.h', 'C:\\src\\a.cpp'])
+    assert pdbMsf.get_source_files(pdb_file) == ['C:\\src\\a.cpp',
+                                                 'C:\\src\\a.h']
+
+def test_string_ids(tmp_path):
+    # Enough records to span many blocks, with other records in between
+    strings = [f'C:\\src\\dir{i}\\file{i}.c' for i in range(300)]
+    pdb_file = msfFixture.write_pdb(tmp_path / 'lib.pdb', string_ids=strings)
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        assert pdbMsf.blocks_needed(msf.get_stream_size(pdbMsf.IPI_STREAM),
+                                    msf.block_size) > 10
+    assert list(pdbMsf.iter_string_ids(pdb_file)) == strings
+
+def test_no_string_ids(tmp_path):
+    empty = msfFixture.write_pdb(tmp_path / 'empty.pdb')
+    assert list(pdbMsf.iter_string_ids(empty)) == []
+
+#-------------------------------------------------------------------------------
+# The writer
+#-------------------------------------------------------------------------------
+def test_write_srcsrv_stream(pdb_file):
+    before = read_all_streams(pdb_file)
+    pdbMsf.write_srcsrv_stream(pdb_file, STREAM)
+
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        srcsrv = msf.read_named_stream('srcsrv')
+        named_streams = msf.get_named_streams()
+    assert srcsrv == pdbMsf.encode_srcsrv_stream(STREAM)
+    assert named_streams['/names'] == msfFixture.NAMES_STREAM
+    assert pdbMsf.read_srcsrv_stream(pdb_file).splitlines() == STREAM
+    # Everything else reads as before
+    after = read_all_streams(pdb_file)
+    for index, data in enumerate(before):
+        if index != pdbMsf.PDB_STREAM:
+            assert after[index] == data
+    assert pdbMsf.get_signature(pdb_file) == msfFixture.SIGNATURE
+    assert pdbMsf.get_source_files(pdb_file) == [
+        'C:\\src\\main.c', 'C:\\src\\main.h', 'C:\\src\\util.c']
+    assert list(pdbMsf.iter_string_ids(pdb_file)) == ['C:\\src\\lib.c']
+
+def test_replace_srcsrv_stream(pdb_file):
+    streams = [STREAM * 40, ['VERSION=1'], STREAM * 3]
+    for stream in streams:
+        pdbMsf.write_srcsrv_stream(pdb_file, stream)
+        assert pdbMsf.read_srcsrv_stream(pdb_file).splitlines() == stream
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        assert len(msf.get_named_streams()) == 2
+        assert msf.get_no_of_streams() == 8
+
+def test_write_reuses_the_free_blocks(pdb_file):
+    # The old and the new stream are both there until the superblock is
+    # written, after that the old blocks are free
+    for _ in range(2):
+        pdbMsf.write_srcsrv_stream(pdb_file, STREAM * 10)
+    size = os.path.getsize(pdb_file)
+    for _ in range(5):
+        pdbMsf.write_srcsrv_stream(pdb_file, STREAM * 10)
+    assert os.path.getsize(pdb_file) == size
+
+def test_write_switches_the_free_page_map(pdb_file):
+    fpm_blocks = []
+    for _ in range(3):
+        pdbMsf.write_srcsrv_stream(pdb_file, STREAM)
+        with pdbMsf.MsfFile(pdb_file) as msf:
+            fpm_blocks.append(msf.fpm_block)
+    assert fpm_blocks == [2, 1, 2]
+
+def test_write_into_new_intervals(pdb_file):
+    # More than block_size blocks, so it needs the free page maps of the next
+    # interval too
+    stream = [f'C:\\src\\file{i}.c*svn*https://x/trunk*f.c*{i}'
+              for i in range(8000)]
+    pdbMsf.write_srcsrv_stream(pdb_file, stream)
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        assert msf.num_blocks > msf.block_size
+        assert os.path.getsize(pdb_file) == msf.num_blocks * msf.block_size
+        for blocks in msf.stream_blocks:
+            assert not any(pdbMsf.is_fpm_block(block, msf.block_size)
+                           for block in blocks)
+    assert pdbMsf.read_srcsrv_stream(pdb_file).splitlines() == stream
+    assert pdbMsf.get_signature(pdb_file) == msfFixture.SIGNATURE
+
+def test_free_page_map(pdb_file):
+    pdbMsf.write_srcsrv_stream(pdb_file, STREAM * 10)
+    pdbMsf.write_srcsrv_stream(pdb_file, STREAM)
+    with open(pdb_file, 'rb') as fp:
+        data = fp.read()
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        used = {0, 1, 2, msf.block_map_block}
+        used.update(msf.directory_blocks)
+        for blocks in msf.stream_blocks:
+            used.update(blocks)
+        offset = msf.fpm_block * msf.block_size
+        fpm = data[offset:offset + msf.block_size]
+        for block in range(msf.num_blocks):
+            is_free = bool(fpm[block // 8] & (1 << (block % 8)))
+            assert is_free == (block not in used), block
+
+def test_crash_before_the_superblock(pdb_file, monkeypatch):
+    pdbMsf.write_srcsrv_stream(pdb_file, ['VERSION=1'])
+    before = read_all_streams(pdb_file)
+
+    def crash(_fd):
+        raise OSError('crash')
+    monkeypatch.setattr(pdbMsf.os, 'fsync', crash)
+    with pytest.raises(OSError):
+        pdbMsf.write_srcsrv_stream(pdb_file, STREAM * 20)
+    monkeypatch.undo()
+
+    assert read_all_streams(pdb_file) == before
+    assert pdbMsf.read_srcsrv_stream(pdb_file).splitlines() == ['VERSION=1']
+
+def test_write_srcsrv_streams(pdb_file, tmp_path):
+    not_msf = tmp_path / 'not.pdb'
+    not_msf.write_bytes(b'not an MSF')
+    other = msfFixture.write_pdb(tmp_path / 'b.pdb', srcsrv=b'old')
+
+    failures = pdbMsf.write_srcsrv_streams(
+        [(pdb_file, STREAM), (str(not_msf), STREAM), (other, STREAM[:2])])
+    assert [pdb for pdb, _error in failures] == [str(not_msf)]
+    assert pdbMsf.read_srcsrv_stream(pdb_file).splitlines() == STREAM
+    assert pdbMsf.read_srcsrv_stream(other).splitlines() == STREAM[:2]
+    assert not_msf.read_bytes() == b'not an MSF'
+
+def test_same_bytes_as_for_pdbstr(pdb_file):
+    # pdbstr -w stores its -i: file as is
+    stream = STREAM + ['C:\\src\\r\u00e4kna.c*svn*https://x/trunk*r.c*7']
+    stream_file = prepPDB.make_stream_file(pdb_file, stream)
+    with open(stream_file, 'rb') as fp:
+        for_pdbstr = fp.read()
+    os.remove(stream_file)
+
+    pdbMsf.write_srcsrv_stream(pdb_file, stream)
+    with pdbMsf.MsfFile(pdb_file) as msf:
+        assert msf.read_named_stream('srcsrv') == for_pdbstr
+    assert for_pdbstr.count(os.linesep.encode()) == len(stream)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def test_named_stream_map_round_trip():
+    streams = {f'/src/files/{i}': i + 10 for i in range(20)}
+    streams['srcsrv'] = 9
+    pdb_stream = struct.pack('<III16s', 20000404, 0, 1, b'\0' * 16)
+    pdb_stream += pdbMsf.make_named_streams(streams) + b'tail'
+    parsed, (_start, end) = pdbMsf.parse_named_streams(pdb_stream)
+    assert parsed == streams
+    assert pdb_stream[end:] == b'tail'
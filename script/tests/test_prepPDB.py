@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+
+import prepPDB
+import simur
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def touch(path, mtime):
+    with open(path, 'w') as fp:
+        fp.write('{}')
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+#-------------------------------------------------------------------------------
+# check_indexed_lib
+#-------------------------------------------------------------------------------
+def test_indexed_lib(tmp_path):
+    pdb = touch(tmp_path / 'lib.pdb', 1000)
+    cache_file = touch(tmp_path / f'lib{simur.VCS_PACK_PATTERN}', 2000)
+    assert prepPDB.check_indexed_lib(pdb) == cache_file
+
+def test_cache_file_older_than_the_lib(tmp_path):
+    pdb = touch(tmp_path / 'lib.pdb', 2000)
+    touch(tmp_path / f'lib{simur.VCS_CACHE_PATTERN}', 1000)
+    assert prepPDB.check_indexed_lib(pdb) == ''
+
+def test_no_cache_file(tmp_path):
+    pdb = touch(tmp_path / 'lib.pdb', 1000)
+    assert prepPDB.check_indexed_lib(pdb) == ''
+
+def test_lib_gone_since_the_scan(tmp_path):
+    touch(tmp_path / f'lib{simur.VCS_PACK_PATTERN}', 2000)
+    assert prepPDB.check_indexed_lib(str(tmp_path / 'lib.pdb')) == ''
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+import sharedSnapshots
+
+FILES = [['main.c', '0123abcd'], ['src/util.c', '4567ef01']]
+
+#-------------------------------------------------------------------------------
+# normalize_url
+#-------------------------------------------------------------------------------
+@pytest.mark.parametrize('url', [
+    'git@github.com:Owner/repo.git',
+    'ssh://git@github.com/Owner/repo',
+    'ssh://git@github.com:22/Owner/repo.git',
+    'https://user@GitHub.com/Owner/repo/',
+    'https://github.com:443/Owner/repo',
+])
+def test_same_repository(url):
+    assert sharedSnapshots.normalize_url(url) == 'github.com/Owner/repo'
+
+def test_port_is_kept():
+    normalize_url = sharedSnapshots.normalize_url
+    assert normalize_url('ssh://git@git.example.com:2222/team/repo.git') == \
+        'git.example.com:2222/team/repo'
+    assert normalize_url('https://git.example.com:8443/team/repo') == \
+        'git.example.com:8443/team/repo'
+    assert normalize_url('https://git.example.com:8443/team/repo') != \
+        normalize_url('https://git.example.com/team/repo')
+
+@pytest.mark.parametrize('url', [
+    'C:\\repos\\x',
+    'C:/repos/x.git',
+    'c:repos',
+    '\\\\server\\share\\repos\\x.git',
+    '/srv/repos/x.git',
+    '../x.git',
+    'x',
+    'file:///srv/repos/x.git',
+    'file://C:/repos/x',
+])
+def test_local_remotes_are_not_shared(url, tmp_path):
+    assert sharedSnapshots.normalize_url(url) is None
+    shared_dir = str(tmp_path)
+    sharedSnapshots.publish_snapshot(shared_dir, 'git', url, 'abc', FILES)
+    assert os.listdir(shared_dir) == []
+    assert sharedSnapshots.fetch_snapshot(shared_dir, 'git', url, 'abc') is None
+
+#-------------------------------------------------------------------------------
+# publish_snapshot and fetch_snapshot
+#-------------------------------------------------------------------------------
+def test_publish_and_fetch(tmp_path):
+    shared_dir = str(tmp_path)
+    sharedSnapshots.publish_snapshot(shared_dir, 'git',
+                                     'git@github.com:Owner/repo.git', 'abc',
+                                     FILES)
+    assert sharedSnapshots.fetch_snapshot(
+        shared_dir, 'git', 'https://github.com/Owner/repo', 'abc') == FILES
+    assert sharedSnapshots.fetch_snapshot(
+        shared_dir, 'git', 'https://github.com/Owner/repo', 'def') is None
+    assert sharedSnapshots.fetch_snapshot(
+        shared_dir, 'git', 'https://github.com:8443/Owner/repo', 'abc') is None
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import sys
+
+import simur
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_command(stdout, stderr, exit_code):
+    return [sys.executable, '-c',
+            'import sys; sys.stdout.write(sys.argv[1]); sys.stdout.flush();'
+            ' sys.stderr.write(sys.argv[2]); sys.exit(int(sys.argv[3]))',
+            stdout, stderr, str(exit_code)]
+
+#-------------------------------------------------------------------------------
+# run_process_lines
+#-------------------------------------------------------------------------------
+def test_lines():
+    command = make_command('out1\nout2\n', 'err1\n', 0)
+    lines = simur.run_process_lines(command, True)
+    assert list(lines) == ['out1', 'out2']
+    assert lines.exit_code == 0
+    assert not lines.failed
+    reply, exit_code = simur.run_process(command, True)
+    assert reply.splitlines() == ['out1', 'out2'] and exit_code == 0
+
+def test_failed_without_check():
+    # The same lines as run_process() replies, stdout and then stderr
+    command = make_command('out1\n', 'err1\n', 2)
+    lines = simur.run_process_lines(command, False)
+    reply, exit_code = simur.run_process(command, False)
+    assert list(lines) == reply.splitlines() == ['out1', 'err1']
+    assert lines.exit_code == exit_code == 2
+    assert lines.failed
+
+def test_failed_with_check():
+    # stdout has already been given when the exit code is known
+    command = make_command('out1\n', 'err1\n', 2)
+    lines = simur.run_process_lines(command, True)
+    got = list(lines)
+    assert got[0] == 'out1'
+    assert '-start of exception-' in got
+    assert 'stderr: err1' in got
+    assert lines.failed
+
+def test_cannot_run():
+    lines = simur.run_process_lines(['no-such-command-for-simur'], False)
+    assert '-start of exception-' in list(lines)
+    assert lines.exit_code == 3
+    assert lines.failed
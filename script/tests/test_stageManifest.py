@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+
+import pytest
+
+import msfFixture
+import stageManifest
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def stage(tmp_path):
+    '''A stage tree with two PDBs'''
+    pdbs = [msfFixture.write_pdb(tmp_path / name) for name in ('a.pdb', 'b.pdb')]
+    manifest_file = str(tmp_path / stageManifest.MANIFEST_FILE_NAME)
+    return str(tmp_path), manifest_file, pdbs
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def test_unchanged(stage):
+    root, manifest_file, (a_pdb, b_pdb) = stage
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    manifest.record(a_pdb, stageManifest.INDEXED)
+    manifest.record(b_pdb, stageManifest.NO_SOURCES)
+    manifest.commit()
+    manifest.store()
+
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    assert manifest.get_outcome(a_pdb) == (stageManifest.INDEXED, None)
+    assert manifest.get_outcome(b_pdb) == (stageManifest.NO_SOURCES, None)
+
+def test_changed(stage):
+    root, manifest_file, (a_pdb, _b_pdb) = stage
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    manifest.record(a_pdb, stageManifest.INDEXED)
+    os.utime(a_pdb, ns=(0, 0))
+    stageManifest.treeScan.file_stats.forget(a_pdb)
+    assert manifest.get_outcome(a_pdb) == (None, None)
+
+def test_indexed_not_kept_without_commit(stage):
+    # The run did not store its vcs_cache, where the files of a_pdb are
+    root, manifest_file, (a_pdb, b_pdb) = stage
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    manifest.record(a_pdb, stageManifest.INDEXED)
+    manifest.record(b_pdb, stageManifest.NO_SOURCES)
+    manifest.store()
+
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    assert manifest.get_outcome(a_pdb) == (None, None)
+    assert manifest.get_outcome(b_pdb) == (stageManifest.NO_SOURCES, None)
+
+def test_indexed_by_an_earlier_run_is_kept(stage):
+    root, manifest_file, (a_pdb, b_pdb) = stage
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    manifest.record(a_pdb, stageManifest.INDEXED)
+    manifest.commit()
+    manifest.store()
+
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    manifest.record(b_pdb, stageManifest.INDEXED)
+    manifest.store()                # Interrupted
+    manifest = stageManifest.StageManifest(manifest_file, root)
+    assert manifest.get_outcome(a_pdb) == (stageManifest.INDEXED, None)
+    assert manifest.get_outcome(b_pdb) == (None, None)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import argparse
+import os
+import sqlite3
+import sys
+
+import pytest
+
+import prepPDB
+import simur
+import svnWcDb
+
+ROOT_URL = 'https://svn.example.com/repo'
+SHA1_MAIN = '3416941a16288d58f71b557766b8d92153aa00f0'
+SHA1_UTIL = '0e16bc26f4327eb4a1607c42a2c1011e4c670e5d'
+SHA1_SPACE = 'ac9aa7f4dc0000000000000000000000000000aa'
+
+# A few columns of the NODES table of wc.db, the rest are not read
+NODES = '''
+CREATE TABLE NODES (
+    wc_id INTEGER NOT NULL, local_relpath TEXT NOT NULL,
+    op_depth INTEGER NOT NULL, parent_relpath TEXT, repos_id INTEGER,
+    repos_path TEXT, revision INTEGER, presence TEXT NOT NULL,
+    kind TEXT NOT NULL, checksum TEXT,
+    PRIMARY KEY (wc_id, local_relpath, op_depth))
+'''
+# (local_relpath, op_depth, repos_path, revision, presence, kind, checksum)
+ROWS = [
+    ('', 0, 'trunk', 6, 'normal', 'dir', None),
+    ('main.c', 0, 'trunk/main.c', 6, 'normal', 'file', '$sha1$' + SHA1_MAIN),
+    ('src', 0, 'trunk/src', 6, 'normal', 'dir', None),
+    ('src/util.c', 0, 'trunk/src/util.c', 4, 'normal', 'file',
+     '$sha1$' + SHA1_UTIL),
+    ('src/my file.c', 0, 'trunk/src/my file.c', 5, 'normal', 'file',
+     '$sha1$' + SHA1_SPACE),
+    # Not in the BASE of the working copy
+    ('gone.c', 0, 'trunk/gone.c', 6, 'not-present', 'file', None),
+    ('added.c', 1, None, None, 'normal', 'file', '$sha1$' + SHA1_MAIN),
+    ('old.c', 0, 'trunk/old.c', 2, 'normal', 'file', '$md5 $0123'),
+]
+
+SVN_INFO = f'''Path: .
+Working Copy Root Path: {{svn_dir}}
+URL: {ROOT_URL}/trunk
+Relative URL: ^/trunk
+Repository Root: {ROOT_URL}
+Revision: 6
+Node Kind: directory
+Schedule: normal
+
+Path: main.c
+Name: main.c
+URL: {ROOT_URL}/trunk/main.c
+Revision: 6
+Node Kind: file
+Schedule: normal
+Checksum: {SHA1_MAIN}
+
+Path: src
+URL: {ROOT_URL}/trunk/src
+Revision: 6
+Node Kind: directory
+Schedule: normal
+
+Path: src/util.c
+Name: util.c
+URL: {ROOT_URL}/trunk/src/util.c
+Revision: 4
+Node Kind: file
+Schedule: normal
+Checksum: {SHA1_UTIL}
+
+'''
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_wc_db(svn_dir, rows=ROWS, wc_format=31, nodes=NODES):
+    '''A .svn/wc.db in svn_dir with the nodes rows'''
+    os.makedirs(os.path.join(svn_dir, '.svn'), exist_ok=True)
+    connection = sqlite3.connect(svnWcDb.get_wc_db(svn_dir))
+    connection.execute('CREATE TABLE REPOSITORY (id INTEGER PRIMARY KEY,'
+                       ' root TEXT UNIQUE NOT NULL, uuid TEXT NOT NULL)')
+    connection.execute(nodes)
+    connection.execute('INSERT INTO REPOSITORY VALUES (1, ?, ?)',
+                       (ROOT_URL, '00000000-1111-2222-3333-444444444444'))
+    for row in rows:
+        local_relpath, op_depth = row[:2]
+        parent = os.path.dirname(local_relpath) if local_relpath else None
+        connection.execute(
+            'INSERT INTO NODES (wc_id, local_relpath, op_depth,'
+            ' parent_relpath, repos_id, repos_path, revision, presence, kind,'
+            ' checksum) VALUES (1, ?, ?, ?, 1, ?, ?, ?, ?, ?)',
+            (local_relpath, op_depth, parent) + row[2:])
+    connection.execute(f'PRAGMA user_version = {wc_format}')
+    connection.commit()
+    connection.close()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def make_options(lower_case_pdb=False):
+    return argparse.Namespace(lower_case_pdb=lower_case_pdb)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def svn_dir(tmp_path):
+    the_dir = str(tmp_path / 'Work')
+    make_wc_db(the_dir)
+    return the_dir
+
+#-------------------------------------------------------------------------------
+# read_wc_db
+#-------------------------------------------------------------------------------
+def test_read_wc_db(svn_dir):
+    url, files = svnWcDb.read_wc_db(svn_dir)
+    assert url == ROOT_URL + '/trunk'
+    # Only the normal BASE files with a sha1, not dirs, locally added files,
+    # not-present nodes or md5 checksums
+    assert sorted(files) == [('main.c', '6', SHA1_MAIN),
+                             ('src/my file.c', '5', SHA1_SPACE),
+                             ('src/util.c', '4', SHA1_UTIL)]
+
+def test_url_is_quoted(tmp_path):
+    svn_dir = str(tmp_path / 'Work')
+    make_wc_db(svn_dir, rows=[('', 0, 'branches/my branch#1', 6, 'normal',
+                               'dir', None)])
+    url, files = svnWcDb.read_wc_db(svn_dir)
+    assert url == ROOT_URL + '/branches/my%20branch%231'
+    assert files == []
+
+def test_repository_root(tmp_path):
+    svn_dir = str(tmp_path / 'Work')
+    make_wc_db(svn_dir, rows=[('', 0, '', 6, 'normal', 'dir', None)])
+    assert svnWcDb.read_wc_db(svn_dir) == (ROOT_URL, [])
+
+def test_no_wc_db(tmp_path):
+    assert svnWcDb.read_wc_db(str(tmp_path)) is None
+    assert svnWcDb.get_stamp(str(tmp_path)) is None
+
+def test_unknown_format(tmp_path):
+    for wc_format in (28, 33):
+        svn_dir = str(tmp_path / f'format{wc_format}')
+        make_wc_db(svn_dir, wc_format=wc_format)
+        assert svnWcDb.read_wc_db(svn_dir) is None
+
+def test_missing_columns(tmp_path):
+    svn_dir = str(tmp_path / 'Work')
+    make_wc_db(svn_dir, rows=[],
+               nodes=NODES.replace('checksum TEXT,', 'md5 TEXT,'))
+    assert svnWcDb.read_wc_db(svn_dir) is None
+
+def test_not_a_database(tmp_path):
+    svn_dir = str(tmp_path / 'Work')
+    os.makedirs(os.path.join(svn_dir, '.svn'))
+    with open(svnWcDb.get_wc_db(svn_dir), 'wb') as fp:
+        fp.write(b'not an SQLite database' * 100)
+    assert svnWcDb.read_wc_db(svn_dir) is None
+
+def test_stamp_changes_with_wc_db(svn_dir):
+    stamp = svnWcDb.get_stamp(svn_dir)
+    connection = sqlite3.connect(svnWcDb.get_wc_db(svn_dir))
+    with connection:
+        connection.execute('UPDATE NODES SET revision = 7')
+    connection.close()
+    os.utime(svnWcDb.get_wc_db(svn_dir), ns=(0, 0))
+    assert svnWcDb.get_stamp(svn_dir) != stamp
+
+#-------------------------------------------------------------------------------
+# make_svn_cache
+#-------------------------------------------------------------------------------
+def test_make_svn_cache(svn_dir):
+    dir_cache = svnWcDb.make_svn_cache(svn_dir, make_options())
+    main_c = os.path.abspath(os.path.join(svn_dir, 'main.c'))
+    util_c = os.path.abspath(os.path.join(svn_dir, 'src/util.c'))
+    assert len(dir_cache) == 3
+    assert dict(dir_cache[main_c]) == {
+        'vcs': 'svn', 'reporoot': ROOT_URL + '/trunk', 'relpath': 'main.c',
+        'revision': '6', 'sha1': SHA1_MAIN}
+    assert dir_cache[util_c]['relpath'] == 'src/util.c'
+    assert dir_cache[util_c]['revision'] == '4'
+
+def test_make_svn_cache_lower_case(svn_dir):
+    dir_cache = svnWcDb.make_svn_cache(svn_dir, make_options(True))
+    for path in dir_cache:
+        assert path == path.lower()
+    main_c = os.path.abspath(os.path.join(svn_dir, 'main.c')).lower()
+    assert dir_cache[main_c]['sha1'] == SHA1_MAIN
+
+#-------------------------------------------------------------------------------
+# prepPDB.make_svn_cache, wc.db or 'svn info -R'
+#-------------------------------------------------------------------------------
+def fake_svn_info(monkeypatch, svn_dir, exit_code=0):
+    '''svn info -R is a python that writes SVN_INFO and exits with
+    exit_code'''
+    calls = []
+    run_process_lines = simur.run_process_lines
+
+    def fake_run_process_lines(command, do_check, extra_dir=None, cwd=None):
+        calls.append((command, cwd))
+        fake = [sys.executable, '-c',
+                'import sys; sys.stdout.write(sys.argv[1]);'
+                ' sys.exit(int(sys.argv[2]))',
+                SVN_INFO.format(svn_dir=svn_dir), str(exit_code)]
+        return run_process_lines(fake, do_check, extra_dir, cwd)
+    monkeypatch.setattr(simur, 'run_process_lines', fake_run_process_lines)
+    return calls
+
+def test_uses_wc_db(svn_dir, monkeypatch):
+    calls = fake_svn_info(monkeypatch, svn_dir)
+    dir_cache = prepPDB.make_svn_cache(svn_dir, make_options())
+    assert calls == []
+    assert len(dir_cache) == 3
+
+def test_falls_back_to_svn_info(tmp_path, monkeypatch):
+    svn_dir = str(tmp_path / 'Work')
+    make_wc_db(svn_dir, rows=[row for row in ROWS if ' ' not in row[0]],
+               wc_format=99)
+    calls = fake_svn_info(monkeypatch, svn_dir)
+    dir_cache = prepPDB.make_svn_cache(svn_dir, make_options())
+    assert calls == [('svn info -R', svn_dir)]
+
+    # The same as wc.db would have given
+    monkeypatch.setattr(svnWcDb, 'KNOWN_FORMATS', (99,))
+    from_wc_db = svnWcDb.make_svn_cache(svn_dir, make_options())
+    assert {path: dict(entry) for path, entry in dir_cache.items()} == {
+        path: dict(entry) for path, entry in from_wc_db.items()}
+    assert len(dir_cache) == 2
+
+def test_no_wc_db_falls_back_to_svn_info(tmp_path, monkeypatch):
+    svn_dir = str(tmp_path)
+    calls = fake_svn_info(monkeypatch, svn_dir)
+    dir_cache = prepPDB.make_svn_cache(svn_dir, make_options(True))
+    assert len(calls) == 1
+    main_c = os.path.abspath(os.path.join(svn_dir, 'main.c')).lower()
+    assert dir_cache[main_c]['revision'] == '6'
+    assert dir_cache[main_c]['sha1'] == SHA1_MAIN
+
+def test_failed_svn_info(tmp_path, monkeypatch):
+    # What it wrote before failing is not taken for the working copy
+    svn_dir = str(tmp_path)
+    calls = fake_svn_info(monkeypatch, svn_dir, exit_code=1)
+    assert prepPDB.make_svn_cache(svn_dir, make_options()) is None
+    assert len(calls) == 1
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import json
+import os
+
+import pytest
+
+import vcsRoots
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def tree(tmp_path):
+    '''work/ with build/sub/ in it and no working copy yet'''
+    work = tmp_path / 'work'
+    sub = work / 'build' / 'sub'
+    os.makedirs(sub)
+    return str(work), str(sub)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+@pytest.fixture
+def cache_file(tmp_path):
+    '''Not in a parent of the tree, writing it would change their mtime'''
+    os.mkdir(tmp_path / 'cache')
+    return str(tmp_path / 'cache' / 'root_dirs.json')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def reload(cache_file):
+    root_dirs = vcsRoots.RootDirCache()
+    root_dirs.load(cache_file)
+    return root_dirs
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def test_find_roots(tree):
+    work, sub = tree
+    os.mkdir(os.path.join(work, '.git'))
+    os.mkdir(os.path.join(sub, '.svn'))
+    root_dirs = vcsRoots.RootDirCache()
+    assert root_dirs.find_roots(sub) == (sub, work)
+    assert root_dirs.find_root(os.path.dirname(sub), '.svn') is None
+    assert root_dirs.find_root(os.path.dirname(sub), '.git') == work
+
+def test_kept_between_runs(tree, cache_file, monkeypatch):
+    work, sub = tree
+    os.mkdir(os.path.join(work, '.git'))
+    root_dirs = vcsRoots.RootDirCache()
+    root_dirs.find_roots(sub)
+    root_dirs.store(cache_file)
+
+    # Not looked at again
+    root_dirs = reload(cache_file)
+    monkeypatch.setattr(vcsRoots.os.path, 'exists', None)
+    assert root_dirs.find_roots(sub) == (None, work)
+
+def test_new_working_copy_above(tree, cache_file):
+    # The negative answers for the directories below it are not kept
+    work, sub = tree
+    root_dirs = vcsRoots.RootDirCache()
+    assert root_dirs.find_roots(sub) == (None, None)
+    root_dirs.store(cache_file)
+
+    os.mkdir(os.path.join(work, '.svn'))
+    assert reload(cache_file).find_roots(sub) == (work, None)
+
+def test_working_copy_removed(tree, cache_file):
+    work, sub = tree
+    os.mkdir(os.path.join(work, '.git'))
+    root_dirs = vcsRoots.RootDirCache()
+    assert root_dirs.find_roots(sub) == (None, work)
+    root_dirs.store(cache_file)
+
+    os.rmdir(os.path.join(work, '.git'))
+    assert reload(cache_file).find_roots(sub) == (None, None)
+
+def test_older_cache_file(tree, cache_file):
+    # Without the mtimes, nothing can be trusted
+    work, sub = tree
+    with open(cache_file, 'w') as fp:
+        json.dump({sub: [None, None], work: [None, None]}, fp)
+    os.mkdir(os.path.join(work, '.git'))
+    assert reload(cache_file).find_roots(sub) == (None, work)
+
+def test_changed_directory(tree, cache_file):
+    work, sub = tree
+    root_dirs = vcsRoots.RootDirCache()
+    root_dirs.find_roots(sub)
+    root_dirs.store(cache_file)
+
+    # Anything new in build/ (here a .git) and build/ is looked at again
+    build = os.path.dirname(sub)
+    os.mkdir(os.path.join(build, '.git'))
+    root_dirs = reload(cache_file)
+    assert root_dirs.find_roots(work) == (None, None)
+    assert root_dirs.find_roots(sub) == (None, build)
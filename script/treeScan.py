@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import concurrent.futures
+import fnmatch
+import os
+import threading
+
+#-------------------------------------------------------------------------------
+# Find the files of interest (*.pdb, *.simur.json ...) in the build trees with
+# os.scandir, one pass for all suffixes, skipping the directories that match
+# the prune rules.  Wide trees (e.g. on network shares) are walked by a pool
+# of threads.  The stats of the files found are kept in file_stats, so that
+# later stages (check_indexed_lib) do not stat them again.
+#-------------------------------------------------------------------------------
+PRUNE_DIRS = ('.git', '.svn', '.hg', '.vs')    # Never any PDBs in there
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class FileStats:
+    '''dict on path -> os.stat_result of what the scans found, and the
+    directories that they listed completely'''
+    def __init__(self):
+        self._stats = {}
+        self._scanned = {}          # dict on directory -> suffixes
+        self._lock = threading.Lock()
+
+    def add_dir(self, directory, suffixes, stats):
+        with self._lock:
+            self._stats.update(stats)
+            self._scanned[directory] = suffixes
+
+    def get_stat(self, path):
+        '''The stat of path, or None if it does not exist'''
+        with self._lock:
+            stat = self._stats.get(path)
+            if stat is not None:
+                return stat
+            # A scan would have found it
+            suffixes = self._scanned.get(os.path.dirname(path))
+            if suffixes and path.endswith(suffixes):
+                return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._stats[path] = stat
+        return stat
+
+    def get_mtime(self, path):
+        stat = self.get_stat(path)
+        return None if stat is None else stat.st_mtime
+
+    def get_size(self, path):
+        stat = self.get_stat(path)
+        return None if stat is None else stat.st_size
+
+    def forget(self, path):
+        '''path was written, e.g. a PDB that got its srcsrv stream'''
+        with self._lock:
+            self._stats.pop(path, None)
+            self._scanned.pop(os.path.dirname(path), None)
+
+file_stats = FileStats()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class TreeScanner:
+    def __init__(self, prune_dirs=PRUNE_DIRS, jobs=1):
+        self.prune_dirs = tuple(prune_dirs)     # fnmatch patterns
+        self.jobs = jobs
+
+    def is_pruned(self, name):
+        for pattern in self.prune_dirs:
+            if fnmatch.fnmatch(name, pattern):
+                return True
+        return False
+
+    def scan_dir(self, directory, suffixes, found):
+        '''Returns the sub directories to scan'''
+        sub_dirs = []
+        stats = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            # As os.walk, do not follow directory links
+                            if not entry.is_symlink() and \
+                                not self.is_pruned(entry.name):
+                                sub_dirs.append(entry.path)
+                        elif entry.name.endswith(suffixes):
+                            stats[entry.path] = entry.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            return sub_dirs             # As os.walk, skip what we cannot list
+
+        file_stats.add_dir(directory, suffixes, stats)
+        found.extend(stats.keys())
+        return sub_dirs
+
+    def scan(self, roots, suffixes):
+        '''dict on suffix -> the paths under roots that end with it, sorted
+        per root and in the order of roots'''
+        suffixes = tuple(suffixes)
+        found_per_root = []
+        for root in roots:
+            found = []
+            if self.jobs <= 1:
+                pending = [root]
+                while pending:
+                    pending.extend(self.scan_dir(pending.pop(), suffixes,
+                                                 found))
+            else:
+                self.scan_in_parallel(root, suffixes, found)
+            found_per_root.append(sorted(found))
+
+        files = {suffix: [] for suffix in suffixes}
+        for found in found_per_root:
+            for path in found:
+                for suffix in suffixes:
+                    if path.endswith(suffix):
+                        files[suffix].append(path)
+                        break
+        return files
+
+    def scan_in_parallel(self, root, suffixes, found):
+        # list.extend is atomic, the workers may share found
+        with concurrent.futures.ThreadPoolExecutor(self.jobs) as pool:
+            pending = {pool.submit(self.scan_dir, root, suffixes, found)}
+            while pending:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    for sub_dir in future.result():
+                        pending.add(pool.submit(self.scan_dir, sub_dir,
+                                                suffixes, found))
+
+the_scanner = TreeScanner()     # Replaced by indexPDBs with the options
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def find_files(roots, suffixes):
+    return the_scanner.scan(roots, suffixes)
@@ -5,6 +5,7 @@
 import os
 import sys
 
+import blobCache
 import simur
 
 #-------------------------------------------------------------------------------
@@ -19,53 +20,57 @@ def usage():
 #
 #-------------------------------------------------------------------------------
 def handle_svn(reporoot, relpath, revision):
+    '''Returns the reply and if it is the content of the file'''
     url = reporoot + '/' + relpath
     command = f'svn cat {url}@{revision}'
-    reply, _exit_code = simur.run_process(command, True, extra_dir=None,
+    reply, exit_code = simur.run_process(command, True, extra_dir=None,
         as_text=False)
 
     # Try to work around any http - https redirecting
     if reply.startswith(b'Redirecting to URL'):
         temp = bytearray(reply)
         slicer = temp.index(b'\r\n') + 2
-        reply = temp[slicer:]
+        reply = bytes(temp[slicer:])
 
-    return reply
+    return reply, exit_code == 0
 
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
-def handle_local_git(reporoot, revision):
-    # Make a pushd to the git dir
-    curr_dir = os.getcwd()
-    os.chdir(reporoot)
-    command = f'git show {revision}'
-    reply, _exit_code = simur.run_process(command, True, extra_dir=reporoot,
-        as_text=False)
-    os.chdir(curr_dir)
+def show_git_object(git_dir, revision):
+    '''Returns the reply and if it is the content of the object'''
+    reply = simur.get_blob_reader(git_dir).read_object(revision)
+    if reply is None:
+        # Let git show tell what is wrong
+        command = ['git', 'show', revision]
+        reply, _exit_code = simur.run_process(command, True, cwd=git_dir,
+            as_text=False)
+        return reply, False
+
+    return reply, True
+
 
-    return reply
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def handle_local_git(reporoot, revision):
+    return show_git_object(reporoot, revision)
 
 
 #-------------------------------------------------------------------------------
 #
 #-------------------------------------------------------------------------------
 def handle_remote_git(reporoot, revision):
-    git_dir = simur.find_and_update_git_cache(reporoot)
+    # Only fetch if the clone does not have the revision already
+    git_dir = simur.find_git_object(reporoot, revision)
 
     if not git_dir:
         reply  = f'Could not find a .git dir from {reporoot}\n'
         reply += f'when looking in {git_dir}'
-    else:
-        curr_dir = os.getcwd()
-        os.chdir(git_dir)
-        command = f'git show {revision}'
-        reply, _exit_code = simur.run_process(command, True, extra_dir=git_dir,
-            as_text=False)
-        os.chdir(curr_dir)
+        return reply.encode('utf-8'), False
 
-    return reply
+    return show_git_object(git_dir, revision)
 
 
 #-------------------------------------------------------------------------------
@@ -73,11 +78,32 @@ def handle_remote_git(reporoot, revision):
 #-------------------------------------------------------------------------------
 def handle_git(reporoot, revision):
     if os.path.exists(reporoot):
-        reply = handle_local_git(reporoot, revision)
-    else:
-        reply = handle_remote_git(reporoot, revision)
+        return handle_local_git(reporoot, revision)
+
+    return handle_remote_git(reporoot, revision)
 
-    return reply
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def fetch_cached(key, fetch):
+    '''The content for key from the blob cache, or else from fetch() - and
+    then put into the cache if it was the content'''
+    cache = None
+    if key:
+        cache = blobCache.open_cache()
+    if cache is None:
+        return fetch()[0]
+
+    try:
+        reply = cache.get(key)
+        if reply is None:
+            reply, is_content = fetch()
+            if is_content:
+                cache.put(key, reply)
+        return reply
+    finally:
+        cache.close()
 
 
 #-------------------------------------------------------------------------------
@@ -95,9 +121,14 @@ def main():
     revision = sys.argv[4]
 
     if vcs == 'svn':
-        reply = handle_svn(reporoot, relpath, revision)
+        key = blobCache.make_svn_key(reporoot, relpath, revision)
+        reply = fetch_cached(key,
+                             lambda: handle_svn(reporoot, relpath, revision))
     elif vcs == 'git':
-        reply = handle_git(reporoot, revision)
+        key = None
+        if not os.path.exists(reporoot):    # A local one is read as it is
+            key = blobCache.make_git_key(revision)
+        reply = fetch_cached(key, lambda: handle_git(reporoot, revision))
     else:
         print(f'Cannot handle {vcs}, only svn and git\n')
         usage()
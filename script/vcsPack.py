@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import json
+import os
+import sys
+import uuid
+import zlib
+
+import simur
+import vcsRecords
+
+#-------------------------------------------------------------------------------
+# A compact alternative to the .simur.json files (vcs_cache.simur.json and the
+# <lib>.simur.json of the static libraries): a zlib compressed stream of one
+# JSON array per line, a header and then
+#   ["R", id, vcs, reporoot, sha1, local, remote]   a repository, once
+#   ["F", path, id, relpath, revision, sha1]        a file in repository id
+#   ["N", path]                                     a file in no vcs
+#   ["D", path, {...}]                              anything else, as is
+# The sha1 of an "F" row is null when it is the one of the repository (git).
+# Both writing and reading are streamed, so neither holds the whole file.
+#-------------------------------------------------------------------------------
+PACK_HEADER = ['simur-pack', 1]
+CHUNK_SIZE = 1 << 16
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def is_pack_file(file):
+    return file.endswith(simur.VCS_PACK_PATTERN)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_repo_key(cache_entry):
+    '''What the rows of one "R" row share, None if not a known entry'''
+    vcs = cache_entry.get('vcs')
+    if vcs not in vcsRecords.KEYS or \
+        tuple(cache_entry) != vcsRecords.KEYS[vcs]:
+        return None
+    if vcs == 'git':
+        return (vcs, cache_entry['reporoot'], cache_entry['sha1'],
+                cache_entry['local'], cache_entry['remote'])
+    return (vcs, cache_entry['reporoot'], None, None, None)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class PackWriter:
+    '''Write (path, cache entry) rows to a .simur.pack file'''
+    def __init__(self, file):
+        self.file = file
+        self._temp_file = f'{file}.{uuid.uuid4().hex}.tmp'
+        self._fp = open(self._temp_file, 'wb')
+        self._compressor = zlib.compressobj(6)
+        self._pending = []
+        self._pending_size = 0
+        self._repo_ids = {}
+        self._write_row(PACK_HEADER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, *_exception):
+        if exception_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write_row(self, row):
+        line = json.dumps(row, ensure_ascii=False, separators=(',', ':'))
+        self._pending.append(line)
+        self._pending_size += len(line) + 1
+        if self._pending_size >= CHUNK_SIZE:
+            self._flush_rows()
+
+    def _flush_rows(self):
+        if not self._pending:
+            return
+        data = ('\n'.join(self._pending) + '\n').encode('utf-8')
+        self._fp.write(self._compressor.compress(data))
+        self._pending = []
+        self._pending_size = 0
+
+    def write(self, path, cache_entry):
+        if vcsRecords.NO_VCS in cache_entry:
+            self._write_row(['N', path])
+            return
+        repo_key = get_repo_key(cache_entry)
+        if repo_key is None:
+            self._write_row(['D', path, dict(cache_entry)])
+            return
+
+        repo_id = self._repo_ids.get(repo_key)
+        if repo_id is None:
+            repo_id = len(self._repo_ids)
+            self._repo_ids[repo_key] = repo_id
+            self._write_row(['R', repo_id, *repo_key])
+        sha1 = None
+        if repo_key[0] != 'git':
+            sha1 = cache_entry['sha1']
+        self._write_row(['F', path, repo_id, cache_entry['relpath'],
+                         cache_entry['revision'], sha1])
+
+    def close(self):
+        self._flush_rows()
+        self._fp.write(self._compressor.flush())
+        self._fp.close()
+        os.replace(self._temp_file, self.file)
+
+    def abort(self):
+        self._fp.close()
+        os.remove(self._temp_file)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def iter_rows(file):
+    '''The rows of file, decoded a chunk of lines at a time'''
+    decompressor = zlib.decompressobj()
+    rest = b''
+    with open(file, 'rb') as fp:
+        while True:
+            chunk = fp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            lines = (rest + decompressor.decompress(chunk)).split(b'\n')
+            rest = lines.pop()
+            if lines:
+                # One json.loads() for all of them is much faster
+                yield from json.loads(b'[' + b','.join(lines) + b']')
+    rest += decompressor.flush()
+    if rest:
+        yield json.loads(rest)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def iter_pack(file, repos=None):
+    '''The (path, cache entry) rows of a .simur.pack file, as they are read'''
+    if repos is None:
+        repos = vcsRecords.the_repos
+    rows = iter_rows(file)
+    header = next(rows, None)
+    if header != PACK_HEADER:
+        raise ValueError(f'{file} is not a {PACK_HEADER[0]} file')
+
+    repo_records = {}
+    for row in rows:
+        kind = row[0]
+        if kind == 'F':
+            _kind, path, repo_id, relpath, revision, sha1 = row
+            yield vcsRecords.intern_path(path), vcsRecords.FileRecord(
+                repo_records[repo_id], relpath, revision, sha1)
+        elif kind == 'R':
+            _kind, repo_id, vcs, reporoot, sha1, local, remote = row
+            repo_records[repo_id] = repos.get_repo(vcs, reporoot, sha1,
+                                                   local, remote)
+        elif kind == 'N':
+            yield vcsRecords.intern_path(row[1]), vcsRecords.NO_VCS_ENTRY
+        elif kind == 'D':
+            yield vcsRecords.intern_path(row[1]), row[2]
+
+#-------------------------------------------------------------------------------
+# Either format, chosen by the file name
+#-------------------------------------------------------------------------------
+def store_vcs_data(file, vcs_data):
+    if not is_pack_file(file):
+        simur.store_json_data(file, vcs_data)
+        return
+    with PackWriter(file) as writer:
+        for path, cache_entry in vcs_data.items():
+            writer.write(path, cache_entry)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def iter_vcs_data(file):
+    '''(path, cache entry) of a .simur.json or .simur.pack, empty if there is
+    no such file or it cannot be read - as simur.load_json_data()'''
+    if not is_pack_file(file):
+        data = simur.load_json_data(file)
+        yield from vcsRecords.the_repos.compact(data).items()
+        return
+    try:
+        yield from iter_pack(file)
+    except (OSError, ValueError, IndexError, KeyError, zlib.error) as e:
+        print(f'Could not read {file}: {e}')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def load_vcs_data(file):
+    return dict(iter_vcs_data(file))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def convert(file):
+    '''x.simur.json -> x.simur.pack and the other way around, keeping the
+    times since they tell if a lib PDB needs to be indexed again'''
+    if is_pack_file(file):
+        out_file = file[:-len(simur.VCS_PACK_PATTERN)] + \
+            simur.VCS_CACHE_PATTERN
+        simur.store_json_data(out_file, load_vcs_data(file))
+    elif file.endswith(simur.VCS_CACHE_PATTERN):
+        out_file = file[:-len(simur.VCS_CACHE_PATTERN)] + \
+            simur.VCS_PACK_PATTERN
+        store_vcs_data(out_file, simur.load_json_data(file))
+    else:
+        print(f'Sorry, {file} is neither {simur.VCS_CACHE_PATTERN} nor'
+              f' {simur.VCS_PACK_PATTERN}')
+        return 3
+
+    stat = os.stat(file)
+    os.utime(out_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    print(f'{file} -> {out_file}')
+    return 0
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def usage():
+    the_script = os.path.basename(sys.argv[0])
+    print(f'usage: {the_script} file{simur.VCS_CACHE_PATTERN}|'
+          f'file{simur.VCS_PACK_PATTERN} ...')
+    print(f'  convert between {simur.VCS_CACHE_PATTERN} and'
+          f' {simur.VCS_PACK_PATTERN}')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def main():
+    if len(sys.argv) < 2:
+        print("Too few arguments")
+        usage()
+        return 3
+
+    outcome = 0
+    for file in sys.argv[1:]:
+        outcome = max(outcome, convert(file))
+    return outcome
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
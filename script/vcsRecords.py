@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import collections.abc
+import sys
+import threading
+
+#-------------------------------------------------------------------------------
+# Compact cache entries for svn_cache, git_cache and vcs_cache.  What all files
+# of a snapshot have in common (vcs, reporoot, commit id, local and remote) is
+# kept once in a RepoRecord, and each file has a slotted FileRecord with its
+# relpath and revision (and its own sha1 for svn).  A FileRecord reads like the
+# dict it replaces, {'reporoot': ..., 'relpath': ..., ...}, with the keys in
+# the same order, so the .simur.json files come out the same.
+#-------------------------------------------------------------------------------
+NO_VCS = 'no-vcs'
+SVN_KEYS = ('reporoot', 'relpath', 'revision', 'sha1', 'vcs')
+GIT_KEYS = ('reporoot', 'relpath', 'revision', 'sha1', 'local', 'remote', 'vcs')
+KEYS = {'svn': SVN_KEYS, 'git': GIT_KEYS}
+
+# The answer for all files that are in no vcs, nobody changes it
+NO_VCS_ENTRY = {NO_VCS: 'true'}
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def intern_path(path):
+    '''The same string object for the same path, in all caches'''
+    return sys.intern(path)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class RepoRecord:
+    '''What the files of one svn/git snapshot have in common'''
+    __slots__ = ('vcs', 'reporoot', 'sha1', 'local', 'remote')
+
+    def __init__(self, vcs, reporoot, sha1=None, local=None, remote=None):
+        self.vcs = sys.intern(vcs)
+        self.reporoot = reporoot
+        self.sha1 = sha1        # The commit id for git, None for svn
+        self.local = local
+        self.remote = remote
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class FileRecord(collections.abc.Mapping):
+    '''A file in a RepoRecord, read only'''
+    __slots__ = ('repo', 'relpath', 'revision', 'file_sha1')
+
+    def __init__(self, repo, relpath, revision, file_sha1=None):
+        self.repo = repo
+        self.relpath = relpath
+        self.revision = revision
+        self.file_sha1 = file_sha1      # Only if not the same as the repo's
+
+    def __getitem__(self, key):
+        repo = self.repo
+        if key == 'reporoot':
+            return repo.reporoot
+        if key == 'relpath':
+            return self.relpath
+        if key == 'revision':
+            return self.revision
+        if key == 'sha1':
+            if self.file_sha1 is not None:
+                return self.file_sha1
+            return repo.sha1
+        if key == 'vcs':
+            return repo.vcs
+        if repo.vcs == 'git':
+            if key == 'local':
+                return repo.local
+            if key == 'remote':
+                return repo.remote
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(KEYS[self.repo.vcs])
+
+    def __len__(self):
+        return len(KEYS[self.repo.vcs])
+
+    def __repr__(self):
+        return repr(dict(self))
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def to_json(record):
+    '''For json.dump(default=...)'''
+    if isinstance(record, collections.abc.Mapping):
+        return dict(record)
+    raise TypeError(f'{type(record).__name__} is not JSON serializable')
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class RepoTable:
+    '''The RepoRecords of the cache entries that we read from .simur.json files,
+    one per distinct repository snapshot'''
+    def __init__(self):
+        self._repos = {}
+        self._lock = threading.Lock()
+
+    def get_repo(self, vcs, reporoot, sha1=None, local=None, remote=None):
+        key = (vcs, reporoot, sha1, local, remote)
+        with self._lock:
+            repo = self._repos.get(key)
+            if repo is None:
+                repo = RepoRecord(vcs, reporoot, sha1, local, remote)
+                self._repos[key] = repo
+        return repo
+
+    def make_record(self, cache_entry):
+        '''A FileRecord for the dict cache_entry, or cache_entry itself if it
+        is not one of ours'''
+        if NO_VCS in cache_entry:
+            return NO_VCS_ENTRY
+        vcs = cache_entry.get('vcs')
+        if vcs not in KEYS or tuple(cache_entry) != KEYS[vcs]:
+            return cache_entry
+        if vcs == 'git':
+            repo = self.get_repo(vcs, cache_entry['reporoot'],
+                                 cache_entry['sha1'], cache_entry['local'],
+                                 cache_entry['remote'])
+            return FileRecord(repo, cache_entry['relpath'],
+                              cache_entry['revision'])
+        repo = self.get_repo(vcs, cache_entry['reporoot'])
+        return FileRecord(repo, cache_entry['relpath'],
+                          cache_entry['revision'], cache_entry['sha1'])
+
+    def compact(self, vcs_data):
+        '''vcs_data (as read from a .simur.json) with FileRecords as values'''
+        compacted = {}
+        for path, cache_entry in vcs_data.items():
+            compacted[intern_path(path)] = self.make_record(cache_entry)
+        return compacted
+
+the_repos = RepoTable()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import os
+import re
+
+import simur
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def split_path(path):
+    '''C:\\src\\repo/dir -> ['C:', 'src', 'repo', 'dir']'''
+    return [part for part in re.split(r'[\\/]+', path) if part]
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class RootCache(dict):
+    '''
+    The svn_cache and git_cache: a dict on working copy roots, each holding a
+    dict on the absolute paths of the files in that working copy.
+
+    The roots are also kept in a trie on their path components, so finding the
+    working copies that may contain a file is one walk down the trie instead of
+    a startswith() against every root.
+    '''
+    _ROOT = ''      # Cannot be a path component, marks that a root ends here
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._trie = {}
+        # With prepPDB.cache_git_scope(): dict on root -> (remote, commit id,
+        # the directories taken so far)
+        self.scopes = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, root, value):
+        if root not in self:
+            node = self._trie
+            for part in split_path(root):
+                node = node.setdefault(part, {})
+            node[self._ROOT] = root
+        super().__setitem__(root, value)
+
+    def __delitem__(self, root):
+        super().__delitem__(root)
+        node = self._trie
+        for part in split_path(root):
+            node = node[part]
+        del node[self._ROOT]
+
+    def update(self, *args, **kwargs):
+        for root, value in dict(*args, **kwargs).items():
+            self[root] = value
+
+    def setdefault(self, root, default=None):
+        if root not in self:
+            self[root] = default
+        return self[root]
+
+    def pop(self, root, *default):
+        if root in self:
+            value = self[root]
+            del self[root]
+            return value
+        return super().pop(root, *default)
+
+    def popitem(self):
+        root, value = super().popitem()
+        super().__setitem__(root, value)
+        del self[root]
+        return root, value
+
+    def clear(self):
+        super().clear()
+        self._trie = {}
+
+    def matching_roots(self, path):
+        '''All the roots that path lives under, the longest (innermost) first.
+        Nested working copies (svn externals, git repos inside other trees)
+        are thereby tried before the ones surrounding them'''
+        roots = []
+        node = self._trie
+        if self._ROOT in node:
+            roots.append(node[self._ROOT])
+        for part in split_path(path):
+            node = node.get(part)
+            if node is None:
+                break
+            if self._ROOT in node:
+                roots.append(node[self._ROOT])
+        roots.reverse()
+        return roots
+
+    def lookup(self, path):
+        '''The cached entry for path, or None'''
+        for root in self.matching_roots(path):
+            content = self[root]
+            if path in content:
+                return content[path]
+        return None
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class RootDirCache:
+    '''
+    Memo of directory -> (svn root, git root), i.e. the closest directory at or
+    above it that has a .svn or .git, or None if there is none.
+
+    Every directory on the way up is filled in when walking, also the negative
+    answers, so each directory is only looked at once per run - the thousands
+    of files in an SDK or build output directory cost one walk, not thousands.
+
+    Between runs (--root_dir_cache) the mtime of each directory is kept too: a
+    .svn or .git that comes or goes changes it, and then the answers for that
+    directory and all below it are looked at again.
+    '''
+    MARKERS = ('.svn', '.git')
+
+    def __init__(self):
+        self._roots = {}    # dict on directory -> tuple, one root per marker
+        self._mtimes = {}   # dict on directory -> st_mtime_ns when looked at
+
+    def find_roots(self, the_dir):
+        known = self._roots
+        visited = []
+        curr_dir = the_dir
+        while curr_dir not in known:
+            visited.append(curr_dir)
+            next_dir = os.path.split(curr_dir)[0]
+            if next_dir == curr_dir:
+                break
+            curr_dir = next_dir
+        roots = known.get(curr_dir, (None,) * len(self.MARKERS))
+
+        # Now fill in on the way down again
+        for curr_dir in reversed(visited):
+            self._mtimes[curr_dir] = get_mtime_ns(curr_dir)
+            roots = tuple(curr_dir
+                          if os.path.exists(os.path.join(curr_dir, marker))
+                          else root
+                          for marker, root in zip(self.MARKERS, roots))
+            known[curr_dir] = roots
+
+        return known[the_dir]
+
+    def find_root(self, the_dir, marker):
+        return self.find_roots(the_dir)[self.MARKERS.index(marker)]
+
+    def load(self, file):
+        '''Takes the directories that are as they were when stored, and whose
+        parents are'''
+        data = simur.load_json_data(file)
+        # The parents first
+        for the_dir in sorted(data, key=len):
+            entry = data[the_dir]
+            if len(entry) != len(self.MARKERS) + 1:
+                continue            # Without an mtime, from an older version
+            *roots, mtime_ns = entry
+            if mtime_ns is None or mtime_ns != get_mtime_ns(the_dir):
+                continue
+            parent = os.path.split(the_dir)[0]
+            if parent != the_dir and parent not in self._roots:
+                continue
+            self._roots[the_dir] = tuple(roots)
+            self._mtimes[the_dir] = mtime_ns
+
+    def store(self, file):
+        data = {the_dir: list(roots) + [self._mtimes.get(the_dir)]
+                for the_dir, roots in self._roots.items()}
+        simur.store_json_data(file, data)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_mtime_ns(the_dir):
+    '''None if it cannot be had, then it is looked at again next time'''
+    try:
+        return os.stat(the_dir).st_mtime_ns
+    except OSError:
+        return None
+
+root_dirs = RootDirCache()
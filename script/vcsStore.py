@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+#
+#-------------------------------------------------------------------------------
+
+import sqlite3
+import threading
+import time
+
+import simur
+import vcsRecords
+
+#-------------------------------------------------------------------------------
+# Persistent store of the svn/git snapshots, so that a working copy that has
+# not changed since the last indexPDBs run is not listed again.  Each snapshot
+# is keyed on its root and a 'stamp' (HEAD commit/index or wc.db state), see
+# gitIndex.get_stamp() and svnWcDb.get_stamp()
+#-------------------------------------------------------------------------------
+STORE_FILE_NAME = 'vcs_store.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    root     TEXT PRIMARY KEY,
+    vcs      TEXT NOT NULL,
+    stamp    TEXT NOT NULL,
+    reporoot TEXT,
+    sha1     TEXT,
+    local    TEXT,
+    remote   TEXT,
+    updated  REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    root     TEXT NOT NULL,
+    path     TEXT NOT NULL,
+    relpath  TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    sha1     TEXT
+);
+CREATE INDEX IF NOT EXISTS files_on_root ON files (root);
+'''
+
+the_store = None            # Set by open_store()
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def get_default_store_file():
+    return simur.get_repo_cache_file(STORE_FILE_NAME)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+class VcsStore:
+    '''
+    The snapshots (dict on absolute file path -> cache entry, as in svn_cache
+    and git_cache) of the working copies.  The fields that are the same for
+    the whole working copy are kept once per snapshot
+    '''
+    def __init__(self, file):
+        self.file = file
+        self._lock = threading.Lock()   # Shared by the indexPDBs --jobs
+        self._connection = sqlite3.connect(file, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def load(self, root, stamp):
+        '''The stored snapshot of root, or None if none or a stale one'''
+        with self._lock:
+            snapshot = self._connection.execute(
+                'SELECT vcs, stamp, reporoot, sha1, local, remote'
+                ' FROM snapshots WHERE root = ?', (root,)).fetchone()
+            if snapshot is None or snapshot[1] != stamp:
+                return None
+            rows = self._connection.execute(
+                'SELECT path, relpath, revision, sha1 FROM files'
+                ' WHERE root = ?', (root,)).fetchall()
+
+        vcs, _stamp, reporoot, root_sha1, local, remote = snapshot
+        repo = vcsRecords.RepoRecord(vcs, reporoot, root_sha1, local, remote)
+        dir_cache = {}
+        for path, relpath, revision, sha1 in rows:
+            cache_entry = vcsRecords.FileRecord(repo, relpath, revision, sha1)
+            dir_cache[vcsRecords.intern_path(path)] = cache_entry
+
+        return dir_cache
+
+    def save(self, root, vcs, stamp, dir_cache):
+        reporoot = root_sha1 = local = remote = None
+        for cache_entry in dir_cache.values():
+            reporoot = cache_entry['reporoot']
+            local = cache_entry.get('local')
+            remote = cache_entry.get('remote')
+            break
+        if vcs == 'git' and dir_cache:
+            # The commit id, the same for all files
+            root_sha1 = next(iter(dir_cache.values()))['sha1']
+
+        rows = []
+        for path, cache_entry in dir_cache.items():
+            sha1 = None if root_sha1 is not None else cache_entry['sha1']
+            rows.append((root, path, cache_entry['relpath'],
+                         cache_entry['revision'], sha1))
+
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM files WHERE root = ?',
+                                     (root,))
+            self._connection.execute(
+                'INSERT OR REPLACE INTO snapshots VALUES (?,?,?,?,?,?,?,?)',
+                (root, vcs, stamp, reporoot, root_sha1, local, remote,
+                 time.time()))
+            self._connection.executemany(
+                'INSERT INTO files VALUES (?,?,?,?,?)', rows)
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def open_store(file):
+    global the_store
+    the_store = VcsStore(file)
+    return the_store
+
+#-------------------------------------------------------------------------------
+#
+#-------------------------------------------------------------------------------
+def close_store():
+    global the_store
+    if the_store:
+        the_store.close()
+    the_store = None